@@ -2,6 +2,7 @@
 
 from .base import BaseAdapter
 from .brew import BrewAdapter
+from .discovery import DetectedManager, discover_managers, discover_managers_sync
 from .npm import NpmAdapter
 from .pip import PipAdapter
 from .pipx import PipxAdapter
@@ -10,6 +11,7 @@ from .registry import (
     REGISTERED_ADAPTERS,
     get_adapter_by_id,
     get_registered_adapters,
+    load_live_packages,
 )
 from .winget import WinGetAdapter
 
@@ -24,4 +26,8 @@ __all__ = [
     "REGISTERED_ADAPTERS",
     "get_registered_adapters",
     "get_adapter_by_id",
+    "load_live_packages",
+    "DetectedManager",
+    "discover_managers",
+    "discover_managers_sync",
 ]
@@ -1,18 +1,69 @@
 """BaseAdapter que normaliza operações entre gestores de pacotes."""
 from __future__ import annotations
 
-import shutil
+import asyncio
+import logging
+import os
+import subprocess
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Dict, Generator, List, Optional, Type, TypeVar
 
 from app.core.executor import (
     CommandExecutionError,
     CommandExecutor,
     CommandTimeoutError,
 )
+from app.core.path_index import get_path_index
 from app.core.validation import InvalidPackageNameError, ValidationLayer
-from app.storage.json_storage import JSONStorage
+from app.core.version_cache import get_version_cache
+from app.storage import Storage, create_storage
+from app.storage.json_storage import get_read_cache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class CommandRequest:
+    """Comando pedido por uma operação de adapter."""
+
+    command: List[str]
+    timeout: Optional[int] = None
+    check: bool = False
+
+
+# Uma operação é um gerador que emite CommandRequest e recebe o CompletedProcess
+# correspondente (ou a exceção do executor). O mesmo código serve assim os
+# caminhos síncrono (CLI) e assíncrono (routers).
+Operation = Generator[CommandRequest, subprocess.CompletedProcess, T]
+
+
+@dataclass(frozen=True)
+class _Finished:
+    """Valor de retorno de uma operação que terminou."""
+
+    value: Any
+
+
+def _resume(
+    operation: Operation[Any],
+    result: Optional[subprocess.CompletedProcess] = None,
+    error: Optional[Exception] = None,
+) -> Any:
+    """Avança a operação até ao próximo CommandRequest (ou _Finished no fim).
+
+    StopIteration não pode atravessar um Future; por isso o fim da operação é
+    devolvido como valor.
+    """
+    try:
+        if error is not None:
+            return operation.throw(error)
+        return operation.send(result)
+    except StopIteration as stop:
+        return _Finished(stop.value)
 
 
 class BaseAdapter(ABC):
@@ -24,16 +75,20 @@ class BaseAdapter(ABC):
     version_args: List[str] = ["--version"]
     command_timeout: int = CommandExecutor.DEFAULT_TIMEOUT
     command_executor: Type[CommandExecutor] = CommandExecutor
+    INVENTORY_CACHE_NAME = "inventory.json"
+    UNINSTALL_BATCH_SIZE = 25
+    UNINSTALL_BATCH_TIMEOUT_PER_PACKAGE = 10  # segundos, somados ao command_timeout
 
     def __init__(
         self,
-        storage: Optional[JSONStorage] = None,
+        storage: Optional[Storage] = None,
     ) -> None:
         if not self.manager_id or not self.executable_name:
             raise ValueError("Subclasses devem definir manager_id e executable_name.")
 
-        self.storage = storage or JSONStorage(
-            base_dir=ValidationLayer.ALLOWED_BASE_DIR / "storage"
+        self.storage = storage or create_storage(
+            base_dir=ValidationLayer.ALLOWED_BASE_DIR / "storage",
+            cache=get_read_cache(),
         )
 
     # --- Interface pública obrigatória -------------------------------------------------
@@ -41,24 +96,44 @@ class BaseAdapter(ABC):
     @classmethod
     def detect(cls) -> bool:
         """Verifica se o binário do gestor está disponível no sistema."""
-        return shutil.which(cls.executable_name) is not None
+        return cls.resolve_executable() is not None
+
+    @classmethod
+    def resolve_executable(cls) -> Optional[str]:
+        """Caminho do binário do gestor, resolvido através do índice do PATH."""
+        return get_path_index().which(cls.executable_name)
 
     @classmethod
     def get_version(cls) -> Optional[str]:
-        """Obtém a versão instalada do gestor (se disponível)."""
+        """Obtém a versão instalada do gestor (se disponível).
+
+        O resultado é reutilizado da cache persistente enquanto o binário
+        resolvido mantiver o mesmo tamanho e mtime.
+        """
         if not cls.detect():
             return None
 
+        cache = get_version_cache()
+        executable = cls.resolve_executable()
+        binary = cache.binary_key(executable, cls.version_args) if executable else None
+        if binary is not None:
+            cached = cache.get(binary)
+            if cached is not None:
+                return cached
+
         try:
             result = cls.command_executor.run(
                 [cls.executable_name, *cls.version_args],
                 timeout=cls.command_timeout,
             )
             output = result.stdout.strip() or result.stderr.strip()
-            return output or None
         except (CommandTimeoutError, CommandExecutionError):
             return None
 
+        if output and binary is not None:
+            cache.set(binary, output)
+        return output or None
+
     @abstractmethod
     def list_packages(self) -> List[Dict[str, Any]]:
         """Retorna lista de pacotes instalados."""
@@ -71,6 +146,121 @@ class BaseAdapter(ABC):
     def export_manifest(self) -> Dict[str, Any]:
         """Exporta manifest/instantâneo no formato do gestor."""
 
+    # --- Interface assíncrona ------------------------------------------------------------
+    #
+    # Implementações padrão correm o método síncrono numa thread; os adapters
+    # concretos sobrescrevem-nas com execução nativa via `_run_operation_async`.
+
+    async def list_packages_async(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.list_packages)
+
+    async def uninstall_async(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.uninstall, package, force)
+
+    async def scan_vulnerabilities_async(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.scan_vulnerabilities)
+
+    async def get_dependency_tree_async(self, package: Optional[str] = None) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.get_dependency_tree, package)
+
+    async def export_lockfile_async(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.export_lockfile)
+
+    def state_paths(self) -> List[Path]:
+        """Ficheiros/diretórios cujo estado define o inventário do gestor.
+
+        Implementação padrão não declara nenhum, o que desativa a cache de
+        inventário. Subclasses devem sobrescrever.
+        """
+        return []
+
+    def list_packages_cached(self) -> List[Dict[str, Any]]:
+        """Lista pacotes reutilizando o último inventário se o estado não mudou.
+
+        O inventário é guardado no storage do adapter juntamente com a
+        impressão digital dos state_paths e servido até esta mudar.
+        """
+        fingerprint = self.inventory_fingerprint()
+        if fingerprint is None:
+            return self.list_packages()
+
+        try:
+            cached = self.cache_read(self.INVENTORY_CACHE_NAME)
+        except (OSError, ValueError):
+            cached = None
+
+        if isinstance(cached, dict) and cached.get("fingerprint") == fingerprint:
+            return cached.get("packages", [])
+
+        packages = self.list_packages()
+        try:
+            self.cache_write(
+                self.INVENTORY_CACHE_NAME,
+                {"fingerprint": fingerprint, "packages": packages},
+            )
+        except OSError as exc:
+            logger.warning("Falha ao gravar cache de inventário (%s): %s", self.manager_id, exc)
+        return packages
+
+    async def list_packages_cached_async(self) -> List[Dict[str, Any]]:
+        """Versão assíncrona de list_packages_cached.
+
+        Os stats da impressão digital e a leitura da cache correm numa thread;
+        comandos de que os state_paths dependam correm antes como subprocessos
+        assíncronos (ver `_prepare_operation`).
+        """
+        await self._run_operation_async(self._prepare_operation())
+        fingerprint = await asyncio.to_thread(self.inventory_fingerprint)
+        if fingerprint is None:
+            return await self.list_packages_async()
+
+        try:
+            cached = await asyncio.to_thread(self.cache_read, self.INVENTORY_CACHE_NAME)
+        except (OSError, ValueError):
+            cached = None
+
+        if isinstance(cached, dict) and cached.get("fingerprint") == fingerprint:
+            return cached.get("packages", [])
+
+        packages = await self.list_packages_async()
+        try:
+            await asyncio.to_thread(
+                self.cache_write,
+                self.INVENTORY_CACHE_NAME,
+                {"fingerprint": fingerprint, "packages": packages},
+            )
+        except OSError as exc:
+            logger.warning("Falha ao gravar cache de inventário (%s): %s", self.manager_id, exc)
+        return packages
+
+    def _prepare_operation(self) -> Operation[None]:
+        """Resolve, por comandos, o estado de que state_paths depende (ex.: prefixos).
+
+        Implementação padrão não precisa de nenhum comando.
+        """
+        yield from ()
+
+    def inventory_fingerprint(self) -> Optional[List[List[Any]]]:
+        """Impressão digital barata dos state_paths (mtime, tamanho, links, inode).
+
+        Devolve None quando o adapter não declara state_paths.
+        """
+        paths = self.state_paths()
+        if not paths:
+            return None
+
+        fingerprint: List[List[Any]] = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                fingerprint.append([str(path), None])
+                continue
+            fingerprint.append(
+                [str(path), stat.st_mtime_ns, stat.st_size, stat.st_nlink, stat.st_ino]
+            )
+        return fingerprint
+
     def get_dependency_tree(self, package: Optional[str] = None) -> Dict[str, Any]:
         """Obtém árvore de dependências de um pacote específico ou de todos.
 
@@ -151,6 +341,171 @@ class BaseAdapter(ABC):
             timeout=timeout or self.command_timeout,
         )
 
+    def command(
+        self,
+        *args: str,
+        timeout: Optional[int] = None,
+        check: bool = False,
+    ) -> CommandRequest:
+        """Cria pedido de comando do gestor para uso dentro de uma operação."""
+        return CommandRequest(self.build_command(*args), timeout, check)
+
+    @classmethod
+    def _run_operation(cls, operation: Operation[T]) -> T:
+        """Conduz uma operação executando os comandos de forma síncrona."""
+        try:
+            request = next(operation)
+            while True:
+                try:
+                    result = cls.command_executor.run(
+                        request.command,
+                        timeout=request.timeout or cls.command_timeout,
+                        check=request.check,
+                    )
+                except (CommandTimeoutError, CommandExecutionError) as exc:
+                    request = operation.throw(exc)
+                else:
+                    request = operation.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    @classmethod
+    async def _run_operation_async(cls, operation: Operation[T]) -> T:
+        """Conduz uma operação com subprocessos assíncronos.
+
+        O código da operação entre comandos (leituras de disco, parsing) corre
+        numa thread, para não bloquear o event loop.
+        """
+        step = await asyncio.to_thread(_resume, operation)
+        while not isinstance(step, _Finished):
+            try:
+                result = await cls.command_executor.run_process(
+                    step.command,
+                    timeout=step.timeout or cls.command_timeout,
+                    check=step.check,
+                )
+            except (CommandTimeoutError, CommandExecutionError) as exc:
+                step = await asyncio.to_thread(_resume, operation, error=exc)
+            else:
+                step = await asyncio.to_thread(_resume, operation, result)
+        return step.value
+
+    # --- Desinstalação em lote -----------------------------------------------------------
+
+    def uninstall_many(self, packages: List[str], force: bool = False) -> Dict[str, Any]:
+        """Remove vários pacotes, em blocos de UNINSTALL_BATCH_SIZE por processo.
+
+        Gestores sem suporte a lote (ver `_batch_uninstall_args`) recorrem a um
+        uninstall por pacote.
+        """
+        if self._batch_uninstall_args(force) is None:
+            results = [self.uninstall(package, force) for package in packages]
+            return self._sequential_batch_result(packages, force, results)
+        return self._run_operation(self._uninstall_many_operation(packages, force))
+
+    async def uninstall_many_async(self, packages: List[str], force: bool = False) -> Dict[str, Any]:
+        if self._batch_uninstall_args(force) is None:
+            results = [await self.uninstall_async(package, force) for package in packages]
+            return self._sequential_batch_result(packages, force, results)
+        return await self._run_operation_async(self._uninstall_many_operation(packages, force))
+
+    def filter_installed(self, packages: List[str], inventory: List[Dict[str, Any]]) -> List[str]:
+        """Pacotes de `packages` presentes em `inventory`, comparados como o gestor os compara."""
+        installed = {self._package_key(pkg["name"]) for pkg in inventory}
+        return [pkg for pkg in packages if self._package_key(pkg) in installed]
+
+    def _batch_uninstall_args(self, force: bool) -> Optional[List[str]]:
+        """Argumentos do comando de remoção que aceita vários pacotes.
+
+        None (padrão) indica que o gestor não suporta remoção em lote.
+        """
+        return None
+
+    def _package_key(self, name: str) -> str:
+        """Chave usada para comparar nomes pedidos com os do inventário."""
+        return name
+
+    def _uninstall_many_operation(self, packages: List[str], force: bool) -> Operation[Dict[str, Any]]:
+        """Remove pacotes em blocos e apura o resultado pelo diff do inventário.
+
+        O código de saída de um bloco não diz quais pacotes falharam; por isso
+        compara-se o inventário antes e depois. Requer `_list_packages_operation`.
+        """
+        sanitized = list(dict.fromkeys(self._sanitize_package(pkg) for pkg in packages))
+        args = self._batch_uninstall_args(force) or []
+
+        before = yield from self._list_packages_operation()
+        installed = {self._package_key(pkg["name"]) for pkg in before}
+        targets = [pkg for pkg in sanitized if self._package_key(pkg) in installed]
+
+        commands: List[Dict[str, Any]] = []
+        chunk_errors: Dict[str, str] = {}
+        for start in range(0, len(targets), self.UNINSTALL_BATCH_SIZE):
+            chunk = targets[start : start + self.UNINSTALL_BATCH_SIZE]
+            timeout = self.command_timeout + self.UNINSTALL_BATCH_TIMEOUT_PER_PACKAGE * len(chunk)
+            try:
+                result = yield CommandRequest(self.build_package_command(args, chunk), timeout)
+            except (CommandTimeoutError, CommandExecutionError) as exc:
+                logger.error("%s: remoção em lote falhou: %s", self.manager_id, exc)
+                commands.append({"packages": chunk, "error": str(exc)})
+                error = str(exc)
+            else:
+                commands.append(
+                    {
+                        "packages": chunk,
+                        "stdout": result.stdout,
+                        "stderr": result.stderr,
+                        "returncode": result.returncode,
+                    }
+                )
+                error = result.stderr.strip() or f"returncode {result.returncode}"
+            chunk_errors.update((pkg, error) for pkg in chunk)
+
+        remaining = installed
+        if targets:
+            after = yield from self._list_packages_operation()
+            remaining = {self._package_key(pkg["name"]) for pkg in after}
+
+        results: List[Dict[str, Any]] = []
+        for pkg in sanitized:
+            key = self._package_key(pkg)
+            if key not in installed:
+                results.append({"package": pkg, "success": False, "error": "Package not installed"})
+            elif key in remaining:
+                results.append({"package": pkg, "success": False, "error": chunk_errors.get(pkg)})
+            else:
+                results.append({"package": pkg, "success": True})
+
+        return {
+            "manager": self.manager_id,
+            "force": force,
+            "success": all(item["success"] for item in results),
+            "results": results,
+            "commands": commands,
+        }
+
+    def _sequential_batch_result(
+        self,
+        packages: List[str],
+        force: bool,
+        results: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        items = [
+            {
+                "package": result.get("package", package),
+                "success": bool(result.get("success")),
+                **({} if result.get("success") else {"error": result.get("stderr")}),
+            }
+            for package, result in zip(packages, results)
+        ]
+        return {
+            "manager": self.manager_id,
+            "force": force,
+            "success": all(item["success"] for item in items),
+            "results": items,
+            "commands": results,
+        }
+
     def _sanitize_package(self, package: str) -> str:
         """Sanitiza nome de pacote utilizando o ValidationLayer."""
         return ValidationLayer.sanitize_package_name(package)
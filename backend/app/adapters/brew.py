@@ -3,14 +3,29 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import re
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
 
-from app.adapters.base import BaseAdapter
-from app.core.executor import CommandExecutionError
+from app.adapters.base import BaseAdapter, CommandRequest, Operation
+from app.core.executor import CommandExecutionError, CommandTimeoutError
 
 logger = logging.getLogger(__name__)
 
+_VERSION_PART_RE = re.compile(r"(\d+)")
+
+
+def _version_key(version: str) -> List[Any]:
+    """Chave de ordenação natural para diretórios de versão (ex.: 3.10.1_1)."""
+    return [
+        (0, int(part)) if part.isdigit() else (1, part)
+        for part in _VERSION_PART_RE.split(version)
+        if part
+    ]
+
 
 class BrewAdapter(BaseAdapter):
     """Opera sobre o Homebrew (formulae)."""
@@ -21,14 +36,64 @@ class BrewAdapter(BaseAdapter):
 
     LIST_ARGS = ["list", "--json=v2", "--formula"]
     UNINSTALL_ARGS = ["uninstall"]
+    PREFIX_ARGS = ["--prefix"]
+    RECEIPT_FILE = "INSTALL_RECEIPT.json"
+    # Depois de uma resolução falhada, `brew --prefix` só volta a correr após este intervalo.
+    PREFIX_RETRY_SECONDS = 300.0
+
+    _prefix: Optional[Path] = None
+    _prefix_failed_at: Optional[float] = None
 
     def list_packages(self) -> List[Dict[str, Any]]:
+        return self._run_operation(self._list_packages_operation())
+
+    async def list_packages_async(self) -> List[Dict[str, Any]]:
+        return await self._run_operation_async(self._list_packages_operation())
+
+    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return self._run_operation(self._uninstall_operation(package, force))
+
+    async def uninstall_async(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return await self._run_operation_async(self._uninstall_operation(package, force))
+
+    def _prepare_operation(self) -> Operation[None]:
+        yield from self._prefix_operation()
+
+    def state_paths(self) -> List[Path]:
+        prefix = self._resolve_prefix()
+        if prefix is None:
+            return []
+
+        caskroom = prefix / "Caskroom"
+        # Upgrades re-ligam opt/<formula>; casks novos criam versões em Caskroom/<token>.
+        paths = [prefix / "Cellar", prefix / "opt", caskroom]
+        paths.extend(self._version_dirs(caskroom))
+        return paths
+
+    # --- Operações -----------------------------------------------------------------
+
+    def _list_packages_operation(self) -> Operation[List[Dict[str, Any]]]:
+        yield from self._prefix_operation()
+        formulae = self._read_cellar()
+        if formulae is not None:
+            packages = [
+                {
+                    "name": name,
+                    "version": info["version"],
+                    "status": "unknown",
+                    "manager": self.manager_id,
+                    "kind": "formula",
+                }
+                for name, info in sorted(formulae.items())
+            ]
+            packages.extend(self._read_caskroom())
+            return packages
+        return (yield from self._list_packages_subprocess())
+
+    def _list_packages_subprocess(self) -> Operation[List[Dict[str, Any]]]:
+        """Inventário via `brew list`, usado quando o Cellar não é legível."""
         try:
-            result = self.command_executor.run(
-                [self.executable_name, *self.LIST_ARGS],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            result = yield CommandRequest([self.executable_name, *self.LIST_ARGS])
         except CommandExecutionError as exc:
             logger.error("brew list falhou: %s", exc)
             return []
@@ -54,22 +119,25 @@ class BrewAdapter(BaseAdapter):
                     "version": version,
                     "status": "unknown",
                     "manager": self.manager_id,
+                    "kind": "formula",
                 }
             )
         return packages
 
-    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+    def _batch_uninstall_args(self, force: bool) -> Optional[List[str]]:
+        args = list(self.UNINSTALL_ARGS)
+        if force:
+            args.append("--force")
+        return args
+
+    def _uninstall_operation(self, package: str, force: bool = False) -> Operation[Dict[str, Any]]:
         sanitized = self._sanitize_package(package)
         args = list(self.UNINSTALL_ARGS)
         if force:
             args.append("--force")
         command = self.build_package_command(args, [sanitized])
 
-        result = self.command_executor.run(
-            command,
-            timeout=self.command_timeout,
-            check=False,
-        )
+        result = yield CommandRequest(command)
 
         success = result.returncode == 0
         if not success:
@@ -95,3 +163,212 @@ class BrewAdapter(BaseAdapter):
             "generated_at": datetime.now(timezone.utc).isoformat(),
             "packages": packages,
         }
+
+    def get_dependency_tree(self, package: Optional[str] = None) -> Dict[str, Any]:
+        """Árvore construída a partir das runtime_dependencies dos recibos."""
+        if package:
+            package = self._sanitize_package(package)
+
+        formulae = self._read_cellar()
+        if formulae is None:
+            return super().get_dependency_tree(package)
+
+        if package:
+            roots = [package] if package in formulae else []
+        else:
+            roots = sorted(
+                name for name, info in formulae.items() if info["installed_on_request"]
+            ) or sorted(formulae)
+
+        expanded: Set[str] = set()
+        dependencies = {
+            name: self._expand_formula(name, formulae, expanded) for name in roots
+        }
+        return {
+            "manager": self.manager_id,
+            "package": package,
+            "tree": {"name": "Cellar", "dependencies": dependencies},
+            "supported": True,
+        }
+
+    # --- Leitura direta do Cellar/Caskroom -----------------------------------------
+
+    def _expand_formula(
+        self,
+        name: str,
+        formulae: Dict[str, Dict[str, Any]],
+        expanded: Set[str],
+    ) -> Dict[str, Any]:
+        info = formulae.get(name)
+        if info is None:
+            return {"missing": True}
+
+        node: Dict[str, Any] = {"version": info["version"]}
+        if name in expanded:
+            node["deduped"] = True
+            return node
+        expanded.add(name)
+
+        children = {
+            dep: self._expand_formula(dep, formulae, expanded)
+            for dep in info["dependencies"]
+        }
+        if children:
+            node["dependencies"] = children
+        return node
+
+    def _read_cellar(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Lê Cellar/*/*/INSTALL_RECEIPT.json sem arrancar o Ruby do Homebrew.
+
+        Devolve None quando o prefixo não é conhecido ou o Cellar não é legível.
+        """
+        prefix = self._resolve_prefix()
+        if prefix is None:
+            return None
+
+        cellar = prefix / "Cellar"
+        try:
+            formula_dirs = [entry for entry in os.scandir(cellar) if entry.is_dir()]
+        except OSError as exc:
+            logger.debug("Não foi possível ler o Cellar %s: %s", cellar, exc)
+            return None
+
+        formulae: Dict[str, Dict[str, Any]] = {}
+        for entry in formula_dirs:
+            version_dir = self._current_version_dir(prefix, Path(entry.path))
+            if version_dir is None:
+                continue
+
+            receipt = self._read_receipt(version_dir / self.RECEIPT_FILE)
+            # Dependências diretas; as transitivas vêm dos recibos de cada dependência.
+            runtime = [
+                dep for dep in receipt.get("runtime_dependencies") or []
+                if isinstance(dep, dict) and dep.get("declared_directly", True)
+            ]
+            formulae[entry.name] = {
+                "version": version_dir.name,
+                "installed_on_request": bool(receipt.get("installed_on_request")),
+                "dependencies": sorted(
+                    dep["full_name"].rsplit("/", 1)[-1]
+                    for dep in runtime
+                    if dep.get("full_name")
+                ),
+            }
+        return formulae
+
+    def _read_caskroom(self) -> List[Dict[str, Any]]:
+        prefix = self._resolve_prefix()
+        if prefix is None:
+            return []
+
+        casks: List[Dict[str, Any]] = []
+        try:
+            cask_dirs = sorted(
+                (entry.name, Path(entry.path))
+                for entry in os.scandir(prefix / "Caskroom")
+                if entry.is_dir() and not entry.name.startswith(".")
+            )
+        except OSError:
+            return []
+
+        for token, cask_dir in cask_dirs:
+            versions = self._version_dirs(cask_dir)
+            if not versions:
+                continue
+            casks.append(
+                {
+                    "name": token,
+                    "version": versions[-1].name,
+                    "status": "unknown",
+                    "manager": self.manager_id,
+                    "kind": "cask",
+                }
+            )
+        return casks
+
+    def _current_version_dir(self, prefix: Path, formula_dir: Path) -> Optional[Path]:
+        """Versão ligada em opt/<formula>, ou a mais recente instalada."""
+        opt_link = prefix / "opt" / formula_dir.name
+        try:
+            linked = Path(os.readlink(opt_link))
+        except OSError:
+            linked = None
+        if linked is not None:
+            candidate = formula_dir / linked.name
+            if candidate.is_dir():
+                return candidate
+
+        versions = self._version_dirs(formula_dir)
+        return versions[-1] if versions else None
+
+    @staticmethod
+    def _version_dirs(parent: Path) -> List[Path]:
+        try:
+            dirs = [
+                Path(entry.path)
+                for entry in os.scandir(parent)
+                if entry.is_dir() and not entry.name.startswith(".")
+            ]
+        except OSError:
+            return []
+        return sorted(dirs, key=lambda path: _version_key(path.name))
+
+    @staticmethod
+    def _read_receipt(path: Path) -> Dict[str, Any]:
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @classmethod
+    def _resolve_prefix(cls) -> Optional[Path]:
+        """Resolve (uma vez) o prefixo do Homebrew, de forma síncrona."""
+        return cls._run_operation(cls._prefix_operation())
+
+    @classmethod
+    def _prefix_operation(cls) -> Operation[Optional[Path]]:
+        """Resolve (uma vez) o prefixo do Homebrew.
+
+        Ordem: HOMEBREW_PREFIX, localização do executável e `brew --prefix`.
+        Uma falha também fica em cache durante PREFIX_RETRY_SECONDS.
+        """
+        if cls._prefix is not None:
+            return cls._prefix
+        failed_at = cls._prefix_failed_at
+        if failed_at is not None and time.monotonic() - failed_at < cls.PREFIX_RETRY_SECONDS:
+            return None
+
+        prefix: Optional[Path] = None
+        env_prefix = os.environ.get("HOMEBREW_PREFIX")
+        if env_prefix:
+            prefix = Path(env_prefix)
+        else:
+            prefix = cls._prefix_from_executable()
+
+        if prefix is None:
+            try:
+                result = yield CommandRequest([cls.executable_name, *cls.PREFIX_ARGS])
+                output = (result.stdout or "").strip()
+                if result.returncode == 0 and output:
+                    prefix = Path(output)
+            except (CommandExecutionError, CommandTimeoutError) as exc:
+                logger.error("brew --prefix falhou: %s", exc)
+
+        cls._prefix = prefix
+        cls._prefix_failed_at = time.monotonic() if prefix is None else None
+        return prefix
+
+    @classmethod
+    def _prefix_from_executable(cls) -> Optional[Path]:
+        """Deriva o prefixo de <prefix>/bin/brew (ou <prefix>/Homebrew/bin/brew)."""
+        executable = cls.resolve_executable()
+        if not executable:
+            return None
+
+        for bin_dir in (Path(executable).parent, Path(executable).resolve().parent):
+            for candidate in (bin_dir.parent, bin_dir.parent.parent):
+                if (candidate / "Cellar").is_dir():
+                    return candidate
+        return None
@@ -0,0 +1,102 @@
+"""Descoberta concorrente de gestores de pacotes."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from .base import BaseAdapter
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_TIMEOUT = 5.0
+
+# Executor dedicado: um `--version` pendurado não ocupa o pool por omissão do loop.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="discovery")
+
+# Chamadas em curso por (adapter, método). Um timeout não cancela a thread, por
+# isso uma chamada pendurada é reaproveitada em vez de ocupar mais threads do pool.
+_inflight: Dict[Tuple[Type[BaseAdapter], str], "Future[Any]"] = {}
+_inflight_lock = threading.Lock()
+
+
+@dataclass
+class DetectedManager:
+    """Gestor detetado e respetiva versão (None se indisponível)."""
+
+    adapter: Type[BaseAdapter]
+    version: Optional[str]
+
+
+def _submit(adapter_cls: Type[BaseAdapter], method: str) -> "Future[Any]":
+    """Submete `adapter_cls.<method>` ao pool, ou devolve a chamada ainda em curso."""
+    key = (adapter_cls, method)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future
+        future = _executor.submit(getattr(adapter_cls, method))
+        _inflight[key] = future
+    future.add_done_callback(lambda done: _forget(key, done))
+    return future
+
+
+def _forget(key: Tuple[Type[BaseAdapter], str], future: "Future[Any]") -> None:
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+async def _call(adapter_cls: Type[BaseAdapter], method: str, timeout: float) -> Any:
+    # shield: o timeout de um chamador não cancela a chamada partilhada pelos outros.
+    future = asyncio.wrap_future(_submit(adapter_cls, method))
+    return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+
+
+async def _probe(
+    adapter_cls: Type[BaseAdapter],
+    timeout: float,
+) -> Optional[DetectedManager]:
+    try:
+        detected = await _call(adapter_cls, "detect", timeout)
+    except asyncio.TimeoutError:
+        # Sem resposta não se sabe se está instalado: listado, mas sem versão.
+        logger.warning("Deteção de %s excedeu %ss", adapter_cls.manager_id, timeout)
+        return DetectedManager(adapter=adapter_cls, version=None)
+
+    if not detected:
+        return None
+
+    try:
+        version = await _call(adapter_cls, "get_version", timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Versão de %s excedeu %ss", adapter_cls.manager_id, timeout)
+        version = None
+    return DetectedManager(adapter=adapter_cls, version=version)
+
+
+async def discover_managers(
+    adapters: Sequence[Type[BaseAdapter]],
+    timeout: Optional[float] = None,
+) -> List[DetectedManager]:
+    """Deteta todos os adapters em paralelo, fora do event loop.
+
+    Cada adapter tem o seu próprio timeout; gestores que não respondem a
+    tempo aparecem sem versão em vez de atrasar os restantes. Enquanto uma
+    chamada a um adapter não terminar, as descobertas seguintes esperam por
+    ela em vez de a repetir. A ordem de `adapters` é preservada.
+    """
+    timeout = timeout or DISCOVERY_TIMEOUT
+    results = await asyncio.gather(*(_probe(cls, timeout) for cls in adapters))
+    return [result for result in results if result is not None]
+
+
+def discover_managers_sync(
+    adapters: Sequence[Type[BaseAdapter]],
+    timeout: Optional[float] = None,
+) -> List[DetectedManager]:
+    """Versão síncrona para a CLI."""
+    return asyncio.run(discover_managers(adapters, timeout))
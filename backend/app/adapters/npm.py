@@ -3,16 +3,139 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from app.adapters.base import BaseAdapter
-from app.core.executor import CommandExecutionError
+from app.adapters.base import BaseAdapter, CommandRequest, Operation
+from app.core.executor import CommandExecutionError, CommandTimeoutError
 from app.core.validation import InvalidPackageNameError, ValidationLayer
 
 logger = logging.getLogger(__name__)
 
 
+class _GlobalTree:
+    """Grafo de dependências global construído a partir do lockfile oculto.
+
+    As chaves de `packages` são localizações relativas ao pai de node_modules
+    (ex.: "node_modules/a/node_modules/b"), tal como o npm as escreve. Entradas
+    ausentes do lockfile são lidas do package.json em disco.
+    """
+
+    def __init__(self, modules_dir: Path, packages: Dict[str, Any]) -> None:
+        self.root = modules_dir.parent
+        self.packages = packages
+        self._disk_nodes: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._full: Optional[Dict[str, Any]] = None
+
+    def render(self, package: Optional[str] = None) -> Dict[str, Any]:
+        """Devolve a árvore no formato de `npm list --json`."""
+        if package is None:
+            if self._full is None:
+                self._full = self._render_roots(self._top_level())
+            return self._full
+
+        roots = []
+        for name, location in self._top_level():
+            subtree = self._expand(location, set())
+            if name == package or self._contains(subtree, package):
+                roots.append((name, location))
+        return self._render_roots(roots)
+
+    def _render_roots(self, roots: List[Tuple[str, str]]) -> Dict[str, Any]:
+        expanded: Set[str] = set()
+        dependencies = {name: self._expand(location, expanded) for name, location in roots}
+        return {"name": self.root.name, "dependencies": dependencies}
+
+    def _top_level(self) -> List[Tuple[str, str]]:
+        names = set()
+        for location in self.packages:
+            name = location[len("node_modules/"):]
+            if location.startswith("node_modules/") and "/node_modules/" not in name:
+                names.add(name)
+        try:
+            disk_dirs = NpmAdapter._package_dirs(self.root / "node_modules")
+        except OSError:
+            disk_dirs = []
+        names.update(name for name, _ in disk_dirs)
+        return [
+            (name, f"node_modules/{name}")
+            for name in sorted(names)
+            if self._node(f"node_modules/{name}") is not None
+        ]
+
+    def _node(self, location: str) -> Optional[Dict[str, Any]]:
+        entry = self.packages.get(location)
+        if isinstance(entry, dict) and entry.get("link") and entry.get("resolved"):
+            entry = self.packages.get(entry["resolved"]) or self._disk_node(location)
+
+        # O topo é validado contra o package.json: o lockfile pode estar atrasado.
+        if location.count("node_modules/") == 1:
+            disk = self._disk_node(location)
+            if disk is None:
+                return None
+            if not isinstance(entry, dict) or entry.get("version") != disk.get("version"):
+                return disk
+
+        if isinstance(entry, dict):
+            return entry
+        return self._disk_node(location)
+
+    def _disk_node(self, location: str) -> Optional[Dict[str, Any]]:
+        if location not in self._disk_nodes:
+            self._disk_nodes[location] = NpmAdapter._read_package_json(self.root / location)
+        return self._disk_nodes[location]
+
+    def _resolve(self, parent: str, dependency: str) -> Optional[str]:
+        """Resolve uma dependência seguindo o algoritmo de resolução do Node."""
+        location = parent
+        while True:
+            prefix = f"{location}/" if location else ""
+            candidate = f"{prefix}node_modules/{dependency}"
+            if self._node(candidate) is not None:
+                return candidate
+            if not location:
+                return None
+            index = location.rfind("/node_modules/")
+            location = location[:index] if index != -1 else ""
+
+    def _expand(self, location: str, expanded: Set[str]) -> Dict[str, Any]:
+        node = self._node(location) or {}
+        result: Dict[str, Any] = {"version": node.get("version")}
+        if node.get("resolved"):
+            result["resolved"] = node["resolved"]
+        if location in expanded:
+            result["deduped"] = True
+            return result
+        expanded.add(location)
+
+        dependencies: Dict[str, Any] = {}
+        for field, optional in (("dependencies", False), ("optionalDependencies", True)):
+            for name, spec in sorted((node.get(field) or {}).items()):
+                child = self._resolve(location, name)
+                if child is not None:
+                    dependencies[name] = self._expand(child, expanded)
+                elif not optional:
+                    dependencies[name] = {"required": spec, "missing": True}
+        if dependencies:
+            result["dependencies"] = dependencies
+        return result
+
+    @staticmethod
+    def _contains(node: Dict[str, Any], package: str) -> bool:
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for name, child in (current.get("dependencies") or {}).items():
+                if name == package:
+                    return True
+                stack.append(child)
+        return False
+
+
 class NpmAdapter(BaseAdapter):
     """Opera sobre o gestor npm (global)."""
 
@@ -22,14 +145,80 @@ class NpmAdapter(BaseAdapter):
 
     LIST_ARGS = ["list", "-g", "--depth=0", "--json"]
     UNINSTALL_ARGS = ["uninstall", "-g"]
+    PREFIX_ARGS = ["prefix", "-g"]
+    HIDDEN_LOCKFILE = ".package-lock.json"
+    READ_WORKERS = 8
+    # Depois de uma resolução falhada, `npm prefix -g` só volta a correr após este intervalo.
+    PREFIX_RETRY_SECONDS = 300.0
+
+    _global_prefix: Optional[Path] = None
+    _global_prefix_failed_at: Optional[float] = None
+    _tree_cache: Dict[str, Tuple[Tuple[Any, ...], _GlobalTree]] = {}
 
     def list_packages(self) -> List[Dict[str, Any]]:
+        return self._run_operation(self._list_packages_operation())
+
+    async def list_packages_async(self) -> List[Dict[str, Any]]:
+        return await self._run_operation_async(self._list_packages_operation())
+
+    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return self._run_operation(self._uninstall_operation(package, force))
+
+    async def uninstall_async(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return await self._run_operation_async(self._uninstall_operation(package, force))
+
+    def get_dependency_tree(self, package: Optional[str] = None) -> Dict[str, Any]:
+        return self._run_operation(self._dependency_tree_operation(package))
+
+    async def get_dependency_tree_async(self, package: Optional[str] = None) -> Dict[str, Any]:
+        return await self._run_operation_async(self._dependency_tree_operation(package))
+
+    def scan_vulnerabilities(self) -> Dict[str, Any]:
+        return self._run_operation(self._scan_vulnerabilities_operation())
+
+    async def scan_vulnerabilities_async(self) -> Dict[str, Any]:
+        return await self._run_operation_async(self._scan_vulnerabilities_operation())
+
+    def export_lockfile(self) -> Dict[str, Any]:
+        return self._run_operation(self._export_lockfile_operation())
+
+    async def export_lockfile_async(self) -> Dict[str, Any]:
+        return await self._run_operation_async(self._export_lockfile_operation())
+
+    def _prepare_operation(self) -> Operation[None]:
+        yield from self._global_prefix_operation()
+
+    def state_paths(self) -> List[Path]:
+        modules_dir = self._global_modules_dir()
+        if modules_dir is None:
+            return []
+
+        paths = [modules_dir, modules_dir / self.HIDDEN_LOCKFILE]
         try:
-            result = self.command_executor.run(
-                [self.executable_name, *self.LIST_ARGS],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            with os.scandir(modules_dir) as entries:
+                # Pacotes @scope/x acrescentados não alteram a mtime do diretório de topo.
+                paths.extend(
+                    Path(entry.path)
+                    for entry in entries
+                    if entry.name.startswith("@") and entry.is_dir()
+                )
+        except OSError:
+            pass
+        return paths
+
+    # --- Operações -----------------------------------------------------------------
+
+    def _list_packages_operation(self) -> Operation[List[Dict[str, Any]]]:
+        yield from self._global_prefix_operation()
+        packages = self._scan_global_modules()
+        if packages is not None:
+            return packages
+        return (yield from self._list_packages_subprocess())
+
+    def _list_packages_subprocess(self) -> Operation[List[Dict[str, Any]]]:
+        """Inventário via `npm list -g`, usado quando node_modules não é legível."""
+        try:
+            result = yield CommandRequest([self.executable_name, *self.LIST_ARGS])
         except CommandExecutionError as exc:
             logger.error("npm list failed: %s", exc)
             return []
@@ -58,18 +247,20 @@ class NpmAdapter(BaseAdapter):
             )
         return packages
 
-    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+    def _batch_uninstall_args(self, force: bool) -> Optional[List[str]]:
+        args = list(self.UNINSTALL_ARGS)
+        if force:
+            args.append("--force")
+        return args
+
+    def _uninstall_operation(self, package: str, force: bool = False) -> Operation[Dict[str, Any]]:
         sanitized = self._sanitize_package(package)
         args = list(self.UNINSTALL_ARGS)
         if force:
             args.append("--force")
         command = self.build_package_command(args, [sanitized])
 
-        result = self.command_executor.run(
-            command,
-            timeout=self.command_timeout,
-            check=False,
-        )
+        result = yield CommandRequest(command)
 
         success = result.returncode == 0
         if not success:
@@ -96,19 +287,28 @@ class NpmAdapter(BaseAdapter):
             "packages": packages,
         }
 
-    def get_dependency_tree(self, package: Optional[str] = None) -> Dict[str, Any]:
-        """Obtém árvore de dependências usando npm list."""
+    def _dependency_tree_operation(self, package: Optional[str] = None) -> Operation[Dict[str, Any]]:
+        """Obtém árvore de dependências a partir do lockfile oculto (ou npm list)."""
+        if package:
+            package = self._sanitize_package(package)
+
+        yield from self._global_prefix_operation()
+        global_tree = self._load_global_tree()
+        if global_tree is not None:
+            return {
+                "manager": self.manager_id,
+                "package": package,
+                "tree": global_tree.render(package),
+                "supported": True,
+            }
+
         try:
             args = ["list", "-g", "--json", "--depth", "3"]
             if package:
                 sanitized = self._sanitize_package(package)
                 args.append(sanitized)
 
-            result = self.command_executor.run(
-                [self.executable_name, *args],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            result = yield CommandRequest([self.executable_name, *args])
 
             if result.returncode == 0 and result.stdout:
                 data = json.loads(result.stdout)
@@ -128,14 +328,18 @@ class NpmAdapter(BaseAdapter):
                 "error": str(exc),
             }
 
-    def scan_vulnerabilities(self) -> Dict[str, Any]:
+        return {
+            "manager": self.manager_id,
+            "package": package,
+            "tree": {},
+            "supported": True,
+            "error": "Failed to get dependency tree",
+        }
+
+    def _scan_vulnerabilities_operation(self) -> Operation[Dict[str, Any]]:
         """Escaneia vulnerabilidades usando npm audit."""
         try:
-            result = self.command_executor.run(
-                [self.executable_name, "audit", "--json"],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            result = yield CommandRequest([self.executable_name, "audit", "--json"])
 
             if result.stdout:
                 data = json.loads(result.stdout)
@@ -168,14 +372,22 @@ class NpmAdapter(BaseAdapter):
                 "error": str(exc),
             }
 
-    def export_lockfile(self) -> Dict[str, Any]:
+    def _export_lockfile_operation(self) -> Operation[Dict[str, Any]]:
         """Exporta package-lock.json global."""
+        yield from self._global_prefix_operation()
+        global_tree = self._load_global_tree()
+        if global_tree is not None:
+            return {
+                "manager": self.manager_id,
+                "lockfile": global_tree.render(),
+                "supported": True,
+                "format": "npm-list-json",
+            }
+
         try:
             # npm list --json já fornece informação similar ao lockfile
-            result = self.command_executor.run(
-                [self.executable_name, "list", "-g", "--json", "--depth", "3"],
-                timeout=self.command_timeout,
-                check=False,
+            result = yield CommandRequest(
+                [self.executable_name, "list", "-g", "--json", "--depth", "3"]
             )
 
             if result.returncode == 0 and result.stdout:
@@ -196,3 +408,206 @@ class NpmAdapter(BaseAdapter):
             "supported": True,
             "error": "Failed to export lockfile",
         }
+
+    # --- Leitura direta do node_modules global -------------------------------------
+
+    def _load_global_tree(self) -> Optional[_GlobalTree]:
+        """Carrega o lockfile oculto, reutilizando-o enquanto nada mudar em disco.
+
+        A chave de validação é dada por `_tree_key`.
+        """
+        modules_dir = self._global_modules_dir()
+        if modules_dir is None:
+            return None
+
+        lockfile_path = modules_dir / self.HIDDEN_LOCKFILE
+        try:
+            key = self._tree_key(modules_dir, lockfile_path)
+        except OSError:
+            return None
+
+        cache_key = str(modules_dir)
+        cached = self._tree_cache.get(cache_key)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        try:
+            with open(lockfile_path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError) as exc:
+            logger.warning("Hidden lockfile unreadable (%s): %s", lockfile_path, exc)
+            return None
+
+        packages = data.get("packages") if isinstance(data, dict) else None
+        if not isinstance(packages, dict):
+            return None
+
+        global_tree = _GlobalTree(modules_dir, packages)
+        self._tree_cache[cache_key] = (key, global_tree)
+        return global_tree
+
+    def _tree_key(self, modules_dir: Path, lockfile_path: Path) -> Tuple[Any, ...]:
+        """Chave de validação da árvore global em cache.
+
+        Combina a mtime do lockfile, a do node_modules (muda quando pacotes de
+        topo são adicionados ou removidos) e a mtime e o tamanho do package.json
+        de cada pacote de topo: uma reinstalação no lugar, ou um pacote novo
+        dentro de um @scope, não altera as mtimes dos diretórios. Cada pedido
+        custa um stat por pacote de topo, em vez de reler o lockfile.
+        """
+        manifests = []
+        for name, path in self._package_dirs(modules_dir):
+            try:
+                stat = (path / "package.json").stat()
+            except OSError:
+                continue
+            manifests.append((name, stat.st_mtime_ns, stat.st_size))
+        return (
+            lockfile_path.stat().st_mtime_ns,
+            modules_dir.stat().st_mtime_ns,
+            tuple(sorted(manifests)),
+        )
+
+    def _scan_global_modules(self) -> Optional[List[Dict[str, Any]]]:
+        """Lê os package.json de topo do node_modules global sem invocar o npm.
+
+        Devolve None quando o diretório não pode ser lido.
+        """
+        modules_dir = self._global_modules_dir()
+        if modules_dir is None:
+            return None
+
+        try:
+            package_dirs = self._package_dirs(modules_dir)
+        except OSError as exc:
+            logger.debug("Não foi possível ler %s: %s", modules_dir, exc)
+            return None
+
+        with ThreadPoolExecutor(max_workers=self.READ_WORKERS) as pool:
+            manifests = list(
+                pool.map(self._read_package_json, [path for _, path in package_dirs])
+            )
+
+        packages: List[Dict[str, Any]] = []
+        for (name, _), manifest in zip(package_dirs, manifests):
+            if manifest is None:
+                continue
+            packages.append(
+                {
+                    "name": manifest.get("name") or name,
+                    "version": manifest.get("version"),
+                    "status": "unknown",
+                    "manager": self.manager_id,
+                }
+            )
+        packages.sort(key=lambda pkg: pkg["name"])
+        return packages
+
+    @staticmethod
+    def _package_dirs(modules_dir: Path) -> List[Tuple[str, Path]]:
+        """Lista (nome, caminho) dos pacotes de topo, incluindo @scope/pacote."""
+        package_dirs: List[Tuple[str, Path]] = []
+        with os.scandir(modules_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_dir():
+                    continue
+                if not entry.name.startswith("@"):
+                    package_dirs.append((entry.name, Path(entry.path)))
+                    continue
+                try:
+                    with os.scandir(entry.path) as scoped_entries:
+                        for scoped in scoped_entries:
+                            if scoped.is_dir() and not scoped.name.startswith("."):
+                                package_dirs.append(
+                                    (f"{entry.name}/{scoped.name}", Path(scoped.path))
+                                )
+                except OSError as exc:
+                    logger.debug("Não foi possível ler scope %s: %s", entry.path, exc)
+        return package_dirs
+
+    @staticmethod
+    def _read_package_json(path: Path) -> Optional[Dict[str, Any]]:
+        """Lê package.json de um pacote, ignorando ficheiros ausentes ou inválidos."""
+        try:
+            with open(path / "package.json", "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def _global_modules_dir(self) -> Optional[Path]:
+        """Diretório node_modules global derivado do prefixo."""
+        prefix = self._resolve_global_prefix()
+        if prefix is None:
+            return None
+        if os.name == "nt":
+            return prefix / "node_modules"
+        return prefix / "lib" / "node_modules"
+
+    @classmethod
+    def _resolve_global_prefix(cls) -> Optional[Path]:
+        """Resolve (uma vez) o prefixo global do npm, de forma síncrona."""
+        return cls._run_operation(cls._global_prefix_operation())
+
+    @classmethod
+    def _global_prefix_operation(cls) -> Operation[Optional[Path]]:
+        """Resolve (uma vez) o prefixo global do npm.
+
+        Ordem: variável npm_config_prefix, `prefix=` no ~/.npmrc, localização
+        do próprio executável e, por último, `npm prefix -g`. Uma falha também
+        fica em cache durante PREFIX_RETRY_SECONDS, para não lançar o
+        subprocesso em cada pedido quando o npm não está disponível.
+        """
+        if cls._global_prefix is not None:
+            return cls._global_prefix
+        failed_at = cls._global_prefix_failed_at
+        if failed_at is not None and time.monotonic() - failed_at < cls.PREFIX_RETRY_SECONDS:
+            return None
+
+        prefix = cls._prefix_from_config() or cls._prefix_from_executable()
+        if prefix is None:
+            try:
+                result = yield CommandRequest([cls.executable_name, *cls.PREFIX_ARGS])
+                output = (result.stdout or "").strip()
+                if result.returncode == 0 and output:
+                    prefix = Path(output)
+            except (CommandExecutionError, CommandTimeoutError) as exc:
+                logger.error("npm prefix -g failed: %s", exc)
+
+        cls._global_prefix = prefix
+        cls._global_prefix_failed_at = time.monotonic() if prefix is None else None
+        return prefix
+
+    @staticmethod
+    def _prefix_from_config() -> Optional[Path]:
+        for key in ("npm_config_prefix", "NPM_CONFIG_PREFIX"):
+            value = os.environ.get(key)
+            if value:
+                return Path(value).expanduser()
+
+        npmrc = Path.home() / ".npmrc"
+        try:
+            with open(npmrc, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    key, sep, value = line.partition("=")
+                    if sep and key.strip() == "prefix" and value.strip():
+                        return Path(value.strip()).expanduser()
+        except OSError:
+            pass
+        return None
+
+    @classmethod
+    def _prefix_from_executable(cls) -> Optional[Path]:
+        """Deriva o prefixo de <prefix>/lib/node_modules/npm/bin/npm-cli.js."""
+        executable = cls.resolve_executable()
+        if not executable:
+            return None
+
+        resolved = Path(executable).resolve()
+        for parent in resolved.parents:
+            if parent.name == "node_modules":
+                modules_parent = parent.parent
+                if os.name != "nt" and modules_parent.name == "lib":
+                    return modules_parent.parent
+                return modules_parent
+        return None
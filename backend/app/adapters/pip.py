@@ -3,14 +3,64 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import re
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-from app.adapters.base import BaseAdapter
+from app.adapters.base import BaseAdapter, CommandRequest, Operation
 from app.core.executor import CommandExecutionError
+from app.core.path_index import get_path_index
 
 logger = logging.getLogger(__name__)
 
+_NAME_NORMALIZE_RE = re.compile(r"[-_.]+")
+_PYTHON_VERSION_RE = re.compile(r"python(\d+\.\d+)")
+
+
+def _canonical_name(name: str) -> str:
+    """Normaliza nomes de distribuições segundo a PEP 503."""
+    return _NAME_NORMALIZE_RE.sub("-", name).lower()
+
+
+def _read_metadata_headers(path: Path) -> Dict[str, str]:
+    """Lê apenas o cabeçalho de um METADATA/PKG-INFO (até à primeira linha vazia)."""
+    headers: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            if not line.strip():
+                break
+            if line[0] in " \t" or ":" not in line:
+                continue
+            key, _, value = line.partition(":")
+            headers.setdefault(key.strip(), value.strip())
+            if "Name" in headers and "Version" in headers:
+                break
+    return headers
+
+
+def _read_distribution(entry: os.DirEntry) -> Optional[Tuple[str, str]]:
+    """Extrai (nome, versão) de uma entrada *.dist-info ou *.egg-info."""
+    path = Path(entry.path)
+    if entry.name.endswith(".dist-info"):
+        metadata_path = path / "METADATA"
+    elif entry.name.endswith(".egg-info"):
+        metadata_path = path / "PKG-INFO" if entry.is_dir() else path
+    else:
+        return None
+
+    try:
+        headers = _read_metadata_headers(metadata_path)
+    except OSError:
+        return None
+
+    name = headers.get("Name")
+    version = headers.get("Version")
+    if not name or not version:
+        return None
+    return name, version
+
 
 class PipAdapter(BaseAdapter):
     """Opera sobre o gestor pip global."""
@@ -21,14 +71,63 @@ class PipAdapter(BaseAdapter):
 
     LIST_ARGS = ["list", "--format=json"]
     UNINSTALL_ARGS = ["uninstall"]
+    FREEZE_EXCLUDES = {"pip", "setuptools", "wheel", "distribute"}
+
+    _site_packages_cache: Dict[str, List[Path]] = {}
 
     def list_packages(self) -> List[Dict[str, Any]]:
+        return self._run_operation(self._list_packages_operation())
+
+    async def list_packages_async(self) -> List[Dict[str, Any]]:
+        return await self._run_operation_async(self._list_packages_operation())
+
+    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return self._run_operation(self._uninstall_operation(package, force))
+
+    async def uninstall_async(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return await self._run_operation_async(self._uninstall_operation(package, force))
+
+    def get_dependency_tree(self, package: Optional[str] = None) -> Dict[str, Any]:
+        return self._run_operation(self._dependency_tree_operation(package))
+
+    async def get_dependency_tree_async(self, package: Optional[str] = None) -> Dict[str, Any]:
+        return await self._run_operation_async(self._dependency_tree_operation(package))
+
+    def scan_vulnerabilities(self) -> Dict[str, Any]:
+        return self._run_operation(self._scan_vulnerabilities_operation())
+
+    async def scan_vulnerabilities_async(self) -> Dict[str, Any]:
+        return await self._run_operation_async(self._scan_vulnerabilities_operation())
+
+    def export_lockfile(self) -> Dict[str, Any]:
+        return self._run_operation(self._export_lockfile_operation())
+
+    async def export_lockfile_async(self) -> Dict[str, Any]:
+        return await self._run_operation_async(self._export_lockfile_operation())
+
+    def state_paths(self) -> List[Path]:
+        return list(self._site_packages_dirs())
+
+    # --- Operações -----------------------------------------------------------------
+
+    def _list_packages_operation(self) -> Operation[List[Dict[str, Any]]]:
+        distributions = self._read_distributions()
+        if distributions is not None:
+            return [
+                {
+                    "name": name,
+                    "version": version,
+                    "status": "unknown",
+                    "manager": self.manager_id,
+                }
+                for name, version in distributions
+            ]
+        return (yield from self._list_packages_subprocess())
+
+    def _list_packages_subprocess(self) -> Operation[List[Dict[str, Any]]]:
+        """Inventário via `pip list`, usado quando o ambiente não é legível."""
         try:
-            result = self.command_executor.run(
-                [self.executable_name, *self.LIST_ARGS],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            result = yield CommandRequest([self.executable_name, *self.LIST_ARGS])
         except CommandExecutionError as exc:
             logger.error("pip list falhou: %s", exc)
             return []
@@ -55,17 +154,19 @@ class PipAdapter(BaseAdapter):
             )
         return packages
 
-    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+    def _batch_uninstall_args(self, force: bool) -> Optional[List[str]]:
+        return [*self.UNINSTALL_ARGS, "-y"]
+
+    def _package_key(self, name: str) -> str:
+        return _canonical_name(name)
+
+    def _uninstall_operation(self, package: str, force: bool = False) -> Operation[Dict[str, Any]]:
         sanitized = self._sanitize_package(package)
         args = list(self.UNINSTALL_ARGS)
         args.append("-y")
         command = self.build_package_command(args, [sanitized])
 
-        result = self.command_executor.run(
-            command,
-            timeout=self.command_timeout,
-            check=False,
-        )
+        result = yield CommandRequest(command)
 
         success = result.returncode == 0
         if not success:
@@ -92,22 +193,17 @@ class PipAdapter(BaseAdapter):
             "packages": packages,
         }
 
-    def get_dependency_tree(self, package: Optional[str] = None) -> Dict[str, Any]:
+    def _dependency_tree_operation(self, package: Optional[str] = None) -> Operation[Dict[str, Any]]:
         """Obtém árvore de dependências usando pipdeptree."""
         try:
             # Tenta usar pipdeptree se disponível
-            import shutil
-            if shutil.which("pipdeptree"):
+            if get_path_index().which("pipdeptree"):
                 args = ["--json"]
                 if package:
                     sanitized = self._sanitize_package(package)
                     args.extend(["-p", sanitized])
 
-                result = self.command_executor.run(
-                    ["pipdeptree", *args],
-                    timeout=self.command_timeout,
-                    check=False,
-                )
+                result = yield CommandRequest(["pipdeptree", *args])
 
                 if result.returncode == 0 and result.stdout:
                     data = json.loads(result.stdout)
@@ -121,11 +217,7 @@ class PipAdapter(BaseAdapter):
             # Fallback: pip show
             if package:
                 sanitized = self._sanitize_package(package)
-                result = self.command_executor.run(
-                    [self.executable_name, "show", sanitized],
-                    timeout=self.command_timeout,
-                    check=False,
-                )
+                result = yield CommandRequest([self.executable_name, "show", sanitized])
 
                 if result.returncode == 0:
                     return {
@@ -147,12 +239,11 @@ class PipAdapter(BaseAdapter):
             "error": "Install pipdeptree for dependency tree support",
         }
 
-    def scan_vulnerabilities(self) -> Dict[str, Any]:
+    def _scan_vulnerabilities_operation(self) -> Operation[Dict[str, Any]]:
         """Escaneia vulnerabilidades usando pip-audit."""
         try:
             # Verifica se pip-audit está disponível
-            import shutil
-            if not shutil.which("pip-audit"):
+            if not get_path_index().which("pip-audit"):
                 return {
                     "manager": self.manager_id,
                     "vulnerabilities": [],
@@ -160,10 +251,9 @@ class PipAdapter(BaseAdapter):
                     "error": "pip-audit not installed. Run: pip install pip-audit",
                 }
 
-            result = self.command_executor.run(
+            result = yield CommandRequest(
                 ["pip-audit", "--format=json"],
                 timeout=60,  # Scanning pode demorar
-                check=False,
             )
 
             if result.stdout:
@@ -195,14 +285,24 @@ class PipAdapter(BaseAdapter):
                 "error": str(exc),
             }
 
-    def export_lockfile(self) -> Dict[str, Any]:
+    def _export_lockfile_operation(self) -> Operation[Dict[str, Any]]:
         """Exporta requirements.txt."""
+        distributions = self._read_distributions()
+        if distributions is not None:
+            lines = [
+                f"{name}=={version}"
+                for name, version in sorted(distributions, key=lambda item: item[0].lower())
+                if _canonical_name(name) not in self.FREEZE_EXCLUDES
+            ]
+            return {
+                "manager": self.manager_id,
+                "lockfile": "".join(f"{line}\n" for line in lines),
+                "supported": True,
+                "format": "requirements.txt",
+            }
+
         try:
-            result = self.command_executor.run(
-                [self.executable_name, "freeze"],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            result = yield CommandRequest([self.executable_name, "freeze"])
 
             if result.returncode == 0 and result.stdout:
                 return {
@@ -221,3 +321,104 @@ class PipAdapter(BaseAdapter):
             "supported": True,
             "error": "Failed to export requirements",
         }
+
+    # --- Leitura direta de site-packages -------------------------------------------
+
+    def _read_distributions(self) -> Optional[List[Tuple[str, str]]]:
+        """Lê (nome, versão) diretamente dos metadados em site-packages.
+
+        Devolve None quando nenhum diretório do ambiente alvo pode ser lido,
+        sinalizando que deve ser usado o subprocesso `pip`.
+        """
+        site_dirs = self._site_packages_dirs()
+        if not site_dirs:
+            return None
+
+        seen: Dict[str, Tuple[str, str]] = {}
+        readable = False
+        for site_dir in site_dirs:
+            try:
+                entries = list(os.scandir(site_dir))
+            except OSError as exc:
+                logger.debug("Não foi possível ler %s: %s", site_dir, exc)
+                continue
+
+            readable = True
+            for entry in entries:
+                distribution = _read_distribution(entry)
+                if distribution is None:
+                    continue
+                # O primeiro diretório no sys.path prevalece, tal como no pip.
+                seen.setdefault(_canonical_name(distribution[0]), distribution)
+
+        if not readable:
+            return None
+        return list(seen.values())
+
+    @classmethod
+    def _site_packages_dirs(cls) -> List[Path]:
+        """Resolve os diretórios site-packages do interpretador associado ao pip."""
+        executable = cls.resolve_executable()
+        if not executable:
+            return []
+
+        cached = cls._site_packages_cache.get(executable)
+        if cached is None:
+            cached = cls._discover_site_packages(Path(executable))
+            cls._site_packages_cache[executable] = cached
+        return cached
+
+    @staticmethod
+    def _discover_site_packages(executable: Path) -> List[Path]:
+        """Deriva site-packages a partir da localização do script pip.
+
+        O prefixo é o diretório pai de bin/ (ou Scripts/ no Windows). A versão
+        do Python é obtida da shebang do script quando existem várias.
+        """
+        prefix = executable.parent.parent
+        if os.name == "nt":
+            candidate = prefix / "Lib" / "site-packages"
+            return [candidate] if candidate.is_dir() else []
+
+        candidates = sorted(
+            path for path in prefix.glob("lib/python*/site-packages") if path.is_dir()
+        )
+        if len(candidates) > 1:
+            version = PipAdapter._interpreter_version(executable)
+            candidates = [
+                path for path in candidates if path.parent.name == f"python{version}"
+            ]
+        if len(candidates) != 1:
+            return []
+
+        site_dirs = [candidates[0]]
+        if not (prefix / "pyvenv.cfg").exists():
+            user_site = (
+                Path.home()
+                / ".local"
+                / "lib"
+                / candidates[0].parent.name
+                / "site-packages"
+            )
+            if user_site.is_dir():
+                site_dirs.insert(0, user_site)
+        return site_dirs
+
+    @staticmethod
+    def _interpreter_version(executable: Path) -> Optional[str]:
+        """Extrai a versão X.Y do interpretador indicado na shebang do pip."""
+        try:
+            with open(executable, "r", encoding="utf-8", errors="replace") as handle:
+                shebang = handle.readline()
+        except OSError:
+            return None
+
+        if not shebang.startswith("#!"):
+            return None
+        interpreter = Path(shebang[2:].strip().split()[0])
+        try:
+            interpreter = interpreter.resolve()
+        except OSError:
+            pass
+        match = _PYTHON_VERSION_RE.search(interpreter.name)
+        return match.group(1) if match else None
@@ -3,10 +3,14 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-from app.adapters.base import BaseAdapter
+from app.adapters.base import BaseAdapter, CommandRequest, Operation
 from app.core.executor import CommandExecutionError
 
 logger = logging.getLogger(__name__)
@@ -17,13 +21,60 @@ class PipxAdapter(BaseAdapter):
     display_name = "pipx"
     executable_name = "pipx"
 
+    METADATA_FILE = "pipx_metadata.json"
+    READ_WORKERS = 8
+
+    _venv_cache: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}
+
     def list_packages(self) -> List[Dict[str, Any]]:
+        return self._run_operation(self._list_packages_operation())
+
+    async def list_packages_async(self) -> List[Dict[str, Any]]:
+        return await self._run_operation_async(self._list_packages_operation())
+
+    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return self._run_operation(self._uninstall_operation(package, force))
+
+    async def uninstall_async(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return await self._run_operation_async(self._uninstall_operation(package, force))
+
+    def export_lockfile(self) -> Dict[str, Any]:
+        return self._run_operation(self._export_lockfile_operation())
+
+    async def export_lockfile_async(self) -> Dict[str, Any]:
+        return await self._run_operation_async(self._export_lockfile_operation())
+
+    def state_paths(self) -> List[Path]:
+        pipx_home = self._resolve_pipx_home()
+        if pipx_home is None:
+            return []
+
+        venvs_dir = pipx_home / "venvs"
+        paths = [venvs_dir]
         try:
-            result = self.command_executor.run(
-                [self.executable_name, "list", "--json"],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            with os.scandir(venvs_dir) as entries:
+                # `pipx inject` só altera o metadata do venv, não o diretório venvs.
+                paths.extend(
+                    Path(entry.path) / self.METADATA_FILE
+                    for entry in entries
+                    if entry.is_dir()
+                )
+        except OSError:
+            pass
+        return sorted(paths)
+
+    # --- Operações -----------------------------------------------------------------
+
+    def _list_packages_operation(self) -> Operation[List[Dict[str, Any]]]:
+        packages = self._read_venvs()
+        if packages is not None:
+            return packages
+        return (yield from self._list_packages_subprocess())
+
+    def _list_packages_subprocess(self) -> Operation[List[Dict[str, Any]]]:
+        """Inventário via `pipx list --json`, usado quando PIPX_HOME não é legível."""
+        try:
+            result = yield CommandRequest([self.executable_name, "list", "--json"])
         except CommandExecutionError as exc:
             logger.error("pipx list falhou: %s", exc)
             return []
@@ -54,17 +105,13 @@ class PipxAdapter(BaseAdapter):
                 )
         return packages
 
-    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+    def _uninstall_operation(self, package: str, force: bool = False) -> Operation[Dict[str, Any]]:
         sanitized = self._sanitize_package(package)
         args = ["uninstall", sanitized]
         if force:
             args.append("--force")
 
-        result = self.command_executor.run(
-            [self.executable_name, *args],
-            timeout=self.command_timeout,
-            check=False,
-        )
+        result = yield CommandRequest([self.executable_name, *args])
 
         success = result.returncode == 0
         return {
@@ -84,8 +131,13 @@ class PipxAdapter(BaseAdapter):
             "packages": packages,
         }
 
-    def export_lockfile(self) -> Dict[str, Any]:
-        manifest = self.export_manifest()
+    def _export_lockfile_operation(self) -> Operation[Dict[str, Any]]:
+        packages = yield from self._list_packages_operation()
+        manifest = {
+            "manager": self.manager_id,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "packages": packages,
+        }
         return {
             "manager": self.manager_id,
             "lockfile": manifest,
@@ -93,3 +145,106 @@ class PipxAdapter(BaseAdapter):
             "format": "pipx-list.json",
         }
 
+    # --- Leitura direta dos venvs --------------------------------------------------
+
+    def _read_venvs(self) -> Optional[List[Dict[str, Any]]]:
+        """Lê pipx_metadata.json de cada venv em paralelo.
+
+        Devolve None quando o diretório venvs não existe ou não é legível.
+        """
+        pipx_home = self._resolve_pipx_home()
+        if pipx_home is None:
+            return None
+
+        try:
+            with os.scandir(pipx_home / "venvs") as entries:
+                venv_dirs = sorted(
+                    Path(entry.path) for entry in entries if entry.is_dir()
+                )
+        except OSError as exc:
+            logger.debug("Não foi possível ler venvs do pipx: %s", exc)
+            return None
+
+        with ThreadPoolExecutor(max_workers=self.READ_WORKERS) as pool:
+            results = list(pool.map(self._read_venv, venv_dirs))
+
+        return [record for records in results for record in records]
+
+    def _read_venv(self, venv_dir: Path) -> List[Dict[str, Any]]:
+        """Lê um venv, reutilizando o resultado enquanto a mtime não mudar."""
+        metadata_path = venv_dir / self.METADATA_FILE
+        try:
+            mtime = metadata_path.stat().st_mtime_ns
+        except OSError:
+            return []
+
+        cache_key = str(metadata_path)
+        cached = self._venv_cache.get(cache_key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(metadata_path, "r", encoding="utf-8") as handle:
+                metadata = json.load(handle)
+        except (OSError, ValueError) as exc:
+            logger.warning("pipx metadata inválido em %s: %s", metadata_path, exc)
+            return []
+
+        records = self._records_from_metadata(venv_dir.name, metadata)
+        self._venv_cache[cache_key] = (mtime, records)
+        return records
+
+    def _records_from_metadata(
+        self,
+        venv_name: str,
+        metadata: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        main = metadata.get("main_package") or {}
+        if main.get("package"):
+            records.append(
+                {
+                    "name": main["package"],
+                    "version": main.get("package_version"),
+                    "status": "unknown",
+                    "manager": self.manager_id,
+                }
+            )
+
+        injected = metadata.get("injected_packages") or {}
+        for name, info in sorted(injected.items()):
+            records.append(
+                {
+                    "name": (info or {}).get("package") or name,
+                    "version": (info or {}).get("package_version"),
+                    "status": "unknown",
+                    "manager": self.manager_id,
+                    "injected_into": venv_name,
+                }
+            )
+        return records
+
+    @staticmethod
+    def _resolve_pipx_home() -> Optional[Path]:
+        """Resolve PIPX_HOME seguindo a mesma precedência do pipx."""
+        env_home = os.environ.get("PIPX_HOME")
+        if env_home:
+            return Path(env_home).expanduser()
+
+        home = Path.home()
+        candidates = [home / ".local" / "pipx"]
+        if sys.platform == "win32":
+            candidates.append(home / "pipx")
+            local_appdata = os.environ.get("LOCALAPPDATA")
+            if local_appdata:
+                candidates.append(Path(local_appdata) / "pipx" / "pipx")
+        elif sys.platform == "darwin":
+            candidates.append(home / "Library" / "Application Support" / "pipx")
+        else:
+            data_home = os.environ.get("XDG_DATA_HOME") or str(home / ".local" / "share")
+            candidates.append(Path(data_home) / "pipx")
+
+        for candidate in candidates:
+            if (candidate / "venvs").is_dir():
+                return candidate
+        return None
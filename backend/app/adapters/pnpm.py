@@ -6,7 +6,7 @@ import logging
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
-from app.adapters.base import BaseAdapter
+from app.adapters.base import BaseAdapter, CommandRequest, Operation
 from app.core.executor import CommandExecutionError
 
 logger = logging.getLogger(__name__)
@@ -20,12 +20,34 @@ class PnpmAdapter(BaseAdapter):
     LIST_ARGS = ["ls", "-g", "--depth", "1", "--json"]
 
     def list_packages(self) -> List[Dict[str, Any]]:
+        return self._run_operation(self._list_packages_operation())
+
+    async def list_packages_async(self) -> List[Dict[str, Any]]:
+        return await self._run_operation_async(self._list_packages_operation())
+
+    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return self._run_operation(self._uninstall_operation(package, force))
+
+    async def uninstall_async(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return await self._run_operation_async(self._uninstall_operation(package, force))
+
+    def get_dependency_tree(self, package: str | None = None) -> Dict[str, Any]:
+        return self._run_operation(self._dependency_tree_operation(package))
+
+    async def get_dependency_tree_async(self, package: str | None = None) -> Dict[str, Any]:
+        return await self._run_operation_async(self._dependency_tree_operation(package))
+
+    def export_lockfile(self) -> Dict[str, Any]:
+        return self._run_operation(self._export_lockfile_operation())
+
+    async def export_lockfile_async(self) -> Dict[str, Any]:
+        return await self._run_operation_async(self._export_lockfile_operation())
+
+    # --- Operações -----------------------------------------------------------------
+
+    def _list_packages_operation(self) -> Operation[List[Dict[str, Any]]]:
         try:
-            result = self.command_executor.run(
-                [self.executable_name, *self.LIST_ARGS],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            result = yield CommandRequest([self.executable_name, *self.LIST_ARGS])
         except CommandExecutionError as exc:
             logger.error("pnpm list falhou: %s", exc)
             return []
@@ -56,17 +78,19 @@ class PnpmAdapter(BaseAdapter):
                 )
         return packages
 
-    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+    def _batch_uninstall_args(self, force: bool) -> List[str] | None:
+        args = ["remove", "-g"]
+        if force:
+            args.append("--force")
+        return args
+
+    def _uninstall_operation(self, package: str, force: bool = False) -> Operation[Dict[str, Any]]:
         sanitized = self._sanitize_package(package)
         args = ["remove", "-g", sanitized]
         if force:
             args.append("--force")
 
-        result = self.command_executor.run(
-            [self.executable_name, *args],
-            timeout=self.command_timeout,
-            check=False,
-        )
+        result = yield CommandRequest([self.executable_name, *args])
 
         success = result.returncode == 0
         return {
@@ -86,16 +110,14 @@ class PnpmAdapter(BaseAdapter):
             "packages": packages,
         }
 
-    def get_dependency_tree(self, package: str | None = None) -> Dict[str, Any]:
+    def _dependency_tree_operation(self, package: str | None = None) -> Operation[Dict[str, Any]]:
         # Use pnpm ls to build a simple tree
         try:
             args = ["ls", "-g", "--json"]
             if package:
                 args.extend(["-r", package])
 
-            result = self.command_executor.run(
-                [self.executable_name, *args], timeout=self.command_timeout, check=False
-            )
+            result = yield CommandRequest([self.executable_name, *args])
             if result.returncode == 0 and result.stdout:
                 return {
                     "manager": self.manager_id,
@@ -114,10 +136,15 @@ class PnpmAdapter(BaseAdapter):
             "error": "Failed to build dependency tree",
         }
 
-    def export_lockfile(self) -> Dict[str, Any]:
+    def _export_lockfile_operation(self) -> Operation[Dict[str, Any]]:
         try:
             # There is no global lockfile; export list as pseudo-lock
-            manifest = self.export_manifest()
+            packages = yield from self._list_packages_operation()
+            manifest = {
+                "manager": self.manager_id,
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "packages": packages,
+            }
             return {
                 "manager": self.manager_id,
                 "lockfile": manifest,
@@ -1,7 +1,7 @@
 """Registo centralizado dos adapters disponíveis."""
 from __future__ import annotations
 
-from typing import List, Optional, Type
+from typing import Any, Dict, List, Optional, Type
 
 from .base import BaseAdapter
 from .brew import BrewAdapter
@@ -32,3 +32,15 @@ def get_adapter_by_id(manager_id: str) -> Optional[Type[BaseAdapter]]:
         if adapter.manager_id == manager_id:
             return adapter
     return None
+
+
+def load_live_packages(manager_id: str) -> List[Dict[str, Any]]:
+    """Inventário atual de um gestor (via cache), para comparar com snapshots.
+
+    Raises:
+        LookupError: Se o gestor não existir ou não estiver instalado
+    """
+    adapter_cls = get_adapter_by_id(manager_id)
+    if adapter_cls is None or not adapter_cls.detect():
+        raise LookupError(f"Manager {manager_id} not available.")
+    return adapter_cls().list_packages_cached()
@@ -6,7 +6,7 @@ import logging
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
-from app.adapters.base import BaseAdapter
+from app.adapters.base import BaseAdapter, CommandRequest, Operation
 from app.core.executor import CommandExecutionError
 
 logger = logging.getLogger(__name__)
@@ -33,12 +33,34 @@ class WinGetAdapter(BaseAdapter):
     ]
 
     def list_packages(self) -> List[Dict[str, Any]]:
+        return self._run_operation(self._list_packages_operation())
+
+    async def list_packages_async(self) -> List[Dict[str, Any]]:
+        return await self._run_operation_async(self._list_packages_operation())
+
+    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return self._run_operation(self._uninstall_operation(package, force))
+
+    async def uninstall_async(self, package: str, force: bool = False) -> Dict[str, Any]:
+        return await self._run_operation_async(self._uninstall_operation(package, force))
+
+    def get_dependency_tree(self, package: str | None = None) -> Dict[str, Any]:
+        return self._run_operation(self._dependency_tree_operation(package))
+
+    async def get_dependency_tree_async(self, package: str | None = None) -> Dict[str, Any]:
+        return await self._run_operation_async(self._dependency_tree_operation(package))
+
+    def export_lockfile(self) -> Dict[str, Any]:
+        return self._run_operation(self._export_lockfile_operation())
+
+    async def export_lockfile_async(self) -> Dict[str, Any]:
+        return await self._run_operation_async(self._export_lockfile_operation())
+
+    # --- Operações -----------------------------------------------------------------
+
+    def _list_packages_operation(self) -> Operation[List[Dict[str, Any]]]:
         try:
-            result = self.command_executor.run(
-                [self.executable_name, *self.LIST_ARGS],
-                timeout=self.command_timeout,
-                check=False,
-            )
+            result = yield CommandRequest([self.executable_name, *self.LIST_ARGS])
         except CommandExecutionError as exc:
             logger.error("winget list falhou: %s", exc)
             return []
@@ -66,7 +88,7 @@ class WinGetAdapter(BaseAdapter):
             )
         return packages
 
-    def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+    def _uninstall_operation(self, package: str, force: bool = False) -> Operation[Dict[str, Any]]:
         sanitized = self._sanitize_package(package)
         args = list(self.UNINSTALL_ARGS)
         args.extend(["--id", sanitized])
@@ -74,11 +96,7 @@ class WinGetAdapter(BaseAdapter):
             args.append("--force")
 
         command = [self.executable_name, *args]
-        result = self.command_executor.run(
-            command,
-            timeout=self.command_timeout,
-            check=False,
-        )
+        result = yield CommandRequest(command)
 
         success = result.returncode == 0
         if not success:
@@ -105,9 +123,9 @@ class WinGetAdapter(BaseAdapter):
             "packages": packages,
         }
 
-    def get_dependency_tree(self, package: str | None = None) -> Dict[str, Any]:
+    def _dependency_tree_operation(self, package: str | None = None) -> Operation[Dict[str, Any]]:
         """Winget não expõe dependências; devolve árvore plana das instalações."""
-        packages = self.list_packages()
+        packages = yield from self._list_packages_operation()
         return {
             "manager": self.manager_id,
             "package": package,
@@ -116,10 +134,10 @@ class WinGetAdapter(BaseAdapter):
             "note": "Winget não fornece árvore de dependências; lista plana retornada.",
         }
 
-    def export_lockfile(self) -> Dict[str, Any]:
+    def _export_lockfile_operation(self) -> Operation[Dict[str, Any]]:
         """Exporta manifest via winget export."""
         try:
-            result = self.command_executor.run(
+            result = yield CommandRequest(
                 [
                     self.executable_name,
                     "export",
@@ -129,9 +147,7 @@ class WinGetAdapter(BaseAdapter):
                     "--accept-package-agreements",
                     "--disable-interactivity",
                     "--json",
-                ],
-                timeout=self.command_timeout,
-                check=False,
+                ]
             )
             if result.returncode == 0 and result.stdout:
                 try:
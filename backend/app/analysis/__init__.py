@@ -1,5 +1,14 @@
 """Módulos de análise e snapshots."""
 
+from .snapshot_analytics import SnapshotAnalytics, get_snapshot_analytics
+from .snapshot_diff import diff_packages, iter_diff
 from .snapshot_manager import SnapshotManager, SnapshotSummary
 
-__all__ = ["SnapshotManager", "SnapshotSummary"]
+__all__ = [
+    "SnapshotAnalytics",
+    "SnapshotManager",
+    "SnapshotSummary",
+    "diff_packages",
+    "get_snapshot_analytics",
+    "iter_diff",
+]
@@ -0,0 +1,258 @@
+"""Consultas analíticas sobre o histórico de snapshots com DuckDB.
+
+O histórico é materializado numa base DuckDB em memória com duas tabelas:
+`sections` (uma linha por snapshot e gestor, com o digest do blob) e
+`blob_packages` (o conteúdo de cada blob, carregado uma única vez). Como
+snapshots consecutivos partilham a maioria dos blobs, o volume carregado é o
+de blobs distintos e não o de snapshots. A vista `packages` junta as duas.
+
+A carga é incremental: cada consulta compara o índice de snapshots com o que
+já está carregado e só lê snapshots novos (e remove os apagados).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from app.analysis.snapshot_manager import SnapshotManager
+
+try:  # Dependência opcional: sem duckdb as rotas de analytics respondem 503.
+    import duckdb
+except ImportError:  # pragma: no cover - depende do ambiente
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    """
+    CREATE TABLE sections (
+        snapshot_id VARCHAR,
+        created_at VARCHAR,
+        taken_at TIMESTAMP,
+        manager VARCHAR,
+        digest VARCHAR
+    )
+    """,
+    "CREATE TABLE blob_packages (digest VARCHAR, name VARCHAR, version VARCHAR)",
+    """
+    CREATE VIEW packages AS
+    SELECT s.snapshot_id, s.created_at, s.taken_at, s.manager, b.name, b.version
+    FROM sections s JOIN blob_packages b USING (digest)
+    """,
+]
+
+FIRST_SEEN_SQL = """
+SELECT manager,
+       arg_min(snapshot_id, taken_at) AS snapshot_id,
+       arg_min(created_at, taken_at) AS first_seen,
+       arg_min(version, taken_at) AS version,
+       arg_max(created_at, taken_at) AS last_seen,
+       count(DISTINCT snapshot_id) AS snapshots
+FROM packages
+WHERE name = $name AND ($manager IS NULL OR manager = $manager)
+GROUP BY manager
+ORDER BY min(taken_at), manager
+"""
+
+VERSION_HISTORY_SQL = """
+SELECT manager,
+       version,
+       arg_min(created_at, taken_at) AS first_seen,
+       arg_max(created_at, taken_at) AS last_seen,
+       count(DISTINCT snapshot_id) AS snapshots
+FROM packages
+WHERE name = $name AND ($manager IS NULL OR manager = $manager)
+GROUP BY manager, version
+ORDER BY manager, min(taken_at)
+"""
+
+# Churn = pacotes adicionados, removidos ou com versão alterada entre snapshots
+# consecutivos do mesmo gestor. Pares com o mesmo digest não mudaram e nem
+# chegam à junção; cada par distinto de blobs é comparado uma única vez.
+CHURN_SQL = """
+WITH seq AS (
+    SELECT manager, snapshot_id, taken_at, digest,
+           lag(digest) OVER (PARTITION BY manager ORDER BY taken_at) AS prev_digest
+    FROM sections
+),
+pairs AS (
+    SELECT manager, snapshot_id, prev_digest, digest
+    FROM seq
+    WHERE prev_digest IS NOT NULL
+      AND taken_at >= $since
+      AND ($until IS NULL OR taken_at < $until)
+),
+changes AS (
+    SELECT d.prev_digest, d.digest,
+           CASE
+               WHEN count(DISTINCT b.digest) = 2 THEN 'changed'
+               WHEN bool_or(b.digest = d.digest) THEN 'added'
+               ELSE 'removed'
+           END AS kind
+    FROM (SELECT DISTINCT prev_digest, digest FROM pairs WHERE prev_digest <> digest) d
+    JOIN blob_packages b ON b.digest IN (d.prev_digest, d.digest)
+    GROUP BY d.prev_digest, d.digest, b.name
+    HAVING count(DISTINCT b.digest) = 1 OR count(DISTINCT coalesce(b.version, '')) > 1
+),
+pair_counts AS (
+    SELECT prev_digest, digest,
+           count(*) FILTER (WHERE kind = 'added') AS added,
+           count(*) FILTER (WHERE kind = 'removed') AS removed,
+           count(*) FILTER (WHERE kind = 'changed') AS changed
+    FROM changes
+    GROUP BY prev_digest, digest
+)
+SELECT p.manager,
+       count(*) AS snapshots,
+       coalesce(sum(c.added), 0) AS added,
+       coalesce(sum(c.removed), 0) AS removed,
+       coalesce(sum(c.changed), 0) AS changed,
+       coalesce(sum(c.added + c.removed + c.changed), 0) AS churn
+FROM pairs p
+LEFT JOIN pair_counts c USING (prev_digest, digest)
+GROUP BY p.manager
+ORDER BY churn DESC, p.manager
+LIMIT $limit
+"""
+
+
+class AnalyticsUnavailableError(RuntimeError):
+    """O pacote duckdb não está instalado."""
+
+
+class SnapshotAnalytics:
+    """Responde a perguntas sobre o histórico de snapshots com SQL vetorizado."""
+
+    def __init__(self, snapshot_manager: Optional[SnapshotManager] = None) -> None:
+        if duckdb is None:
+            raise AnalyticsUnavailableError("duckdb não está instalado; analytics indisponível.")
+        self.snapshot_manager = snapshot_manager or SnapshotManager()
+        self._conn = duckdb.connect(":memory:")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._loaded: Set[str] = set()
+        self._digests: Set[str] = set()
+        # A ligação DuckDB não é segura entre threads; consultas chegam via to_thread.
+        self._lock = threading.Lock()
+
+    # --- Consultas --------------------------------------------------------------------
+
+    def first_seen(self, name: str, manager: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Primeiro snapshot em que o pacote aparece, por gestor."""
+        return self._query(FIRST_SEEN_SQL, {"name": name, "manager": manager})
+
+    def version_history(self, name: str, manager: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Versões de um pacote ao longo dos snapshots, com o intervalo em que vigoraram."""
+        return self._query(VERSION_HISTORY_SQL, {"name": name, "manager": manager})
+
+    def churn(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """Gestores com mais alterações entre snapshots consecutivos no intervalo.
+
+        Por omissão o intervalo começa no primeiro dia do mês corrente (UTC).
+        """
+        if since is None:
+            since = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        params = {"since": self._utc(since), "until": self._utc(until) if until else None, "limit": limit}
+        return self._query(CHURN_SQL, params)
+
+    def refresh(self) -> Dict[str, int]:
+        """Sincroniza as tabelas com o índice de snapshots."""
+        with self._lock:
+            return self._refresh()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"snapshots": len(self._loaded), "blobs": len(self._digests)}
+
+    # --- Carga ------------------------------------------------------------------------
+
+    def _query(self, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            cursor = self._conn.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _refresh(self) -> Dict[str, int]:
+        summaries = {summary.id: summary for summary in self.snapshot_manager.list_snapshots()}
+        removed = self._loaded - summaries.keys()
+        added = [summary for snapshot_id, summary in summaries.items() if snapshot_id not in self._loaded]
+        if not removed and not added:
+            return {"added": 0, "removed": 0}
+
+        refs = self.snapshot_manager.get_blob_refs()
+        self._conn.execute("BEGIN TRANSACTION")
+        try:
+            if removed:
+                self._conn.execute(
+                    "DELETE FROM sections WHERE list_contains($ids, snapshot_id)",
+                    {"ids": sorted(removed)},
+                )
+            rows = []
+            for summary in added:
+                blobs = refs.get(summary.id, {})
+                taken_at = self._utc(datetime.fromisoformat(summary.created_at))
+                for manager_id in summary.managers:
+                    # Snapshots antigos têm as listas inline: chave própria por secção.
+                    digest = blobs.get(manager_id) or f"inline:{summary.id}:{manager_id}"
+                    if digest not in self._digests:
+                        self._load_blob(digest, summary.id, manager_id)
+                    rows.append((summary.id, summary.created_at, taken_at, manager_id, digest))
+            if rows:
+                self._conn.executemany("INSERT INTO sections VALUES (?, ?, ?, ?, ?)", rows)
+            if removed:
+                self._conn.execute(
+                    "DELETE FROM blob_packages WHERE digest NOT IN (SELECT digest FROM sections)"
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            self._digests = self._stored_digests()
+            raise
+
+        if removed:
+            self._digests = self._stored_digests()
+        self._loaded = (self._loaded - removed) | {summary.id for summary in added}
+        logger.debug("Analytics: %s snapshots carregados, %s removidos", len(added), len(removed))
+        return {"added": len(added), "removed": len(removed)}
+
+    def _stored_digests(self) -> Set[str]:
+        return {row[0] for row in self._conn.execute("SELECT DISTINCT digest FROM sections").fetchall()}
+
+    def _load_blob(self, digest: str, snapshot_id: str, manager_id: str) -> None:
+        packages = self.snapshot_manager.get_manager_packages(snapshot_id, manager_id) or []
+        names = [package.get("name") for package in packages]
+        versions = [package.get("version") for package in packages]
+        # Uma instrução por blob: as listas entram como colunas e o unnest é vetorizado.
+        self._conn.execute(
+            "INSERT INTO blob_packages SELECT $digest, unnest($names::VARCHAR[]), unnest($versions::VARCHAR[])",
+            {"digest": digest, "names": names, "versions": versions},
+        )
+        self._digests.add(digest)
+
+    @staticmethod
+    def _utc(value: datetime) -> datetime:
+        """TIMESTAMP sem fuso em UTC (evita depender de pytz para TIMESTAMPTZ)."""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+_snapshot_analytics: Optional[SnapshotAnalytics] = None
+_analytics_lock = threading.Lock()
+
+
+def get_snapshot_analytics() -> SnapshotAnalytics:
+    """Instância partilhada; mantém as tabelas carregadas entre pedidos."""
+    global _snapshot_analytics
+    with _analytics_lock:
+        if _snapshot_analytics is None:
+            _snapshot_analytics = SnapshotAnalytics()
+        return _snapshot_analytics
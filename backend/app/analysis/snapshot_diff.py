@@ -0,0 +1,131 @@
+"""Motor de diff entre estados de gestores (snapshot vs snapshot ou vs inventário)."""
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from packaging.version import InvalidVersion, Version
+
+_VERSION_TOKEN_RE = re.compile(r"\d+|[A-Za-z]+")
+
+CHANGE_TYPES = ("added", "removed", "upgraded", "downgraded", "changed")
+
+# Gestores de pacotes Python: as versões seguem a PEP 440 (1.0.dev1 < 1.0a1 < 1.0 < 1.0.post1).
+PEP440_MANAGERS = frozenset({"pip", "pipx"})
+
+PackageLoader = Callable[[str], Optional[List[Dict[str, Any]]]]
+
+# (nome, venv anfitrião): um pacote injetado pelo pipx pode repetir o nome de
+# uma aplicação ou de outro pacote injetado noutro venv.
+PackageKey = Tuple[str, Optional[str]]
+
+
+def version_key(version: Optional[str]) -> List[Tuple[int, Any]]:
+    """Chave de comparação tolerante a formatos (1.10 > 1.9, 1.0rc1 < 1.0)."""
+    key: List[Tuple[int, Any]] = [
+        (2, int(token)) if token.isdigit() else (0, token.lower())
+        for token in _VERSION_TOKEN_RE.findall(version or "")
+    ]
+    # O marcador final fica acima de sufixos alfabéticos (pré-releases) e abaixo
+    # de componentes numéricos extra.
+    key.append((1, ""))
+    return key
+
+
+def compare_versions(old: Optional[str], new: Optional[str], manager_id: Optional[str] = None) -> int:
+    """-1, 0 ou 1 consoante `new` seja anterior, equivalente ou posterior a `old`.
+
+    Para gestores de PEP440_MANAGERS usa `packaging.version.Version`; versões
+    que não a respeitam, e os restantes gestores, usam `version_key`.
+    """
+    if manager_id in PEP440_MANAGERS:
+        try:
+            old_version, new_version = Version(old or ""), Version(new or "")
+        except InvalidVersion:
+            pass
+        else:
+            return (new_version > old_version) - (new_version < old_version)
+    old_key, new_key = version_key(old), version_key(new)
+    return (new_key > old_key) - (new_key < old_key)
+
+
+def diff_packages(
+    before: Iterable[Dict[str, Any]],
+    after: Iterable[Dict[str, Any]],
+    manager_id: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Compara duas listas de pacotes em O(n) através de um mapa por `_package_key`.
+
+    Só o lado `before` é materializado; `after` é percorrido uma vez e as chaves
+    que sobram no mapa no fim são os removidos. Registos de pacotes injetados
+    levam o campo `injected_into`.
+    """
+    previous: Dict[PackageKey, Optional[str]] = {}
+    for package in before:
+        previous[_package_key(package)] = package.get("version")
+
+    for package in after:
+        key = _package_key(package)
+        version = package.get("version")
+        if key not in previous:
+            yield _change(key, "added", None, version)
+            continue
+
+        old_version = previous.pop(key)
+        if old_version == version:
+            continue
+        order = compare_versions(old_version, version, manager_id)
+        if order > 0:
+            change = "upgraded"
+        elif order < 0:
+            change = "downgraded"
+        else:
+            change = "changed"
+        yield _change(key, change, old_version, version)
+
+    for key, old_version in previous.items():
+        yield _change(key, "removed", old_version, None)
+
+
+def _package_key(package: Dict[str, Any]) -> PackageKey:
+    return package["name"], package.get("injected_into")
+
+
+def _change(
+    key: PackageKey,
+    change: str,
+    before: Optional[str],
+    after: Optional[str],
+) -> Dict[str, Any]:
+    name, injected_into = key
+    record: Dict[str, Any] = {"name": name, "change": change, "before": before, "after": after}
+    if injected_into is not None:
+        record["injected_into"] = injected_into
+    return record
+
+
+def iter_diff(
+    managers: Iterable[str],
+    load_before: PackageLoader,
+    load_after: PackageLoader,
+) -> Iterator[Dict[str, Any]]:
+    """Gera o diff gestor a gestor, carregando só um gestor de cada vez.
+
+    Emite registos `change` seguidos de um `summary` por gestor; falhas ao
+    carregar um gestor produzem um registo `error` e o diff continua. Um gestor
+    ausente de um dos lados (loader devolve None) conta como lista vazia.
+    """
+    for manager_id in managers:
+        try:
+            before = load_before(manager_id) or []
+            after = load_after(manager_id) or []
+        except Exception as exc:
+            # Reportado no stream; não interrompe os restantes gestores.
+            yield {"type": "error", "manager": manager_id, "error": str(exc)}
+            continue
+
+        counts = dict.fromkeys(CHANGE_TYPES, 0)
+        for change in diff_packages(before, after, manager_id):
+            counts[change["change"]] += 1
+            yield {"type": "change", "manager": manager_id, **change}
+        yield {"type": "summary", "manager": manager_id, **counts}
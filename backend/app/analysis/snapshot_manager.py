@@ -1,13 +1,41 @@
-"""Gestor de snapshots em JSON para estados dos gestores de pacotes."""
+"""Gestor de snapshots em JSON para estados dos gestores de pacotes.
+
+Cada snapshot é um manifest pequeno que aponta, por gestor, para um blob
+endereçado pelo conteúdo (SHA-256 da lista de pacotes). Snapshots quase
+idênticos partilham assim os mesmos blobs; os que deixam de ser referenciados
+são removidos quando a retenção apaga snapshots.
+
+Os blobs são gravados como JSON compacto comprimido com zlib (`<digest>.z`).
+O manifest funciona como tabela de secções: ler um snapshot só para alguns
+gestores descomprime apenas os blobs desses gestores. Snapshots antigos
+(listas inline ou blobs `.json`) continuam legíveis e podem ser convertidos
+com `migrate()`.
+"""
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import json
+import logging
+import threading
+import zlib
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from uuid import uuid4
 
+from app.core.locking import file_lock
 from app.core.validation import ValidationLayer
-from app.storage.json_storage import JSONStorage
+from app.storage import Storage, create_storage
+from app.storage.json_storage import get_read_cache
+
+logger = logging.getLogger(__name__)
+
+# snapshot_id -> {manager_id: digest do blob}
+BlobRefs = Dict[str, Dict[str, str]]
+
+# Ficheiros de lock do índice seguros pela thread atual (ver _index_lock).
+_held_index_locks = threading.local()
 
 
 @dataclass
@@ -18,16 +46,24 @@ class SnapshotSummary:
     created_at: str
     managers: List[str]
     package_count: int
+    size: int = 0
 
 
 class SnapshotManager:
     """Criação, listagem e recuperação de snapshots."""
 
-    RETENTION_LIMIT = 10
+    RETENTION_LIMIT = 2000
+    INDEX_FILE = "index.json"
+    INDEX_LOCK_FILE = "index.lock"
+    INDEX_VERSION = 2
+    BLOB_DIR = "blobs"
+    BLOB_SUFFIX = ".z"
+    LEGACY_BLOB_SUFFIX = ".json"
+    COMPRESSION_LEVEL = 6
 
-    def __init__(self, storage: Optional[JSONStorage] = None) -> None:
+    def __init__(self, storage: Optional[Storage] = None) -> None:
         base_dir = ValidationLayer.ALLOWED_BASE_DIR / "snapshots"
-        self.storage = storage or JSONStorage(base_dir=base_dir)
+        self.storage = storage or create_storage(base_dir=base_dir, cache=get_read_cache())
 
     def create_snapshot(
         self,
@@ -46,34 +82,81 @@ class SnapshotManager:
         snapshot_id = self._generate_snapshot_id()
         created_at = self._now_iso()
         package_count = sum(len(items) for items in sanitized.values())
-        record = {
-            "id": snapshot_id,
-            "created_at": created_at,
-            "package_count": package_count,
-            "managers": sanitized,
-            "metadata": metadata or {},
-        }
-
-        self.storage.write(f"{snapshot_id}.json", record)
-        self._enforce_retention()
-        return self._summary_from_record(record)
+
+        # Blobs, manifest e índice sob o mesmo lock: a recolha de lixo de outra
+        # thread ou processo não pode apagar um blob que este snapshot está a reutilizar.
+        # Em backends transacionais, batch() grava tudo numa só transação.
+        with self._index_lock(), self.storage.batch():
+            blobs = {manager_id: self._store_blob(packages) for manager_id, packages in sanitized.items()}
+            record = {
+                "id": snapshot_id,
+                "created_at": created_at,
+                "package_count": package_count,
+                "blobs": blobs,
+                "metadata": metadata or {},
+            }
+            self.storage.write(f"{snapshot_id}.json", record)
+            summary = self._summary_from_record(record, self.storage.size(f"{snapshot_id}.json"))
+
+            # Um índice reconstruído agora já inclui o snapshot acabado de gravar.
+            summaries, refs = self._load_index()
+            summaries = [item for item in summaries if item.id != summary.id]
+            summaries.append(summary)
+            refs[snapshot_id] = blobs
+            self._enforce_retention(summaries, refs)
+        return summary
 
     def list_snapshots(self) -> List[SnapshotSummary]:
         """Lista snapshots existentes por ordem decrescente de criação."""
-        summaries: List[SnapshotSummary] = []
-        for file in sorted(self.storage.base_dir.glob("*.json")):
-            record = self.storage.read(file.name)
-            summaries.append(self._summary_from_record(record))
+        with self._index_lock():
+            summaries, _ = self._load_index()
+            return self._sorted(summaries)
 
-        summaries.sort(
-            key=lambda summary: datetime.fromisoformat(summary.created_at),
-            reverse=True,
-        )
-        return summaries
+    def get_snapshot(
+        self,
+        snapshot_id: str,
+        managers: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """Obtém o conteúdo de um snapshot, resolvendo os blobs.
+
+        Com `managers`, só as secções desses gestores são lidas e descomprimidas.
+        """
+        record = self.storage.read(f"{snapshot_id}.json")
+        blobs = record.pop("blobs", None)
+        if blobs is not None:
+            record["managers"] = {
+                manager_id: self._read_blob(digest)
+                for manager_id, digest in blobs.items()
+                if managers is None or manager_id in managers
+            }
+        elif managers is not None:
+            record["managers"] = {
+                manager_id: packages
+                for manager_id, packages in record.get("managers", {}).items()
+                if manager_id in managers
+            }
+        return record
 
-    def get_snapshot(self, snapshot_id: str) -> Dict[str, Any]:
-        """Obtém o conteúdo completo de um snapshot."""
-        return self.storage.read(f"{snapshot_id}.json")
+    def get_summary(self, snapshot_id: str) -> Optional[SnapshotSummary]:
+        """Resumo de um snapshot a partir do índice (None se não existir)."""
+        with self._index_lock():
+            summaries, _ = self._load_index()
+        return next((summary for summary in summaries if summary.id == snapshot_id), None)
+
+    def get_blob_refs(self) -> BlobRefs:
+        """Digest do blob de cada gestor, por snapshot (vazio em snapshots inline)."""
+        with self._index_lock():
+            _, refs = self._load_index()
+        return refs
+
+    def get_manager_packages(self, snapshot_id: str, manager_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Lista de pacotes de um único gestor num snapshot.
+
+        Devolve None se o snapshot não tiver secção para o gestor, para que uma
+        secção em falta não se confunda com um gestor sem pacotes.
+        """
+        record = self.get_snapshot(snapshot_id, managers=[manager_id])
+        return record.get("managers", {}).get(manager_id)
 
     def restore_snapshot(self, snapshot_id: str) -> Dict[str, Any]:
         """Placeholder para restore – retorna o snapshot para uso externo."""
@@ -81,10 +164,76 @@ class SnapshotManager:
 
     def delete_snapshot(self, snapshot_id: str) -> bool:
         """Remove snapshot específico."""
-        return self.storage.delete(f"{snapshot_id}.json")
+        with self._index_lock():
+            deleted = self.storage.delete(f"{snapshot_id}.json")
+            summaries, refs = self._load_index()
+            remaining = [summary for summary in summaries if summary.id != snapshot_id]
+            if len(remaining) != len(summaries):
+                removed = refs.pop(snapshot_id, {})
+                self._write_index(remaining, refs)
+                self._collect_blobs(removed.values(), refs)
+        return deleted
+
+    def migrate(self) -> Dict[str, int]:
+        """Converte snapshots e blobs antigos para o formato comprimido."""
+        converted_snapshots = 0
+        converted_blobs = 0
+        with self._index_lock(), self.storage.batch():
+            for name in self._snapshot_names():
+                try:
+                    record = self.storage.read(name)
+                except (OSError, json.JSONDecodeError) as exc:
+                    logger.warning("Snapshot ilegível ignorado (%s): %s", name, exc)
+                    continue
+                if not isinstance(record, dict) or "blobs" in record or "managers" not in record:
+                    continue
+                record = dict(record)
+                inline = record.pop("managers")
+                record["blobs"] = {
+                    manager_id: self._store_blob(packages) for manager_id, packages in inline.items()
+                }
+                self.storage.write(name, record)
+                converted_snapshots += 1
+
+            for digest in self._blob_digests(self.LEGACY_BLOB_SUFFIX):
+                legacy_path = self._blob_path(digest, self.LEGACY_BLOB_SUFFIX)
+                packages = self.storage.read(legacy_path)
+                if not self.storage.exists(self._blob_path(digest)):
+                    self.storage.write_bytes(self._blob_path(digest), self._encode_blob(packages))
+                self.storage.delete(legacy_path)
+                converted_blobs += 1
+
+            self._rebuild_index()
+        return {"snapshots": converted_snapshots, "blobs": converted_blobs}
+
+    def rebuild_index(self) -> List[SnapshotSummary]:
+        """Reconstrói o índice lendo todos os snapshots do disco."""
+        with self._index_lock():
+            summaries, _ = self._rebuild_index()
+            return self._sorted(summaries)
 
     # --- Helpers ----------------------------------------------------------------------
 
+    @contextmanager
+    def _index_lock(self) -> Iterator[None]:
+        """Serializa leitura-modificação-escrita do índice entre threads e processos.
+
+        O servidor (vários workers) e o CLI partilham o mesmo diretório de
+        snapshots; o flock fica num ficheiro ao lado do índice.
+        """
+        path = self.storage.base_dir / self.INDEX_LOCK_FILE
+        if not hasattr(_held_index_locks, "paths"):
+            _held_index_locks.paths = set()
+        with file_lock(path):
+            _held_index_locks.paths.add(path)
+            try:
+                yield
+            finally:
+                _held_index_locks.paths.discard(path)
+
+    def _holds_index_lock(self) -> bool:
+        return self.storage.base_dir / self.INDEX_LOCK_FILE in getattr(_held_index_locks, "paths", ())
+
     def _generate_snapshot_id(self) -> str:
         """Gera identificador único."""
         while True:
@@ -93,21 +242,147 @@ class SnapshotManager:
                 return candidate
 
     @staticmethod
-    def _summary_from_record(record: Dict[str, Any]) -> SnapshotSummary:
+    def _summary_from_record(record: Dict[str, Any], size: int = 0) -> SnapshotSummary:
         return SnapshotSummary(
             id=record["id"],
             created_at=record["created_at"],
-            managers=sorted(record.get("managers", {}).keys()),
+            managers=sorted((record.get("blobs") or record.get("managers", {})).keys()),
             package_count=record.get("package_count", 0),
+            size=size,
         )
 
-    def _enforce_retention(self) -> None:
-        summaries = self.list_snapshots()
-        if len(summaries) <= self.RETENTION_LIMIT:
-            return
+    @staticmethod
+    def _sorted(summaries: List[SnapshotSummary]) -> List[SnapshotSummary]:
+        return sorted(
+            summaries,
+            key=lambda summary: datetime.fromisoformat(summary.created_at),
+            reverse=True,
+        )
 
+    def _enforce_retention(self, summaries: List[SnapshotSummary], refs: BlobRefs) -> None:
+        """Aplica o limite e grava o índice resultante (chamar com _index_lock)."""
+        summaries = self._sorted(summaries)
+        candidates: List[str] = []
         for summary in summaries[self.RETENTION_LIMIT :]:
             self.storage.delete(f"{summary.id}.json")
+            candidates.extend(refs.pop(summary.id, {}).values())
+        self._write_index(summaries[: self.RETENTION_LIMIT], refs)
+        self._collect_blobs(candidates, refs)
+
+    # --- Blobs ------------------------------------------------------------------------
+
+    def _blob_path(self, digest: str, suffix: Optional[str] = None) -> str:
+        return f"{self.BLOB_DIR}/{digest}{suffix or self.BLOB_SUFFIX}"
+
+    @staticmethod
+    def _canonical(packages: List[Dict[str, Any]]) -> bytes:
+        return json.dumps(packages, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    def _encode_blob(self, packages: List[Dict[str, Any]]) -> bytes:
+        return zlib.compress(self._canonical(packages), self.COMPRESSION_LEVEL)
+
+    def _store_blob(self, packages: List[Dict[str, Any]]) -> str:
+        """Grava a lista de pacotes uma única vez e devolve o seu digest."""
+        # O digest é do JSON canónico, não dos bytes comprimidos: blobs antigos
+        # em JSON e os convertidos por migrate() mantêm o mesmo endereço.
+        digest = hashlib.sha256(self._canonical(packages)).hexdigest()
+        if not (
+            self.storage.exists(self._blob_path(digest))
+            or self.storage.exists(self._blob_path(digest, self.LEGACY_BLOB_SUFFIX))
+        ):
+            self.storage.write_bytes(self._blob_path(digest), self._encode_blob(packages))
+        return digest
+
+    def _read_blob(self, digest: str) -> List[Dict[str, Any]]:
+        try:
+            data = self.storage.read_bytes(self._blob_path(digest))
+        except FileNotFoundError:
+            return self.storage.read(self._blob_path(digest, self.LEGACY_BLOB_SUFFIX))
+        return json.loads(zlib.decompress(data))
+
+    def _collect_blobs(self, candidates: Iterable[str], refs: BlobRefs) -> None:
+        """Apaga blobs candidatos que já não são referenciados por nenhum snapshot.
+
+        Só corre com o lock do índice, e as referências em `refs` são somadas às
+        do índice relido do disco nesse momento: um blob que outro processo
+        acabou de referenciar nunca é apagado com base numa vista antiga.
+        """
+        if not self._holds_index_lock():
+            raise RuntimeError("A recolha de blobs requer o lock do índice.")
+        try:
+            persisted = self.storage.read(self.INDEX_FILE)["blobs"]
+            referenced = self._referenced_blobs(refs) | self._referenced_blobs(persisted)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+            logger.warning("Índice ilegível; recolha de blobs adiada: %s", exc)
+            return
+        for digest in set(candidates) - referenced:
+            self.storage.delete(self._blob_path(digest))
+            self.storage.delete(self._blob_path(digest, self.LEGACY_BLOB_SUFFIX))
+
+    def _blob_digests(self, suffix: str) -> List[str]:
+        return [
+            name.rsplit("/", 1)[-1][: -len(suffix)]
+            for name in self.storage.list_names(self.BLOB_DIR, suffix)
+        ]
+
+    @staticmethod
+    def _referenced_blobs(refs: BlobRefs) -> Set[str]:
+        return {digest for blobs in refs.values() for digest in blobs.values()}
+
+    # --- Índice -----------------------------------------------------------------------
+    #
+    # O índice guarda os resumos de todos os snapshots num único ficheiro, para que
+    # listagem e retenção não precisem de abrir cada snapshot. É regravado de forma
+    # atómica (ficheiro temporário + os.replace no JSONStorage, transação no
+    # SQLiteStorage) e só é reconstruído a partir do disco quando falta ou está
+    # corrompido.
+
+    def _load_index(self) -> Tuple[List[SnapshotSummary], BlobRefs]:
+        try:
+            data = self.storage.read(self.INDEX_FILE)
+            if data.get("version") != self.INDEX_VERSION:
+                raise ValueError(f"versão de índice inesperada: {data.get('version')}")
+            summaries = [SnapshotSummary(**entry) for entry in data["snapshots"]]
+            refs = {snapshot_id: dict(blobs) for snapshot_id, blobs in data["blobs"].items()}
+            return summaries, refs
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+            logger.warning("Índice de snapshots inválido, a reconstruir: %s", exc)
+        return self._rebuild_index()
+
+    def _rebuild_index(self) -> Tuple[List[SnapshotSummary], BlobRefs]:
+        summaries: List[SnapshotSummary] = []
+        refs: BlobRefs = {}
+        for name in self._snapshot_names():
+            try:
+                record = self.storage.read(name)
+                summaries.append(self._summary_from_record(record, self.storage.size(name)))
+                # Snapshots antigos (listas completas inline) não referenciam blobs.
+                refs[record["id"]] = dict(record.get("blobs", {}))
+            except (OSError, json.JSONDecodeError, KeyError, TypeError, AttributeError) as exc:
+                logger.warning("Snapshot ilegível ignorado (%s): %s", name, exc)
+        self._write_index(summaries, refs)
+
+        # Blobs órfãos (ex.: escrita interrompida antes do manifest) saem aqui.
+        self._collect_blobs(
+            [*self._blob_digests(self.BLOB_SUFFIX), *self._blob_digests(self.LEGACY_BLOB_SUFFIX)],
+            refs,
+        )
+        return summaries, refs
+
+    def _snapshot_names(self) -> List[str]:
+        return [name for name in self.storage.list_names(suffix=".json") if name != self.INDEX_FILE]
+
+    def _write_index(self, summaries: List[SnapshotSummary], refs: BlobRefs) -> None:
+        self.storage.write(
+            self.INDEX_FILE,
+            {
+                "version": self.INDEX_VERSION,
+                "snapshots": [asdict(summary) for summary in self._sorted(summaries)],
+                "blobs": {summary.id: refs.get(summary.id, {}) for summary in summaries},
+            },
+        )
 
     @staticmethod
     def _now_iso() -> str:
@@ -4,10 +4,11 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
-import shutil
 import subprocess
 from typing import List, Optional, Tuple
 
+from app.core.path_index import get_path_index
+
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +29,7 @@ class CommandExecutor:
     @staticmethod
     def _resolve_executable(executable: str) -> Optional[str]:
         """Resolve path do executável, adicionando caminhos padrão do Node no Windows."""
-        resolved = shutil.which(executable)
+        resolved = get_path_index().which(executable)
         if resolved:
             return resolved
 
@@ -84,10 +85,13 @@ class CommandExecutor:
             ) from exc
 
     @staticmethod
-    async def run_async(
+    async def run_process(
         command: List[str],
         timeout: Optional[int] = None,
-    ) -> Tuple[str, str]:
+        check: bool = True,
+        cwd: Optional[str] = None,
+    ) -> subprocess.CompletedProcess:
+        """Equivalente assíncrono de `run`, baseado em create_subprocess_exec."""
         if not isinstance(command, list):
             raise TypeError("Command must be provided as a list.")
 
@@ -102,6 +106,7 @@ class CommandExecutor:
             *command,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
         )
 
         try:
@@ -120,14 +125,26 @@ class CommandExecutor:
                 f"Command timed out after {timeout}s: {command[0]}"
             ) from exc
 
-        stdout_text = stdout.decode()
-        stderr_text = stderr.decode()
+        result = subprocess.CompletedProcess(
+            command,
+            process.returncode,
+            stdout=stdout.decode(errors="replace"),
+            stderr=stderr.decode(errors="replace"),
+        )
 
-        if process.returncode != 0:
-            logger.error("Async command failed: %s", stderr_text.strip())
+        if check and result.returncode != 0:
+            logger.error("Async command failed: %s", result.stderr.strip())
             raise CommandExecutionError(
-                f"Command failed (exit {process.returncode}): {stderr_text.strip()}"
+                f"Command failed (exit {result.returncode}): {result.stderr.strip()}"
             )
 
-        logger.info("Async command finished with code %s", process.returncode)
-        return stdout_text, stderr_text
+        logger.info("Async command finished with code %s", result.returncode)
+        return result
+
+    @staticmethod
+    async def run_async(
+        command: List[str],
+        timeout: Optional[int] = None,
+    ) -> Tuple[str, str]:
+        result = await CommandExecutor.run_process(command, timeout=timeout, check=True)
+        return result.stdout, result.stderr
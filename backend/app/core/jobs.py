@@ -0,0 +1,592 @@
+"""Subsistema de jobs: mutações enfileiradas e executadas em segundo plano.
+
+Cada mutação passa a ser um job com id próprio, devolvido de imediato ao
+cliente. Há uma fila FIFO por gestor, drenada por um worker desse gestor, pelo
+que jobs do mesmo gestor correm por ordem de chegada e jobs de gestores
+diferentes correm em paralelo (até `max_workers` em simultâneo). O lock de
+operação continua a ser obtido através do OperationQueue; se estiver ocupado
+por outro processo (ex.: a CLI), o job espera na fila em vez de falhar.
+
+Cada job corre no processo que o recebeu. Com vários workers do servidor, o
+estado dos jobs é também publicado numa base SQLite partilhada
+(JOBS_BACKEND=sqlite, ver SQLiteJobStore), para que qualquer worker o possa
+consultar, acompanhar ou cancelar.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Coroutine, Deque, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from app.core.locking import OperationInProgressError
+from app.core.queue import OperationQueue, OperationType, get_operation_queue
+from app.core.validation import ValidationLayer
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINAL_STATUSES = frozenset({JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED})
+
+
+@dataclass
+class Job:
+    """Estado de uma mutação submetida."""
+
+    id: str
+    kind: str
+    manager_id: str
+    operation_id: str
+    params: Dict[str, Any]
+    status: JobStatus = JobStatus.QUEUED
+    created_at: str = field(default_factory=lambda: _now_iso())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    blocked_by: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+    version: int = 0  # incrementada a cada mudança notificada
+    func: Optional[Callable[[], Coroutine[Any, Any, Any]]] = field(default=None, repr=False)
+    on_cancel: Optional[Callable[[], None]] = field(default=None, repr=False)
+    _waiters: List[asyncio.Future] = field(default_factory=list, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "manager": self.manager_id,
+            "operation": self.operation_id,
+            "params": self.params,
+            "status": self.status.value,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "blocked_by": self.blocked_by,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class _CancelledElsewhere(Exception):
+    """O job foi cancelado através de outro processo antes de começar."""
+
+
+JOB_STORE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        manager TEXT NOT NULL,
+        status TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        payload TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)",
+]
+
+_FINAL_VALUES = tuple(status.value for status in FINAL_STATUSES)
+
+# Ligações sqlite3 não podem ser partilhadas entre threads: uma por thread e base.
+_sqlite_local = threading.local()
+
+
+class SQLiteJobStore:
+    """Estado dos jobs partilhado entre processos numa base SQLite local (modo WAL).
+
+    Só o processo dono de um job escreve o seu estado; os outros leem-no. A
+    exceção é o cancelamento de um job ainda em fila, que qualquer processo
+    marca na linha: o dono confirma-o com `claim` antes de o executar, e as
+    suas escritas posteriores nunca sobrepõem um cancelamento.
+
+    Os métodos bloqueiam (I/O em disco); o JobManager chama-os fora do event loop.
+    """
+
+    DB_NAME = "jobs.db"
+    BUSY_TIMEOUT_MS = 2000
+
+    def __init__(self, db_path: Optional[Path] = None) -> None:
+        configured = os.getenv("JOBS_DB")
+        self.db_path = db_path or (
+            Path(configured).expanduser() if configured else ValidationLayer.ALLOWED_BASE_DIR / self.DB_NAME
+        )
+
+    def save(self, payload: Dict[str, Any], version: int) -> None:
+        """Grava o estado publicado pelo dono do job (exceto sobre um cancelamento)."""
+        self._connection().execute(
+            """
+            INSERT INTO jobs (id, manager, status, created_at, version, payload)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                status = excluded.status, version = excluded.version, payload = excluded.payload
+            WHERE jobs.status != 'cancelled'
+            """,
+            (
+                payload["id"],
+                payload["manager"],
+                payload["status"],
+                payload["created_at"],
+                version,
+                json.dumps(payload, default=str),
+            ),
+        )
+
+    def get(self, job_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Estado publicado de um job e a respetiva versão (None se desconhecido)."""
+        row = self._connection().execute(
+            "SELECT status, version, payload FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._payload(row[0], row[2]), row[1]
+
+    def list(
+        self,
+        manager_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """Jobs publicados, do mais recente para o mais antigo."""
+        rows = self._connection().execute(
+            """
+            SELECT status, payload FROM jobs
+            WHERE (?1 IS NULL OR manager = ?1) AND (?2 IS NULL OR status = ?2)
+            ORDER BY created_at DESC LIMIT ?3
+            """,
+            (manager_id, status, limit),
+        ).fetchall()
+        return [self._payload(row[0], row[1]) for row in rows]
+
+    def cancel(self, job_id: str) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """Cancela um job em fila de outro processo.
+
+        Returns:
+            (cancelado, estado) ou None se o job não existe
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT status, version, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            payload = self._payload(row[0], row[2])
+            if row[0] != JobStatus.QUEUED.value:
+                conn.execute("COMMIT")
+                return False, payload
+            payload.update(
+                status=JobStatus.CANCELLED.value,
+                finished_at=_now_iso(),
+                error="Cancelled before start",
+                position=None,
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, version = ?, payload = ? WHERE id = ?",
+                (JobStatus.CANCELLED.value, row[1] + 1, json.dumps(payload, default=str), job_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True, payload
+
+    def claim(self, job_id: str) -> bool:
+        """Marca o job como em execução; False se entretanto foi cancelado noutro processo."""
+        conn = self._connection()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ? WHERE id = ? AND status != 'cancelled'",
+            (JobStatus.RUNNING.value, job_id),
+        )
+        if cursor.rowcount:
+            return True
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is None or row[0] != JobStatus.CANCELLED.value
+
+    def trim(self, limit: int) -> None:
+        """Remove os jobs terminados mais antigos acima do limite de histórico."""
+        self._connection().execute(
+            f"""
+            DELETE FROM jobs WHERE id IN (
+                SELECT id FROM jobs WHERE status IN ({", ".join("?" * len(_FINAL_VALUES))})
+                ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (*_FINAL_VALUES, limit),
+        )
+
+    @staticmethod
+    def _payload(status: str, payload: str) -> Dict[str, Any]:
+        data = json.loads(payload)
+        # A coluna é a fonte de verdade: `claim` só atualiza o estado.
+        data["status"] = status
+        return data
+
+    def _connection(self) -> sqlite3.Connection:
+        connections = getattr(_sqlite_local, "connections", None)
+        if connections is None:
+            connections = _sqlite_local.connections = {}
+        key = str(self.db_path)
+        conn = connections.get(key)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit: transações explícitas só em `cancel`.
+            conn = sqlite3.connect(key, isolation_level=None, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}")
+            for statement in JOB_STORE_SCHEMA:
+                conn.execute(statement)
+            connections[key] = conn
+        return conn
+
+
+JOB_STORE_BACKENDS = ("memory", "sqlite")
+
+
+def create_job_store() -> Optional[SQLiteJobStore]:
+    """Store partilhado escolhido por JOBS_BACKEND (None para `memory`, o valor por omissão).
+
+    Raises:
+        ValueError: Se JOBS_BACKEND não for um backend conhecido
+    """
+    backend = os.getenv("JOBS_BACKEND", "memory").strip().lower()
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    raise ValueError(f"Invalid JOBS_BACKEND: {backend!r} (expected: {', '.join(JOB_STORE_BACKENDS)})")
+
+
+class JobManager:
+    """Fila de jobs com serialização por gestor e workers criados a pedido."""
+
+    MAX_WORKERS = 4
+    HISTORY_LIMIT = 500
+    LOCK_RETRY_INTERVAL = 0.5  # segundos entre tentativas quando o lock está ocupado
+
+    def __init__(
+        self,
+        operation_queue: Optional[OperationQueue] = None,
+        max_workers: Optional[int] = None,
+        store: Optional[SQLiteJobStore] = None,
+    ) -> None:
+        self.operation_queue = operation_queue or get_operation_queue()
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self.store = store
+        # Uma só thread: as escritas no store ficam pela ordem das mudanças de estado.
+        self._store_writer = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store") if store is not None else None
+        )
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: Dict[str, Deque[Job]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._submitted = 0
+        self._completed = 0
+
+    # --- API pública ------------------------------------------------------------------
+
+    def submit(
+        self,
+        kind: str,
+        manager_id: str,
+        func: Callable[[], Coroutine[Any, Any, Any]],
+        operation_id: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        on_cancel: Optional[Callable[[], None]] = None,
+    ) -> Job:
+        """Enfileira `func` (sem argumentos) e devolve o job sem esperar (chamar no loop).
+
+        `on_cancel` é chamado se o job for cancelado antes de começar (ex.: para
+        fechar o registo de uma operação retomada do journal).
+        """
+        job = Job(
+            id=uuid4().hex,
+            kind=kind,
+            manager_id=manager_id,
+            operation_id=operation_id or f"{kind}:{manager_id}",
+            params=params or {},
+            func=func,
+            on_cancel=on_cancel,
+        )
+        self._jobs[job.id] = job
+        self._pending.setdefault(manager_id, deque()).append(job)
+        self._submitted += 1
+        self._trim_history()
+        self._publish(job, new=True)
+
+        loop = asyncio.get_running_loop()
+        worker = self._workers.get(manager_id)
+        if worker is None or worker.done() or worker.get_loop() is not loop:
+            self._workers[manager_id] = loop.create_task(self._worker(manager_id))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(
+        self,
+        manager_id: Optional[str] = None,
+        status: Optional[JobStatus] = None,
+    ) -> List[Job]:
+        """Jobs conhecidos, do mais recente para o mais antigo."""
+        return [
+            job
+            for job in reversed(self._jobs.values())
+            if (manager_id is None or job.manager_id == manager_id)
+            and (status is None or job.status == status)
+        ]
+
+    def position(self, job: Job) -> Optional[int]:
+        """Posição na fila do gestor (0 = próximo); None se já não está em espera."""
+        pending = self._pending.get(job.manager_id, ())
+        for index, queued in enumerate(pending):
+            if queued is job:
+                return index
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela um job ainda em fila. Jobs em execução não são interrompidos."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status != JobStatus.QUEUED or job.started_at is not None:
+            return False
+        self._cancel(job)
+        return True
+
+    async def get_shared(self, job_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Estado (e versão) de um job de outro processo, lido do store partilhado."""
+        if self.store is None:
+            return None
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def list_shared(
+        self,
+        manager_id: Optional[str] = None,
+        status: Optional[JobStatus] = None,
+    ) -> List[Dict[str, Any]]:
+        """Jobs de todos os processos no store partilhado, do mais recente para o mais antigo."""
+        if self.store is None:
+            return []
+        return await asyncio.to_thread(
+            self.store.list, manager_id, status.value if status else None, self.HISTORY_LIMIT
+        )
+
+    async def cancel_shared(self, job_id: str) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        """Cancela um job em fila de outro processo (ver SQLiteJobStore.cancel)."""
+        if self.store is None:
+            return None
+        return await asyncio.to_thread(self.store.cancel, job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Job:
+        """Espera até o job terminar."""
+        job = self._require(job_id)
+        async for _ in self.watch(job_id, timeout=timeout):
+            pass
+        return job
+
+    async def watch(self, job_id: str, timeout: Optional[float] = None) -> AsyncIterator[Job]:
+        """Gera o job sempre que muda de estado, terminando quando fica final.
+
+        `timeout` limita a espera por cada mudança (asyncio.TimeoutError se exceder).
+        """
+        job = self._require(job_id)
+        yield job
+        while not job.done:
+            waiter = asyncio.get_running_loop().create_future()
+            job._waiters.append(waiter)
+            await asyncio.wait_for(waiter, timeout)
+            yield job
+
+    async def join(self) -> None:
+        """Espera que todas as filas fiquem vazias (testes e shutdown)."""
+        while True:
+            workers = [task for task in self._workers.values() if not task.done()]
+            if not workers:
+                break
+            await asyncio.gather(*workers, return_exceptions=True)
+        if self._store_writer is not None:
+            # Espera pelas escritas no store ainda pendentes.
+            await asyncio.wrap_future(self._store_writer.submit(lambda: None))
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            counts[job.status.value] += 1
+        return {
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "workers": sum(1 for task in self._workers.values() if not task.done()),
+            **counts,
+        }
+
+    # --- Execução ---------------------------------------------------------------------
+
+    async def _worker(self, manager_id: str) -> None:
+        pending = self._pending[manager_id]
+        try:
+            while pending:
+                job = pending.popleft()
+                # As posições dos restantes mudaram; os outros processos só as veem pelo store.
+                for queued in pending:
+                    self._publish(queued)
+                if not job.done:
+                    await self._run(job)
+        finally:
+            if not pending and self._pending.get(manager_id) is pending:
+                del self._pending[manager_id]
+
+    async def _run(self, job: Job) -> None:
+        while True:
+            async with self._slots_for_loop():
+                if job.done:  # cancelado enquanto esperava por um slot
+                    return
+                try:
+                    result = await self.operation_queue.execute(
+                        job.operation_id,
+                        OperationType.MUTATION,
+                        self._execute,
+                        job,
+                        scope=job.manager_id,
+                    )
+                except _CancelledElsewhere:
+                    self._cancel(job)
+                    return
+                except OperationInProgressError as exc:
+                    # Lock segurado fora desta fila (outro processo): mantém-se em fila.
+                    if job.blocked_by != str(exc):
+                        job.blocked_by = str(exc)
+                        self._notify(job)
+                except Exception as exc:
+                    logger.exception("Job %s (%s) falhou", job.id, job.operation_id)
+                    self._finish(job, JobStatus.FAILED, error=str(exc) or exc.__class__.__name__)
+                    return
+                else:
+                    self._finish(job, JobStatus.SUCCEEDED, result=result)
+                    return
+            # Fora do slot: não ocupa um worker enquanto espera pelo lock.
+            await asyncio.sleep(self.LOCK_RETRY_INTERVAL)
+
+    async def _execute(self, job: Job) -> Any:
+        if self.store is not None and not await self._store_call(self.store.claim, job.id, default=True):
+            raise _CancelledElsewhere(job.id)
+        job.status = JobStatus.RUNNING
+        job.started_at = _now_iso()
+        job.blocked_by = None
+        self._notify(job)
+        return await job.func()
+
+    def _finish(self, job: Job, status: JobStatus, result: Any = None, error: Optional[str] = None) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = _now_iso()
+        job.func = None
+        job.on_cancel = None
+        self._completed += 1
+        self._notify(job)
+
+    def _cancel(self, job: Job) -> None:
+        pending = self._pending.get(job.manager_id)
+        if pending is not None and job in pending:
+            pending.remove(job)
+        on_cancel = job.on_cancel
+        self._finish(job, JobStatus.CANCELLED, error="Cancelled before start")
+        if on_cancel is not None:
+            try:
+                on_cancel()
+            except Exception:
+                logger.exception("Job %s: falha ao processar o cancelamento", job.id)
+
+    def _slots_for_loop(self) -> asyncio.Semaphore:
+        # Primitivas asyncio ficam associadas ao loop onde são usadas pela primeira vez.
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_workers)
+        return self._slots
+
+    def _notify(self, job: Job) -> None:
+        job.version += 1
+        waiters, job._waiters = job._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._publish(job)
+
+    def _publish(self, job: Job, new: bool = False) -> None:
+        """Publica o estado do job no store partilhado (se configurado), fora do event loop."""
+        if self._store_writer is None:
+            return
+        payload = job.to_dict()
+        payload["position"] = self.position(job)
+        self._store_writer.submit(self._store_save, payload, job.version, new)
+
+    def _store_save(self, payload: Dict[str, Any], version: int, new: bool) -> None:
+        try:
+            self.store.save(payload, version)
+            if new:
+                self.store.trim(self.HISTORY_LIMIT)
+        except sqlite3.Error as exc:
+            logger.warning("Job %s: falha ao publicar o estado no store partilhado: %s", payload["id"], exc)
+
+    async def _store_call(self, func: Callable[..., Any], *args: Any, default: Any = None) -> Any:
+        """Executa `func` na thread de escrita, depois das publicações pendentes."""
+        def call() -> Any:
+            try:
+                return func(*args)
+            except sqlite3.Error as exc:
+                logger.warning("Store de jobs indisponível: %s", exc)
+                return default
+
+        return await asyncio.wrap_future(self._store_writer.submit(call))
+
+    def _require(self, job_id: str) -> Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def _trim_history(self) -> None:
+        """Remove os jobs terminados mais antigos acima do limite de histórico."""
+        excess = len(self._jobs) - self.HISTORY_LIMIT
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:excess]:
+            del self._jobs[job_id]
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(store=create_job_store())
+    return _job_manager
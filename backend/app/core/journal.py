@@ -0,0 +1,293 @@
+"""Journal de escrita antecipada para mutações retomáveis após um crash.
+
+Cada operação tem um ficheiro JSONL próprio em `journal/`, ao qual só se
+acrescentam registos: `begin` (tipo, gestor e parâmetros), `checkpoint`
+(estado já obtido, ex.: o id do snapshot prévio), `plan` (a lista de passos),
+`start` (passos prestes a executar, escrito ANTES de os executar), `done` (o
+resultado de cada passo) e por fim `end`. Cada registo é sincronizado com
+fsync antes de a operação avançar, pelo que os métodos que escrevem bloqueiam:
+a partir do event loop devem correr numa thread.
+
+Depois de um crash o ficheiro diz assim que passos terminaram (nunca são
+repetidos), quais nunca começaram (executam-se normalmente) e quais ficaram a
+meio (`start` sem `done`), que têm de ser reconciliados com o estado real do
+sistema antes de prosseguir.
+
+Operações terminadas são removidas, pelo que o diretório só contém operações
+em curso ou interrompidas. Enquanto uma operação está a ser executada o seu
+ficheiro fica com flock exclusivo: outro processo (ex.: outro worker do
+servidor) nunca retoma uma operação que ainda está viva.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from app.core.validation import ValidationLayer
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class JournalError(Exception):
+    """Journal ilegível ou operação já terminada."""
+
+
+class JournalEntry:
+    """Journal de uma operação, com o estado reconstruído a partir dos registos."""
+
+    def __init__(self, path: Path, fd: int) -> None:
+        self.path = path
+        self.id = path.stem
+        self.kind = ""
+        self.manager_id = ""
+        self.params: Dict[str, Any] = {}
+        self.created_at: Optional[str] = None
+        self.state: Dict[str, Any] = {}
+        self.plan: Optional[List[str]] = None
+        self.started: List[str] = []
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        self.finished = False
+        self._fd: Optional[int] = fd
+
+    # --- Estado -----------------------------------------------------------------------
+
+    @property
+    def pending_steps(self) -> List[str]:
+        """Passos do plano ainda sem resultado, pela ordem do plano."""
+        return [step for step in self.plan or [] if step not in self.completed]
+
+    @property
+    def in_doubt(self) -> List[str]:
+        """Passos iniciados sem resultado registado: podem ou não ter sido aplicados."""
+        started = set(self.started)
+        return [step for step in self.pending_steps if step in started]
+
+    @property
+    def resumed(self) -> bool:
+        """True se a operação já tinha avançado para lá do `begin` antes desta execução."""
+        return bool(self.state or self.plan is not None)
+
+    # --- Registos ---------------------------------------------------------------------
+
+    def checkpoint(self, **values: Any) -> None:
+        """Guarda estado já obtido, para não o recalcular se a operação for retomada."""
+        self._append({"type": "checkpoint", "data": values})
+        self.state.update(values)
+
+    def set_plan(self, steps: List[str]) -> None:
+        if self.plan is not None:
+            raise JournalError(f"Operation {self.id} already has a plan.")
+        steps = list(dict.fromkeys(steps))
+        self._append({"type": "plan", "steps": steps})
+        self.plan = steps
+
+    def start_steps(self, steps: List[str]) -> None:
+        """Regista (antes de executar) que os passos vão ser aplicados."""
+        self._append({"type": "start", "steps": list(steps)})
+        self.started.extend(step for step in steps if step not in self.started)
+
+    def complete_step(
+        self,
+        step: str,
+        success: bool,
+        error: Optional[str] = None,
+        reconciled: bool = False,
+    ) -> None:
+        outcome: Dict[str, Any] = {"success": success}
+        if error is not None:
+            outcome["error"] = error
+        if reconciled:
+            outcome["reconciled"] = True
+        self._append({"type": "done", "step": step, **outcome})
+        self.completed[step] = outcome
+
+    def finish(self, result: Any = None, error: Optional[str] = None) -> None:
+        """Marca a operação como terminada e remove o journal."""
+        self._append({"type": "end", "result": result, "error": error})
+        self.finished = True
+        try:
+            self.path.unlink()
+        except OSError as exc:
+            # O registo `end` já garante que não é retomada.
+            logger.warning("Falha ao remover journal %s: %s", self.path, exc)
+        self.close()
+
+    def close(self) -> None:
+        """Fecha o ficheiro (e liberta o flock) sem terminar a operação."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # --- Internos ---------------------------------------------------------------------
+
+    def _append(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if self._fd is None or self.finished:
+            raise JournalError(f"Operation {self.id} is not open for writing.")
+        record = {"ts": _now_iso(), **record}
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        os.write(self._fd, line.encode("utf-8"))
+        os.fsync(self._fd)
+        return record
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        kind = record.get("type")
+        if kind == "begin":
+            self.kind = record["kind"]
+            self.manager_id = record["manager"]
+            self.params = record.get("params") or {}
+            self.created_at = record.get("ts")
+        elif kind == "checkpoint":
+            self.state.update(record.get("data") or {})
+        elif kind == "plan":
+            self.plan = record["steps"]
+        elif kind == "start":
+            self.started.extend(step for step in record["steps"] if step not in self.started)
+        elif kind == "done":
+            self.completed[record["step"]] = {
+                key: value for key, value in record.items() if key not in ("type", "step", "ts")
+            }
+        elif kind == "end":
+            self.finished = True
+
+
+class OperationJournal:
+    """Diretório de journals de operações de mutação."""
+
+    DIR_NAME = "journal"
+    SUFFIX = ".jsonl"
+
+    def __init__(self, base_dir: Optional[Path] = None) -> None:
+        self.base_dir = base_dir or ValidationLayer.ALLOWED_BASE_DIR / self.DIR_NAME
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+    def begin(self, kind: str, manager_id: str, params: Optional[Dict[str, Any]] = None) -> JournalEntry:
+        """Cria o journal de uma nova operação, já reclamado por este processo."""
+        path = self.base_dir / f"{uuid4().hex}{self.SUFFIX}"
+        # Criado com outro nome e renomeado já com o flock e o `begin`: quem
+        # procura journals pendentes nunca vê um ficheiro a meio da criação.
+        tmp_path = path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            if not self._try_flock(fd):  # pragma: no cover - ficheiro acabado de criar
+                raise JournalError(f"Could not lock journal {path.name}.")
+            entry = JournalEntry(path, fd)
+            entry._apply(entry._append({"type": "begin", "kind": kind, "manager": manager_id, "params": params or {}}))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.close(fd)
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self._sync_dir()
+        return entry
+
+    def claim_pending(self) -> List[JournalEntry]:
+        """Reclama as operações interrompidas (sem `end`), das mais antigas para as mais recentes.
+
+        Journals segurados por outro processo vivo são ignorados; os já
+        terminados são apagados. Cabe a quem reclama retomar ou terminar cada
+        operação (ou `close()` para a deixar para um próximo arranque).
+        """
+        entries: List[JournalEntry] = []
+        for path in self._journal_files():
+            entry = self._claim(path)
+            if entry is None:
+                continue
+            if entry.finished or not entry.kind:
+                # Terminou mas não chegou a ser removido (ou não tem `begin` legível).
+                entry.close()
+                path.unlink(missing_ok=True)
+                continue
+            entries.append(entry)
+        return entries
+
+    def pending_count(self) -> int:
+        """Número de journals por terminar (incluindo os de operações em curso)."""
+        return len(self._journal_files())
+
+    # --- Internos ---------------------------------------------------------------------
+
+    def _journal_files(self) -> List[Path]:
+        files = []
+        for path in self.base_dir.glob(f"*{self.SUFFIX}"):
+            try:
+                files.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+        return [path for _, path in sorted(files)]
+
+    def _claim(self, path: Path) -> Optional[JournalEntry]:
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_APPEND)
+        except FileNotFoundError:
+            return None
+        if not self._try_flock(fd):
+            os.close(fd)
+            return None
+
+        entry = JournalEntry(path, fd)
+        try:
+            for record in self._read_records(fd, path):
+                entry._apply(record)
+        except (KeyError, TypeError) as exc:
+            entry.close()
+            logger.error("Journal %s inválido (%s); ignorado", path.name, exc)
+            return None
+        return entry
+
+    @staticmethod
+    def _read_records(fd: int, path: Path) -> List[Dict[str, Any]]:
+        size = os.fstat(fd).st_size
+        data = os.pread(fd, size, 0) if size else b""
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Escrita interrompida a meio: descarta a linha truncada antes de acrescentar.
+            logger.warning("Journal %s: registo final incompleto descartado", path.name)
+            os.ftruncate(fd, complete)
+            os.fsync(fd)
+
+        records = []
+        for line in data[:complete].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("Journal %s: registo ilegível ignorado", path.name)
+        return records
+
+    @staticmethod
+    def _try_flock(fd: int) -> bool:
+        if fcntl is None:  # pragma: no cover - Windows
+            return True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def _sync_dir(self) -> None:
+        """Torna a criação do ficheiro durável (a entrada de diretório também precisa de fsync)."""
+        try:
+            dir_fd = os.open(self.base_dir, os.O_RDONLY)
+        except OSError:  # pragma: no cover - ex.: Windows
+            return
+        try:
+            os.fsync(dir_fd)
+        except OSError:  # pragma: no cover
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
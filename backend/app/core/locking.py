@@ -1,125 +1,329 @@
-"""Gestor de locks baseado em ficheiro para serializar operações críticas."""
+"""Locks de operação por gestor, baseados em locks de ficheiro do kernel, para serializar mutações.
+
+Cada gestor tem o seu ficheiro de lock (`locks/<manager>.lock`) e as mutações
+de gestores diferentes correm em paralelo. Operações que abrangem vários
+gestores usam o lock global: quem segura um lock de gestor segura também o
+global em modo partilhado, pelo que o global exclusivo só é obtido quando não
+há nenhuma mutação em curso (e bloqueia novas mutações enquanto durar).
+
+O kernel liberta os locks quando o processo termina, por isso não há
+heurística de expiração: um lock está ativo se e só se alguém o segura. O
+conteúdo do ficheiro (operação, pid, timestamp) é apenas informativo.
+
+Em Linux os locks são "open file description locks" (F_OFD_SETLK): têm a
+semântica do flock (por descritor aberto, libertados ao fechar) e podem ser
+consultados com F_OFD_GETLK sem serem obtidos, pelo que `is_locked` e
+`list_locks` nunca fazem falhar um `acquire_lock` concorrente. Noutras
+plataformas usa-se flock e a consulta tem de obter (e largar) o lock.
+"""
 from __future__ import annotations
 
 import atexit
 import json
 import os
-import signal
+import re
+import struct
+import threading
 import time
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+GLOBAL_SCOPE = "global"
+
+# struct flock (l_type, l_whence, l_start, l_len, l_pid), usada pelos OFD locks.
+_OFD_LOCKS = fcntl is not None and hasattr(fcntl, "F_OFD_SETLK")
+_FLOCK_STRUCT = struct.Struct("hhqqi")
+
+_SCOPE_RE = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
 
 
 class OperationInProgressError(Exception):
     """Operação bloqueada por lock existente."""
 
 
+class _ProcessLocks:
+    """Emulação local de flock para plataformas sem fcntl (só exclui dentro do processo)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._holders: Dict[str, Tuple[bool, int]] = {}  # caminho -> (exclusivo, contagem)
+
+    def acquire(self, path: str, exclusive: bool) -> bool:
+        with self._lock:
+            held_exclusive, count = self._holders.get(path, (False, 0))
+            if count and (exclusive or held_exclusive):
+                return False
+            self._holders[path] = (exclusive, count + 1)
+            return True
+
+    def release(self, path: str) -> None:
+        with self._lock:
+            exclusive, count = self._holders.get(path, (False, 0))
+            if count <= 1:
+                self._holders.pop(path, None)
+            else:
+                self._holders[path] = (exclusive, count - 1)
+
+
+_process_locks = _ProcessLocks()
+
+
 class LockManager:
-    """Controla exclusão mútua de operações de mutação."""
+    """Controla exclusão mútua de operações de mutação, por gestor ou global."""
 
-    LOCK_FILE = Path.home() / ".package-audit" / ".lock"
-    TIMEOUT = 30  # segundos
+    LOCK_DIR = Path.home() / ".package-audit" / "locks"
+    LOCK_SUFFIX = ".lock"
 
     def __init__(self) -> None:
-        self.LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+        self.LOCK_DIR.mkdir(parents=True, exist_ok=True)
+        # scope -> (handle do scope, handle partilhado do global ou None)
+        self._held: Dict[str, Tuple[IO[str], Optional[IO[str]]]] = {}
+        self._guard = threading.Lock()
         atexit.register(self._cleanup_handler)
-        self._register_signal(signal.SIGTERM)
-        self._register_signal(signal.SIGINT)
 
-    def _register_signal(self, sig) -> None:
-        try:
-            signal.signal(sig, self._signal_handler)
-        except (AttributeError, ValueError):
-            # A plataforma não suporta este sinal (ex.: Windows) ou estamos fora da main thread.
-            pass
+    def acquire_lock(self, operation_id: str, scope: Optional[str] = None) -> bool:
+        """Tenta obter o lock de `scope` (global se omitido) sem bloquear."""
+        scope = self._scope(scope)
+        with self._guard:
+            if scope in self._held:
+                return False
 
-    def acquire_lock(self, operation_id: str) -> bool:
-        if self.is_locked() and not self.is_stale():
-            return False
+            global_handle: Optional[IO[str]] = None
+            if scope != GLOBAL_SCOPE:
+                global_handle = self._try_lock(GLOBAL_SCOPE, exclusive=False)
+                if global_handle is None:
+                    return False
 
-        if self.is_stale():
-            self.release_lock(force=True)
-
-        lock_data = {
-            "operation": operation_id,
-            "pid": os.getpid(),
-            "timestamp": datetime.now().isoformat(),
-            "hostname": getattr(os, "uname", lambda: None)() .nodename
-            if hasattr(os, "uname")
-            else os.getenv("HOSTNAME", "unknown"),
-        }
+            handle = self._try_lock(scope, exclusive=True)
+            if handle is None:
+                if global_handle is not None:
+                    self._unlock(global_handle)
+                return False
 
-        try:
-            with open(self.LOCK_FILE, "w", encoding="utf-8") as lock:
-                json.dump(lock_data, lock, indent=2)
+            self._write_info(handle, operation_id, scope)
+            self._held[scope] = (handle, global_handle)
             return True
-        except OSError:
-            return False
 
-    def release_lock(self, force: bool = False) -> bool:
-        if not self.is_locked():
+    def release_lock(self, scope: Optional[str] = None, force: bool = False) -> bool:
+        """Liberta um lock segurado por este processo.
+
+        Locks de outros processos não podem ser libertados (nem com `force`):
+        o kernel liberta-os quando esse processo termina.
+        """
+        scope = self._scope(scope)
+        with self._guard:
+            held = self._held.pop(scope, None)
+        if held is None:
             return False
 
+        handle, global_handle = held
         try:
-            lock_data = self.get_lock_info() or {}
-            if force or lock_data.get("pid") == os.getpid():
-                self.LOCK_FILE.unlink(missing_ok=True)
-                return True
-            return False
+            handle.truncate(0)
         except OSError:
-            return False
-
-    def is_locked(self) -> bool:
-        return self.LOCK_FILE.exists()
+            pass
+        self._unlock(handle)
+        if global_handle is not None:
+            self._unlock(global_handle)
+        return True
 
-    def is_stale(self) -> bool:
-        if not self.is_locked():
-            return False
+    def is_locked(self, scope: Optional[str] = None) -> bool:
+        """True se o lock de `scope` está ativo.
 
-        lock_data = self.get_lock_info()
-        if not lock_data:
-            return True
+        Para o scope global (omissão) é True enquanto houver qualquer mutação
+        em curso, já que o global exclusivo não poderia ser obtido.
+        """
+        scope = self._scope(scope)
+        with self._guard:
+            if scope in self._held:
+                return True
+        return self._probe(scope, exclusive=True)
 
-        try:
-            lock_time = datetime.fromisoformat(lock_data["timestamp"])
-        except (KeyError, ValueError):
-            return True
+    def get_lock_info(self, scope: Optional[str] = None) -> Optional[Dict]:
+        """Informação do lock ativo em `scope`.
 
-        return datetime.now() - lock_time > timedelta(seconds=self.TIMEOUT)
+        Sem scope devolve o lock global ou, se este estiver livre, o primeiro
+        lock de gestor ativo; None se nada estiver bloqueado.
+        """
+        if scope is not None:
+            scope = self._scope(scope)
+            return self._read_info(scope) if self.is_locked(scope) else None
 
-    def get_lock_info(self) -> Optional[Dict]:
-        if not self.is_locked():
+        locks = self.list_locks()
+        if not locks:
             return None
+        return locks.get(GLOBAL_SCOPE) or locks[sorted(locks)[0]]
 
-        try:
-            with open(self.LOCK_FILE, "r", encoding="utf-8") as lock:
-                return json.load(lock)
-        except (OSError, json.JSONDecodeError):
-            return None
+    def list_locks(self) -> Dict[str, Dict]:
+        """Todos os locks ativos, por scope."""
+        active: Dict[str, Dict] = {}
+        for scope in self._known_scopes():
+            if scope == GLOBAL_SCOPE:
+                # O global em modo partilhado não tem dono próprio; só conta o exclusivo.
+                if not self._global_held_exclusively():
+                    continue
+            elif not self.is_locked(scope):
+                continue
+            active[scope] = self._read_info(scope) or {"operation": "unknown", "scope": scope}
+        return active
 
     def wait_for_lock(
         self,
         operation_id: str,
         max_wait: int = 60,
         poll_interval: float = 0.5,
+        scope: Optional[str] = None,
     ) -> bool:
         start = time.time()
         while time.time() - start < max_wait:
-            if self.acquire_lock(operation_id):
+            if self.acquire_lock(operation_id, scope):
                 return True
             time.sleep(poll_interval)
         return False
 
-    def force_release(self) -> None:
-        self.release_lock(force=True)
+    def force_release(self, scope: Optional[str] = None) -> None:
+        """Liberta os locks deste processo (todos, se `scope` for omitido)."""
+        if scope is not None:
+            self.release_lock(scope, force=True)
+            return
+        with self._guard:
+            scopes = list(self._held)
+        for held_scope in scopes:
+            self.release_lock(held_scope, force=True)
+
+    # --- Internos ---------------------------------------------------------------------
+
+    @staticmethod
+    def _scope(scope: Optional[str]) -> str:
+        scope = scope or GLOBAL_SCOPE
+        if not _SCOPE_RE.match(scope):
+            raise ValueError(f"Invalid lock scope: {scope!r}")
+        return scope
+
+    def _lock_path(self, scope: str) -> Path:
+        return self.LOCK_DIR / f"{scope}{self.LOCK_SUFFIX}"
+
+    def _known_scopes(self) -> List[str]:
+        with self._guard:
+            held = set(self._held)
+        if self.LOCK_DIR.is_dir():
+            held.update(path.stem for path in self.LOCK_DIR.glob(f"*{self.LOCK_SUFFIX}"))
+        return sorted(held)
+
+    def _global_held_exclusively(self) -> bool:
+        with self._guard:
+            if GLOBAL_SCOPE in self._held:
+                return True
+        # Um pedido partilhado só falha se alguém segurar o global em exclusivo.
+        return self._probe(GLOBAL_SCOPE, exclusive=False)
+
+    def _probe(self, scope: str, exclusive: bool) -> bool:
+        """True se um lock (exclusivo ou partilhado) em `scope` seria recusado agora."""
+        if not _OFD_LOCKS:
+            handle = self._try_lock(scope, exclusive)
+            if handle is None:
+                return True
+            self._unlock(handle)
+            return False
+
+        # Só consulta (F_OFD_GETLK): não obtém nada, logo não compete com acquire_lock.
+        try:
+            handle = open(self._lock_path(scope), "r", encoding="utf-8")
+        except FileNotFoundError:
+            return False
+        with handle:
+            lock_type = fcntl.F_WRLCK if exclusive else fcntl.F_RDLCK
+            request = _FLOCK_STRUCT.pack(lock_type, os.SEEK_SET, 0, 0, 0)
+            reply = fcntl.fcntl(handle.fileno(), fcntl.F_OFD_GETLK, request)
+        return _FLOCK_STRUCT.unpack(reply)[0] != fcntl.F_UNLCK
+
+    def _try_lock(self, scope: str, exclusive: bool) -> Optional[IO[str]]:
+        """Abre o ficheiro do scope e tenta o lock sem bloquear; None se ocupado."""
+        self.LOCK_DIR.mkdir(parents=True, exist_ok=True)
+        # "a+" não trunca: a informação do dono atual fica intacta se o lock falhar.
+        handle = open(self._lock_path(scope), "a+", encoding="utf-8")
+        if fcntl is None:  # pragma: no cover - Windows
+            if _process_locks.acquire(handle.name, exclusive):
+                return handle
+            handle.close()
+            return None
+        try:
+            if _OFD_LOCKS:
+                lock_type = fcntl.F_WRLCK if exclusive else fcntl.F_RDLCK
+                request = _FLOCK_STRUCT.pack(lock_type, os.SEEK_SET, 0, 0, 0)
+                fcntl.fcntl(handle.fileno(), fcntl.F_OFD_SETLK, request)
+            else:
+                fcntl.flock(handle.fileno(), (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+        return handle
+
+    @staticmethod
+    def _unlock(handle: IO[str]) -> None:
+        if fcntl is None:  # pragma: no cover - Windows
+            _process_locks.release(handle.name)
+        # Fechar o descritor liberta o lock.
+        handle.close()
+
+    @staticmethod
+    def _write_info(handle: IO[str], operation_id: str, scope: str) -> None:
+        lock_data = {
+            "operation": operation_id,
+            "scope": scope,
+            "pid": os.getpid(),
+            "timestamp": datetime.now().isoformat(),
+            "hostname": os.uname().nodename
+            if hasattr(os, "uname")
+            else os.getenv("HOSTNAME", "unknown"),
+        }
+        try:
+            handle.seek(0)
+            handle.truncate()
+            json.dump(lock_data, handle, indent=2)
+            handle.flush()
+        except OSError:
+            # A informação é só diagnóstica; o lock já está garantido.
+            pass
+
+    def _read_info(self, scope: str) -> Optional[Dict]:
+        try:
+            with open(self._lock_path(scope), "r", encoding="utf-8") as lock:
+                return json.load(lock)
+        except (OSError, json.JSONDecodeError):
+            return None
 
     def _cleanup_handler(self) -> None:
-        self.release_lock()
+        self.force_release()
+
+
+# Um lock por ficheiro, para as threads do processo (flock exclui os outros processos).
+_file_guards: Dict[str, threading.Lock] = {}
+_file_guards_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Segura um flock exclusivo em `path` durante o bloco, esperando se preciso.
 
-    def _signal_handler(self, signum, frame) -> None:  # pragma: no cover
-        self.release_lock()
-        raise SystemExit(0)
+    Serve para secções críticas curtas partilhadas entre threads e processos
+    (ex.: leitura-modificação-escrita de um índice). Não é reentrante.
+    """
+    with _file_guards_lock:
+        guard = _file_guards.setdefault(str(path), threading.Lock())
+    with guard:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a+", encoding="utf-8") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            # Fechar o descritor liberta o flock.
+            yield
 
 
 _lock_manager: Optional[LockManager] = None
@@ -0,0 +1,154 @@
+"""Índice de executáveis do PATH para evitar `shutil.which` repetidos."""
+from __future__ import annotations
+
+import os
+import shutil
+import stat
+import time
+from threading import Lock
+from typing import Dict, List, Optional
+
+
+class PathIndex:
+    """Mapeia nomes de executáveis para caminhos resolvidos.
+
+    O índice é reconstruído apenas quando o PATH muda ou quando a mtime de
+    algum diretório do PATH muda (executável instalado/removido). Essa
+    validação é feita no máximo uma vez por VALIDATE_INTERVAL segundos.
+    """
+
+    VALIDATE_INTERVAL = 1.0
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._path: Optional[str] = None
+        self._dir_mtimes: Dict[str, Optional[int]] = {}
+        self._index: Dict[str, str] = {}
+        self._validated_at = 0.0
+        self.lookups = 0
+        self.hits = 0
+        self.rescans = 0
+
+    def which(self, name: str) -> Optional[str]:
+        """Equivalente a `shutil.which` servido a partir do índice."""
+        if os.path.dirname(name):
+            # Caminhos explícitos não dependem do PATH.
+            return shutil.which(name)
+
+        with self._lock:
+            self.lookups += 1
+            if self._is_stale():
+                self._rebuild()
+                self.rescans += 1
+            else:
+                self.hits += 1
+            return self._index.get(self._normalize(name))
+
+    def invalidate(self) -> None:
+        """Força reconstrução na próxima pesquisa."""
+        with self._lock:
+            self._path = None
+
+    def stats(self) -> Dict[str, int]:
+        """Métricas de utilização do índice."""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "rescans": self.rescans,
+                "entries": len(self._index),
+                "directories": len(self._dir_mtimes),
+            }
+
+    # --- Helpers ----------------------------------------------------------------------
+
+    @staticmethod
+    def _current_path() -> str:
+        return os.environ.get("PATH", os.defpath)
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        return name.lower() if os.name == "nt" else name
+
+    @staticmethod
+    def _mtime(directory: str) -> Optional[int]:
+        try:
+            return os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def _is_stale(self) -> bool:
+        if self._path != self._current_path():
+            return True
+
+        now = time.monotonic()
+        if now - self._validated_at < self.VALIDATE_INTERVAL:
+            return False
+        self._validated_at = now
+
+        return any(
+            self._mtime(directory) != mtime
+            for directory, mtime in self._dir_mtimes.items()
+        )
+
+    def _rebuild(self) -> None:
+        path = self._current_path()
+        directories: List[str] = []
+        for directory in path.split(os.pathsep):
+            if directory and directory not in directories:
+                directories.append(directory)
+
+        extensions: List[str] = []
+        if os.name == "nt":
+            extensions = [
+                ext.lower()
+                for ext in os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD").split(os.pathsep)
+                if ext
+            ]
+
+        index: Dict[str, str] = {}
+        dir_mtimes: Dict[str, Optional[int]] = {}
+        for directory in directories:
+            dir_mtimes[directory] = self._mtime(directory)
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+
+            for entry in entries:
+                for key in self._index_keys(entry, extensions):
+                    # Tal como no shutil.which, o primeiro diretório do PATH prevalece.
+                    index.setdefault(key, entry.path)
+
+        self._index = index
+        self._dir_mtimes = dir_mtimes
+        self._path = path
+        self._validated_at = time.monotonic()
+
+    def _index_keys(self, entry: os.DirEntry, extensions: List[str]) -> List[str]:
+        try:
+            if not entry.is_file():
+                return []
+            if os.name != "nt":
+                mode = entry.stat().st_mode
+                if not mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
+                    return []
+                return [entry.name] if os.access(entry.path, os.X_OK) else []
+        except OSError:
+            return []
+
+        name = entry.name.lower()
+        root, ext = os.path.splitext(name)
+        if ext not in extensions:
+            return []
+        return [root, name]
+
+
+_path_index: Optional[PathIndex] = None
+
+
+def get_path_index() -> PathIndex:
+    global _path_index
+    if _path_index is None:
+        _path_index = PathIndex()
+    return _path_index
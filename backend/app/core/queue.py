@@ -28,13 +28,19 @@ class OperationQueue:
         operation_type: OperationType,
         func: Callable[..., Coroutine[Any, Any, Any]],
         *args,
+        scope: Optional[str] = None,
         **kwargs,
     ) -> Any:
+        """Executa `func`; mutações seguram o lock de `scope` (gestor) ou o global."""
         if operation_type == OperationType.READ:
             return await func(*args, **kwargs)
 
-        if not self.lock_manager.acquire_lock(operation_id):
-            lock_info = self.lock_manager.get_lock_info() or {}
+        if not self.lock_manager.acquire_lock(operation_id, scope):
+            lock_info = (
+                self.lock_manager.get_lock_info(scope)
+                or self.lock_manager.get_lock_info()
+                or {}
+            )
             blocker = lock_info.get("operation", "unknown")
             raise OperationInProgressError(
                 f"Operation blocked by: {blocker}"
@@ -43,7 +49,7 @@ class OperationQueue:
         try:
             return await func(*args, **kwargs)
         finally:
-            self.lock_manager.release_lock()
+            self.lock_manager.release_lock(scope)
 
 
 _queue: Optional[OperationQueue] = None
@@ -1,29 +1,103 @@
 """Rate limiting middleware for API protection."""
 from __future__ import annotations
 
+import asyncio
+import os
+import re
+import sqlite3
+import threading
 import time
-from collections import defaultdict
-from threading import Lock
+from collections import OrderedDict
+from pathlib import Path
 from typing import Callable, Dict, List, Optional, Tuple
 
 from fastapi import HTTPException, Request, Response, status
 
 from app.core.logging import get_logger
+from app.core.validation import ValidationLayer
 
 logger = get_logger(__name__)
 
 
-class RateLimiter:
+class _SlidingWindow:
     """
-    Simple in-memory rate limiter using token bucket algorithm.
+    Sliding-window counter for one client and one window size.
 
-    For production use with multiple workers, consider using Redis-based rate limiting.
+    Keeps only the counts of the current and previous fixed buckets; the
+    request rate over the last `size` seconds is estimated by weighting the
+    previous bucket by how much of it still overlaps the sliding window.
     """
 
+    __slots__ = ("size", "bucket", "previous", "current")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.bucket = 0
+        self.previous = 0
+        self.current = 0
+
+    def roll(self, now: float) -> None:
+        """Advance to the bucket containing `now`."""
+        bucket = int(now // self.size)
+        if bucket == self.bucket:
+            return
+        self.previous = self.current if bucket == self.bucket + 1 else 0
+        self.current = 0
+        self.bucket = bucket
+
+    def estimate(self, now: float) -> float:
+        """Estimated number of requests in the last `size` seconds."""
+        elapsed = now - self.bucket * self.size
+        return self.previous * (1 - elapsed / self.size) + self.current
+
+    def retry_at(self, now: float, limit: int) -> float:
+        """Earliest time at which the estimate drops below `limit` again."""
+        start = self.bucket * self.size
+        if self.current < limit:
+            # Only the previous bucket's weight has to decay.
+            return start + self.size * (1 - (limit - self.current) / self.previous)
+        # The current bucket becomes the previous one and must decay in turn.
+        return start + self.size * (2 - limit / self.current)
+
+    @property
+    def expires_at(self) -> float:
+        """Time from which this window no longer counts any request."""
+        return (self.bucket + 2) * self.size
+
+
+class _ClientState:
+    __slots__ = ("windows", "expires_at")
+
+    def __init__(self, windows: List[_SlidingWindow]):
+        self.windows = windows
+        self.expires_at = 0.0
+
+
+class RateLimiter:
+    """
+    In-memory per-client rate limiter using sliding-window counters.
+
+    Each client costs a fixed amount of memory (two counters per window) and
+    each request a constant amount of work, however close the client is to
+    its limit. Clients whose windows have fully expired are dropped by
+    `sweep()`; `max_clients` caps the table size in between sweeps by
+    evicting the least recently seen client.
+
+    State is per process: with several workers each one enforces the limits
+    on its own share of the traffic. To share the counters, use
+    SQLiteRateLimiter (RATE_LIMIT_BACKEND=sqlite). See `run_rate_limit_sweeper`
+    for periodic eviction.
+    """
+
+    MAX_CLIENTS = 100_000
+
     def __init__(
         self,
         requests_per_minute: int = 60,
         requests_per_hour: int = 1000,
+        max_clients: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+        name: str = "global",
     ):
         """
         Initialize rate limiter.
@@ -31,29 +105,30 @@ class RateLimiter:
         Args:
             requests_per_minute: Maximum requests per minute per IP
             requests_per_hour: Maximum requests per hour per IP
+            max_clients: Maximum number of clients tracked at once
+            clock: Time source in epoch seconds (overridable for tests)
+            name: Identifies the limiter's counters in shared backends
         """
+        self.name = name
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
-
-        # Storage: {ip: {minute: [(timestamp, count)], hour: [(timestamp, count)]}}
-        self._storage: Dict[str, Dict[str, List[Tuple[float, int]]]] = defaultdict(
-            lambda: {"minute": [], "hour": []}
+        self.max_clients = max_clients or self.MAX_CLIENTS
+        self._clock = clock
+        # (window size in seconds, limit, name), checked in this order
+        self._limits: Tuple[Tuple[int, int, str], ...] = (
+            (60, requests_per_minute, "minute"),
+            (3600, requests_per_hour, "hour"),
         )
-        self._lock = Lock()
 
-    def _clean_old_entries(self, entries: List[Tuple[float, int]], window: float) -> List[Tuple[float, int]]:
-        """
-        Remove entries older than the time window.
-
-        Args:
-            entries: List of (timestamp, count) tuples
-            window: Time window in seconds
+        # Least recently seen first, so idle clients are evicted from the front.
+        self._clients: "OrderedDict[str, _ClientState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
 
-        Returns:
-            Cleaned list of entries
-        """
-        current_time = time.time()
-        return [(ts, count) for ts, count in entries if current_time - ts < window]
+    @property
+    def tracked_clients(self) -> int:
+        """Number of clients currently holding rate-limit state."""
+        return len(self._clients)
 
     def is_allowed(self, client_ip: str, path: str) -> tuple[bool, dict]:
         """
@@ -67,61 +142,104 @@ class RateLimiter:
             Tuple of (allowed, info_dict)
             info_dict contains: remaining, reset_at, limit
         """
-        current_time = time.time()
+        current_time = self._clock()
 
         with self._lock:
-            # Get client's request history
-            client_data = self._storage[client_ip]
+            client = self._client(client_ip)
+            allowed, info = self._check(client.windows, current_time, client_ip, path)
+            if allowed:
+                client.expires_at = client.windows[-1].expires_at
+            return allowed, info
 
-            # Clean old entries
-            client_data["minute"] = self._clean_old_entries(client_data["minute"], 60)
-            client_data["hour"] = self._clean_old_entries(client_data["hour"], 3600)
+    async def is_allowed_async(self, client_ip: str, path: str) -> tuple[bool, dict]:
+        """
+        Check a request from the event loop (see `is_allowed`).
 
-            # Count recent requests
-            minute_count = sum(count for _, count in client_data["minute"])
-            hour_count = sum(count for _, count in client_data["hour"])
+        In-memory counters are updated in constant time under a short lock,
+        so the check runs inline; backends that do I/O override this.
+        """
+        return self.is_allowed(client_ip, path)
 
-            # Check limits
-            if minute_count >= self.requests_per_minute:
+    def _check(
+        self,
+        windows: List[_SlidingWindow],
+        current_time: float,
+        client_ip: str,
+        path: str,
+    ) -> tuple[bool, dict]:
+        """Apply the limits to a client's windows, counting the request if allowed."""
+        estimates = []
+        for window, (_, limit, limit_type) in zip(windows, self._limits):
+            window.roll(current_time)
+            count = window.estimate(current_time)
+            if count >= limit:
                 logger.warning(
                     f"Rate limit exceeded for {client_ip}",
                     client_ip=client_ip,
                     path=path,
-                    limit_type="minute",
-                    count=minute_count,
+                    limit_type=limit_type,
+                    count=int(count),
                 )
                 return False, {
                     "remaining": 0,
-                    "reset_at": int(current_time + 60),
-                    "limit": self.requests_per_minute,
-                    "limit_type": "minute",
+                    "reset_at": int(window.retry_at(current_time, limit)) + 1,
+                    "limit": limit,
+                    "limit_type": limit_type,
                 }
+            estimates.append(count)
+
+        # Allow request and increment counters
+        for window in windows:
+            window.current += 1
+
+        minute_count, hour_count = estimates
+        return True, {
+            "remaining_minute": max(0, int(self.requests_per_minute - minute_count - 1)),
+            "remaining_hour": max(0, int(self.requests_per_hour - hour_count - 1)),
+            "reset_at_minute": int(current_time + 60),
+            "reset_at_hour": int(current_time + 3600),
+        }
 
-            if hour_count >= self.requests_per_hour:
-                logger.warning(
-                    f"Rate limit exceeded for {client_ip}",
-                    client_ip=client_ip,
-                    path=path,
-                    limit_type="hour",
-                    count=hour_count,
-                )
-                return False, {
-                    "remaining": 0,
-                    "reset_at": int(current_time + 3600),
-                    "limit": self.requests_per_hour,
-                    "limit_type": "hour",
-                }
+    def sweep(self) -> int:
+        """
+        Evict clients whose windows no longer count any request.
 
-            # Allow request and increment counters
-            client_data["minute"].append((current_time, 1))
-            client_data["hour"].append((current_time, 1))
+        Returns:
+            Number of clients evicted
+        """
+        now = self._clock()
+        evicted = 0
+        with self._lock:
+            # Clients are ordered by last request, and so by expiry time.
+            while self._clients:
+                client = next(iter(self._clients.values()))
+                if client.expires_at > now:
+                    break
+                self._clients.popitem(last=False)
+                evicted += 1
+            self._evicted += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked_clients": self.tracked_clients,
+            "max_clients": self.max_clients,
+            "evicted": self._evicted,
+        }
 
-            return True, {
-                "remaining_minute": self.requests_per_minute - minute_count - 1,
-                "remaining_hour": self.requests_per_hour - hour_count - 1,
-                "reset_at_minute": int(current_time + 60),
-                "reset_at_hour": int(current_time + 3600),
-            }
+    def _client(self, client_ip: str) -> _ClientState:
+        """State for `client_ip`, marked as the most recently seen client."""
+        client = self._clients.get(client_ip)
+        if client is not None:
+            self._clients.move_to_end(client_ip)
+            return client
+
+        if len(self._clients) >= self.max_clients:
+            self._clients.popitem(last=False)
+            self._evicted += 1
+        client = _ClientState([_SlidingWindow(size) for size, _, _ in self._limits])
+        self._clients[client_ip] = client
+        return client
 
     def get_client_ip(self, request: Request) -> str:
         """
@@ -152,6 +270,219 @@ class RateLimiter:
         return "unknown"
 
 
+SQLITE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS rate_windows (
+        limiter TEXT NOT NULL,
+        client TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        previous INTEGER NOT NULL,
+        current INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        PRIMARY KEY (limiter, client, size)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS rate_windows_expiry ON rate_windows (limiter, expires_at)",
+]
+
+# sqlite3 connections cannot be shared between threads; one per thread and database.
+_sqlite_local = threading.local()
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """
+    Rate limiter whose counters live in a local SQLite database (WAL mode).
+
+    All worker processes on the host that point at the same file share the
+    counters, so the configured limits hold for the whole server rather than
+    per worker. Each request is one short IMMEDIATE transaction that reads
+    and rewrites the client's rows by primary key: constant work, serialized
+    across processes by SQLite's write lock.
+
+    If the database is unavailable, or its write lock is not obtained within
+    BUSY_TIMEOUT_MS, the request is allowed (fail open) and a warning is
+    logged; rate limiting must not take the API down. From the event loop the
+    check runs in a worker thread (`is_allowed_async`), so a contended lock
+    never stalls other requests.
+    """
+
+    DB_NAME = "ratelimit.db"
+    # Short: a request waiting on another process's write lock is delayed by up to this much.
+    BUSY_TIMEOUT_MS = 200
+
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        requests_per_hour: int = 1000,
+        max_clients: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+        name: str = "global",
+        db_path: Optional[Path] = None,
+    ):
+        """
+        Initialize shared rate limiter.
+
+        Args:
+            requests_per_minute: Maximum requests per minute per IP
+            requests_per_hour: Maximum requests per hour per IP
+            max_clients: Unused; idle rows are removed by `sweep()`
+            clock: Time source in epoch seconds (overridable for tests)
+            name: Identifies this limiter's rows in the shared database
+            db_path: Database file (default: RATE_LIMIT_DB or DATA_DIR/ratelimit.db)
+        """
+        super().__init__(requests_per_minute, requests_per_hour, max_clients, clock, name)
+        configured = os.getenv("RATE_LIMIT_DB")
+        self.db_path = db_path or (
+            Path(configured).expanduser() if configured else ValidationLayer.ALLOWED_BASE_DIR / self.DB_NAME
+        )
+        self._sizes = [size for size, _, _ in self._limits]
+        self._connection()
+
+    @property
+    def tracked_clients(self) -> int:
+        """Number of clients holding counters in the shared database."""
+        row = self._connection().execute(
+            "SELECT count(*) FROM rate_windows WHERE limiter = ? AND size = ?",
+            (self.name, self._sizes[0]),
+        ).fetchone()
+        return row[0]
+
+    def is_allowed(self, client_ip: str, path: str) -> tuple[bool, dict]:
+        """
+        Check if request from client IP is allowed, updating the shared counters.
+
+        Args:
+            client_ip: Client IP address
+            path: Request path
+
+        Returns:
+            Tuple of (allowed, info_dict)
+        """
+        current_time = self._clock()
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT size, bucket, previous, current FROM rate_windows WHERE limiter = ? AND client = ?",
+                    (self.name, client_ip),
+                ).fetchall()
+                windows = [_SlidingWindow(size) for size in self._sizes]
+                stored = {row[0]: row[1:] for row in rows}
+                for window in windows:
+                    if window.size in stored:
+                        window.bucket, window.previous, window.current = stored[window.size]
+
+                allowed, info = self._check(windows, current_time, client_ip, path)
+                if allowed:
+                    # Every row of a client carries the client's expiry, so sweeps drop them together.
+                    expires_at = windows[-1].expires_at
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO rate_windows VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (self.name, client_ip, w.size, w.bucket, w.previous, w.current, expires_at)
+                            for w in windows
+                        ],
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as exc:
+            logger.warning(
+                f"Shared rate limiter unavailable, allowing request: {exc}",
+                client_ip=client_ip,
+                path=path,
+            )
+            return True, {}
+        return allowed, info
+
+    async def is_allowed_async(self, client_ip: str, path: str) -> tuple[bool, dict]:
+        """Check a request in a worker thread; the transaction may wait on the write lock."""
+        return await asyncio.to_thread(self.is_allowed, client_ip, path)
+
+    def sweep(self) -> int:
+        """
+        Delete counters of clients whose windows no longer count any request.
+
+        Returns:
+            Number of clients evicted
+        """
+        try:
+            cursor = self._connection().execute(
+                "DELETE FROM rate_windows WHERE limiter = ? AND expires_at <= ?",
+                (self.name, self._clock()),
+            )
+        except sqlite3.Error as exc:
+            logger.warning(f"Shared rate limiter sweep failed: {exc}")
+            return 0
+        evicted = cursor.rowcount // len(self._sizes)
+        self._evicted += evicted
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked_clients": self.tracked_clients,
+            "max_clients": 0,
+            "evicted": self._evicted,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        connections = getattr(_sqlite_local, "connections", None)
+        if connections is None:
+            connections = _sqlite_local.connections = {}
+        key = str(self.db_path)
+        conn = connections.get(key)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit: transactions are opened explicitly with BEGIN IMMEDIATE.
+            conn = sqlite3.connect(key, isolation_level=None, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Counters tolerate losing the last commits on power loss; skip the fsyncs.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}")
+            for statement in SQLITE_SCHEMA:
+                conn.execute(statement)
+            connections[key] = conn
+        return conn
+
+
+RATE_LIMIT_BACKENDS = ("memory", "sqlite")
+
+
+def create_rate_limiter(
+    requests_per_minute: int,
+    requests_per_hour: int,
+    name: str = "global",
+) -> RateLimiter:
+    """
+    Create a rate limiter for the backend selected by RATE_LIMIT_BACKEND.
+
+    Args:
+        requests_per_minute: Maximum requests per minute per IP
+        requests_per_hour: Maximum requests per hour per IP
+        name: Identifies the limiter's counters in shared backends
+
+    Returns:
+        RateLimiter (memory, the default) or SQLiteRateLimiter (sqlite)
+
+    Raises:
+        ValueError: If RATE_LIMIT_BACKEND is not a known backend
+    """
+    backend = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+    if backend == "memory":
+        return RateLimiter(requests_per_minute, requests_per_hour, name=name)
+    if backend == "sqlite":
+        return SQLiteRateLimiter(requests_per_minute, requests_per_hour, name=name)
+    raise ValueError(
+        f"Invalid RATE_LIMIT_BACKEND: {backend!r} (expected: {', '.join(RATE_LIMIT_BACKENDS)})"
+    )
+
+
+# Seconds between background sweeps of idle clients
+SWEEP_INTERVAL_SECONDS = 60.0
+
 # Global rate limiter instances
 _rate_limiter: Optional[RateLimiter] = None
 _path_rate_limiter: Optional[PathRateLimiter] = None
@@ -166,7 +497,7 @@ def get_rate_limiter() -> RateLimiter:
     """
     global _rate_limiter
     if _rate_limiter is None:
-        _rate_limiter = RateLimiter(
+        _rate_limiter = create_rate_limiter(
             requests_per_minute=60,
             requests_per_hour=1000,
         )
@@ -186,6 +517,61 @@ def get_path_rate_limiter() -> PathRateLimiter:
     return _path_rate_limiter
 
 
+def _all_rate_limiters() -> List[RateLimiter]:
+    limiters: List[RateLimiter] = []
+    if _rate_limiter is not None:
+        limiters.append(_rate_limiter)
+    if _path_rate_limiter is not None:
+        limiters.extend(_path_rate_limiter.limiters())
+    return limiters
+
+
+def sweep_rate_limiters() -> int:
+    """
+    Evict idle clients from every rate limiter created so far.
+
+    Returns:
+        Number of clients evicted
+    """
+    return sum(limiter.sweep() for limiter in _all_rate_limiters())
+
+
+def rate_limiter_stats() -> Dict[str, int]:
+    """
+    Aggregate statistics of all rate limiters (for the detailed health check).
+
+    Returns:
+        Dict with tracked client count, evictions and number of limiters
+    """
+    limiters = _all_rate_limiters()
+    return {
+        "limiters": len(limiters),
+        "tracked_clients": sum(limiter.tracked_clients for limiter in limiters),
+        "evicted": sum(limiter.stats()["evicted"] for limiter in limiters),
+    }
+
+
+async def run_rate_limit_sweeper(interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+    """
+    Background task that periodically evicts idle clients. Runs until cancelled.
+
+    Sweeps run in a worker thread, since shared backends delete rows on disk.
+
+    Args:
+        interval: Seconds between sweeps
+    """
+    while True:
+        await asyncio.sleep(interval)
+        evicted = await asyncio.to_thread(sweep_rate_limiters)
+        if evicted:
+            stats = await asyncio.to_thread(rate_limiter_stats)
+            logger.debug(
+                f"Evicted {evicted} idle rate-limit clients",
+                evicted=evicted,
+                tracked_clients=stats["tracked_clients"],
+            )
+
+
 async def rate_limit_middleware(request: Request, call_next: Callable) -> Response:
     """
     Middleware to enforce rate limiting on all requests.
@@ -215,7 +601,7 @@ async def rate_limit_middleware(request: Request, call_next: Callable) -> Respon
     client_ip = limiter.get_client_ip(request)
 
     # Check rate limit
-    allowed, info = limiter.is_allowed(client_ip, request.url.path)
+    allowed, info = await limiter.is_allowed_async(client_ip, request.url.path)
 
     if not allowed:
         # Rate limit exceeded
@@ -250,63 +636,112 @@ async def rate_limit_middleware(request: Request, call_next: Callable) -> Respon
     return response
 
 
-# Path-specific rate limits (for sensitive operations)
+# Path-specific rate limits (for sensitive operations), keyed by FastAPI route template
+PATH_LIMITS: Dict[str, Tuple[int, int]] = {
+    # Expensive operations - lower limits
+    "/api/advanced/{manager_id}/vulnerabilities": (10, 100),  # 10/min, 100/hour
+    "/api/advanced/{manager_id}/dependency-tree": (10, 100),
+    "/api/advanced/{manager_id}/batch-uninstall": (5, 50),
+    "/api/advanced/{manager_id}/rollback/{snapshot_id}": (5, 50),
+    # Streaming endpoints - moderate limits
+    "/api/streaming/{manager_id}/packages/{package_name:path}/uninstall": (20, 200),
+    # Discovery and listing - higher limits
+    "/api/discover": (30, 300),
+    "/api/managers": (60, 1000),
+    # Job status polling - clients poll until the job finishes
+    "/api/jobs/{job_id}": (120, 3000),
+}
+
+_TEMPLATE_PARAM = re.compile(r"{([A-Za-z_][A-Za-z0-9_]*)(?::([A-Za-z_]+))?}")
+
+
+def compile_route_template(template: str) -> str:
+    """
+    Translate a route template into a regex fragment (no anchors or groups).
+
+    `{name}` matches one path segment and `{name:path}` the rest of the path,
+    as in Starlette's router.
+
+    Args:
+        template: Route template, e.g. "/api/jobs/{job_id}"
+
+    Returns:
+        Regex source matching the same paths
+    """
+    parts: List[str] = []
+    position = 0
+    for param in _TEMPLATE_PARAM.finditer(template):
+        parts.append(re.escape(template[position : param.start()]))
+        parts.append(".+" if param.group(2) == "path" else "[^/]+")
+        position = param.end()
+    parts.append(re.escape(template[position:]))
+    return "".join(parts)
+
+
 class PathRateLimiter:
     """
-    Rate limiter for specific paths with custom limits.
+    Rate limiter for specific routes with custom limits.
+
+    All route templates are compiled once into a single alternation regex,
+    so matching a request path costs one regex match regardless of how many
+    limits are configured. Each template has its own RateLimiter.
     """
 
-    def __init__(self):
-        """Initialize path-specific rate limiter."""
-        self.path_limits = {
-            # Expensive operations - lower limits
-            "/api/advanced/*/vulnerabilities": (10, 100),  # 10/min, 100/hour
-            "/api/advanced/*/dependency-tree": (10, 100),
-            "/api/advanced/*/batch-uninstall": (5, 50),
-            "/api/advanced/*/rollback/*": (5, 50),
-            # Streaming endpoints - moderate limits
-            "/api/streaming/*/*/uninstall": (20, 200),
-            # Discovery and listing - higher limits
-            "/api/discover": (30, 300),
-            "/api/managers": (60, 1000),
+    def __init__(self, path_limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        """
+        Initialize path-specific rate limiter.
+
+        Args:
+            path_limits: {route template: (per minute, per hour)}; first match wins
+        """
+        self.path_limits = dict(PATH_LIMITS if path_limits is None else path_limits)
+        self._templates = list(self.path_limits)
+        self._limiters: Dict[str, RateLimiter] = {
+            template: create_rate_limiter(per_min, per_hour, name=template)
+            for template, (per_min, per_hour) in self.path_limits.items()
         }
-        self._limiters: Dict[str, RateLimiter] = {}
+        # One named group per template; `lastgroup` identifies the match.
+        self._matcher = re.compile(
+            "|".join(
+                f"(?P<r{index}>{compile_route_template(template)})"
+                for index, template in enumerate(self._templates)
+            )
+            or "(?!)"
+        )
 
-    def get_limiter_for_path(self, path: str) -> Optional[RateLimiter]:
+    def match_route(self, path: str) -> Optional[str]:
         """
-        Get rate limiter for specific path pattern.
+        Route template with a custom limit that matches `path`.
 
         Args:
             path: Request path
 
         Returns:
-            RateLimiter instance or None if no custom limit
+            Route template or None if no custom limit applies
         """
-        for pattern, (per_min, per_hour) in self.path_limits.items():
-            # Simple pattern matching (replace * with wildcard)
-            if self._matches_pattern(path, pattern):
-                key = f"{per_min}_{per_hour}"
-                if key not in self._limiters:
-                    self._limiters[key] = RateLimiter(
-                        requests_per_minute=per_min,
-                        requests_per_hour=per_hour,
-                    )
-                return self._limiters[key]
-        return None
+        match = self._matcher.fullmatch(path)
+        if match is None:
+            return None
+        return self._templates[int(match.lastgroup[1:])]
 
-    def _matches_pattern(self, path: str, pattern: str) -> bool:
+    def get_limiter_for_path(self, path: str) -> Optional[RateLimiter]:
         """
-        Simple pattern matching.
+        Get rate limiter for specific path.
 
         Args:
-            path: Actual path
-            pattern: Pattern with * wildcards
+            path: Request path
 
         Returns:
-            True if path matches pattern
+            RateLimiter instance or None if no custom limit
         """
-        import re
+        template = self.match_route(path)
+        return self._limiters[template] if template is not None else None
 
-        regex_pattern = pattern.replace("*", "[^/]+")
-        regex_pattern = f"^{regex_pattern}$"
-        return bool(re.match(regex_pattern, path))
+    def limiters(self) -> List[RateLimiter]:
+        """
+        Rate limiters for path-specific limits.
+
+        Returns:
+            List of RateLimiter instances
+        """
+        return list(self._limiters.values())
@@ -0,0 +1,90 @@
+"""Coalescência de chamadas de leitura idênticas aos adapters (single-flight)."""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, Hashable, Optional, Tuple
+
+
+FlightKey = Tuple[str, str, Tuple[Hashable, ...]]
+
+
+class SingleFlight:
+    """Partilha uma única execução entre chamadas concorrentes com a mesma chave.
+
+    A chave é (manager_id, método, argumentos). Quem chega enquanto uma
+    execução está em curso aguarda o mesmo resultado em vez de lançar outro
+    subprocesso. Mutações abrem uma fronteira: ao iniciar e ao terminar
+    descartam as execuções em curso do gestor, pelo que leituras posteriores
+    nunca reutilizam um resultado obtido antes da mutação.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[FlightKey, asyncio.Task] = {}
+        self._executed = 0
+        self._coalesced = 0
+        self._invalidated = 0
+
+    async def do(
+        self,
+        manager_id: str,
+        method: str,
+        func: Callable[..., Coroutine[Any, Any, Any]],
+        *args: Hashable,
+    ) -> Any:
+        key: FlightKey = (manager_id, method, args)
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            self._coalesced += 1
+        else:
+            self._executed += 1
+            task = asyncio.ensure_future(func(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+
+        # shield: o cancelamento de um cliente não interrompe os restantes.
+        return await asyncio.shield(task)
+
+    def invalidate(self, manager_id: str) -> int:
+        """Desliga as execuções em curso do gestor das novas chamadas."""
+        keys = [key for key in self._inflight if key[0] == manager_id]
+        for key in keys:
+            del self._inflight[key]
+        self._invalidated += len(keys)
+        return len(keys)
+
+    @asynccontextmanager
+    async def mutation(self, manager_id: str) -> AsyncIterator[None]:
+        """Delimita uma mutação do gestor (ex.: uninstall)."""
+        self.invalidate(manager_id)
+        try:
+            yield
+        finally:
+            self.invalidate(manager_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "executed": self._executed,
+            "coalesced": self._coalesced,
+            "invalidated": self._invalidated,
+            "inflight": len(self._inflight),
+        }
+
+    def _forget(self, key: FlightKey, task: asyncio.Task) -> None:
+        # Só remove se a entrada ainda for esta execução (pode ter sido invalidada
+        # e substituída por uma nova).
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Marca a exceção como recuperada quando nenhum cliente ficou à espera.
+            task.exception()
+
+
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
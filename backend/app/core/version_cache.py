@@ -0,0 +1,86 @@
+"""Cache persistente de versões dos gestores, indexada pelo binário resolvido."""
+from __future__ import annotations
+
+import logging
+import os
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from app.core.validation import ValidationLayer
+from app.storage import Storage, create_storage
+
+logger = logging.getLogger(__name__)
+
+
+class VersionCache:
+    """Guarda o output de `<tool> --version` por (caminho real, tamanho, mtime).
+
+    Um upgrade substitui o binário, alterando tamanho/mtime, pelo que a entrada
+    antiga deixa de corresponder sem ser necessária invalidação explícita.
+    """
+
+    FILE_NAME = "versions.json"
+
+    def __init__(self, storage: Optional[Storage] = None) -> None:
+        self.storage = storage or create_storage(
+            base_dir=ValidationLayer.ALLOWED_BASE_DIR / "storage"
+        )
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = Lock()
+
+    @staticmethod
+    def binary_key(executable: str, args: List[str]) -> Optional[Dict[str, Any]]:
+        """Identidade do binário; None se não puder ser resolvido."""
+        try:
+            resolved = os.path.realpath(executable)
+            stat = os.stat(resolved)
+        except OSError:
+            return None
+        return {
+            "key": f"{resolved}|{' '.join(args)}",
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def get(self, binary: Dict[str, Any]) -> Optional[str]:
+        with self._lock:
+            entry = self._load().get(binary["key"])
+        if (
+            entry
+            and entry.get("size") == binary["size"]
+            and entry.get("mtime_ns") == binary["mtime_ns"]
+        ):
+            return entry.get("version")
+        return None
+
+    def set(self, binary: Dict[str, Any], version: str) -> None:
+        with self._lock:
+            entries = self._load()
+            entries[binary["key"]] = {
+                "size": binary["size"],
+                "mtime_ns": binary["mtime_ns"],
+                "version": version,
+            }
+            try:
+                self.storage.write(self.FILE_NAME, entries)
+            except OSError as exc:
+                logger.warning("Falha ao gravar cache de versões: %s", exc)
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            try:
+                data = self.storage.read(self.FILE_NAME)
+            except (OSError, ValueError):
+                data = {}
+            self._entries = data if isinstance(data, dict) else {}
+        return self._entries
+
+
+_version_cache: Optional[VersionCache] = None
+
+
+def get_version_cache() -> VersionCache:
+    global _version_cache
+    if _version_cache is None:
+        _version_cache = VersionCache()
+    return _version_cache
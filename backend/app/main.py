@@ -1,6 +1,7 @@
 """Aplicação FastAPI principal do Package Audit Dashboard."""
 from __future__ import annotations
 
+import asyncio
 import os
 import time
 from contextlib import asynccontextmanager
@@ -12,8 +13,22 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.enhanced_logging import DetailedLoggingMiddleware
 from app.core.logging import get_logger, log_request, setup_logging
-from app.core.rate_limiter import rate_limit_middleware
-from app.routers import advanced, discover, health, managers, packages, streaming
+from app.core.rate_limiter import (
+    get_path_rate_limiter,
+    rate_limit_middleware,
+    run_rate_limit_sweeper,
+)
+from app.routers import (
+    advanced,
+    analytics,
+    discover,
+    health,
+    jobs,
+    managers,
+    packages,
+    snapshots,
+    streaming,
+)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -37,16 +52,25 @@ logger = get_logger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifecycle handler to log startup/shutdown."""
+    """Lifecycle handler: startup/shutdown logs, journal resume and rate-limit sweeper."""
     logger.info(
         "Package Audit Dashboard API starting",
         version="0.2.0",
         log_level=LOG_LEVEL,
         json_logs=JSON_LOGS,
     )
+    try:
+        resumed = await advanced.resume_journaled_operations()
+    except Exception as exc:
+        logger.error("Failed to resume journaled operations", error=str(exc))
+    else:
+        if resumed:
+            logger.info("Resumed interrupted operations", jobs=[job.id for job in resumed])
+    sweeper = asyncio.create_task(run_rate_limit_sweeper())
     try:
         yield
     finally:
+        sweeper.cancel()
         logger.info("Package Audit Dashboard API shutting down")
 
 
@@ -117,6 +141,12 @@ def create_app() -> FastAPI:
     app.include_router(packages.router)
     app.include_router(streaming.router)
     app.include_router(advanced.router)
+    app.include_router(snapshots.router)
+    app.include_router(analytics.router)
+    app.include_router(jobs.router)
+
+    # Compile path-specific rate limits now rather than on the first request
+    get_path_rate_limiter()
 
     logger.info("Application initialized successfully")
     return app
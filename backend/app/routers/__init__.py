@@ -1,5 +1,5 @@
 """Routers FastAPI."""
 
-from . import advanced, discover, health, managers, packages, streaming
+from . import advanced, analytics, discover, health, jobs, managers, packages, snapshots, streaming
 
-__all__ = ["discover", "managers", "packages", "streaming", "advanced", "health"]
+__all__ = ["discover", "managers", "packages", "streaming", "advanced", "health", "snapshots", "analytics", "jobs"]
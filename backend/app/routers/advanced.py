@@ -3,16 +3,18 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
 
-from app.adapters import get_adapter_by_id
-from app.analysis import SnapshotManager
-from app.core.locking import OperationInProgressError
-from app.core.queue import OperationType, OperationQueue, get_operation_queue
+from app.adapters import BaseAdapter, get_adapter_by_id
+from app.analysis import SnapshotManager, diff_packages
+from app.core.jobs import Job, get_job_manager
+from app.core.journal import JournalEntry, OperationJournal
+from app.core.singleflight import get_single_flight
 from app.core.validation import InvalidPackageNameError, ValidationLayer
+from app.routers.jobs import job_payload
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +56,9 @@ async def get_dependency_tree(manager_id: str):
         )
 
     adapter = adapter_cls()
-    result = await _run_in_thread(adapter.get_dependency_tree)
+    result = await get_single_flight().do(
+        clean_manager_id, "get_dependency_tree", adapter.get_dependency_tree_async
+    )
     return result
 
 
@@ -87,7 +91,12 @@ async def get_package_dependency_tree(manager_id: str, package_name: str):
         )
 
     adapter = adapter_cls()
-    result = await _run_in_thread(adapter.get_dependency_tree, clean_package_name)
+    result = await get_single_flight().do(
+        clean_manager_id,
+        "get_dependency_tree",
+        adapter.get_dependency_tree_async,
+        clean_package_name,
+    )
     return result
 
 
@@ -122,7 +131,9 @@ async def scan_vulnerabilities(manager_id: str):
         )
 
     adapter = adapter_cls()
-    result = await _run_in_thread(adapter.scan_vulnerabilities)
+    result = await get_single_flight().do(
+        clean_manager_id, "scan_vulnerabilities", adapter.scan_vulnerabilities_async
+    )
     return result
 
 
@@ -157,10 +168,120 @@ async def export_lockfile(manager_id: str):
         )
 
     adapter = adapter_cls()
-    result = await _run_in_thread(adapter.export_lockfile)
+    result = await get_single_flight().do(
+        clean_manager_id, "export_lockfile", adapter.export_lockfile_async
+    )
     return result
 
 
+# --- Journal de mutações ---
+#
+# batch-uninstall e rollback registam plano e passos no journal de operações
+# (app.core.journal). Se o servidor parar a meio, a operação é retomada no
+# arranque seguinte (ver resume_journaled_operations) sem repetir passos já
+# concluídos. Cada registo no journal faz fsync, por isso as escritas correm
+# numa thread, fora do event loop.
+
+JournaledOperation = Callable[[JournalEntry, BaseAdapter, SnapshotManager], Awaitable[Dict[str, Any]]]
+
+
+async def _reconcile_in_doubt(
+    entry: JournalEntry,
+    adapter: BaseAdapter,
+    baseline: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    """Resolve passos iniciados antes de uma paragem sem resultado registado.
+
+    Um pacote que já não está instalado foi removido por esse passo (ou, se
+    `baseline` indicar que nunca esteve instalado, falhou por isso); um que
+    continua instalado fica pendente e volta a ser tentado.
+    """
+    in_doubt = entry.in_doubt
+    if not in_doubt:
+        return
+    still_installed = set(adapter.filter_installed(in_doubt, await adapter.list_packages_async()))
+    was_installed = set(adapter.filter_installed(in_doubt, baseline)) if baseline is not None else None
+    for package in in_doubt:
+        if package in still_installed:
+            continue
+        if was_installed is not None and package not in was_installed:
+            await _run_in_thread(entry.complete_step, package, False, "Package not installed", reconciled=True)
+        else:
+            await _run_in_thread(entry.complete_step, package, True, reconciled=True)
+
+
+def _submit_journaled(
+    kind: str,
+    manager_id: str,
+    adapter: BaseAdapter,
+    run: JournaledOperation,
+    params: Dict[str, Any],
+    entry: Optional[JournalEntry] = None,
+) -> Job:
+    """Enfileira uma mutação registada no journal (nova, ou retomada a partir de `entry`)."""
+    snapshot_manager = SnapshotManager()
+
+    async def perform() -> Dict[str, Any]:
+        # O journal só é criado quando o job começa: um job cancelado em fila não deixa rasto.
+        current = entry or await _run_in_thread(lambda: OperationJournal().begin(kind, manager_id, params))
+        try:
+            result = await run(current, adapter, snapshot_manager)
+        except Exception as exc:
+            await _run_in_thread(current.finish, error=str(exc) or exc.__class__.__name__)
+            raise
+        await _run_in_thread(current.finish, result=result)
+        return result
+
+    operation_id = None
+    if kind == "rollback":
+        operation_id = f"rollback:{manager_id}:{params['snapshot_id']}"
+    if entry is None:
+        return get_job_manager().submit(kind, manager_id, perform, operation_id=operation_id, params=dict(params))
+
+    def abandon() -> None:
+        # Cancelar uma operação retomada encerra-a no journal; senão voltaria a
+        # ser retomada em cada arranque.
+        logger.warning("Journal %s: resumed %s on %s cancelled; abandoned", entry.id, kind, manager_id)
+        entry.finish(error="Cancelled before resume")
+
+    return get_job_manager().submit(
+        kind,
+        manager_id,
+        perform,
+        operation_id=operation_id,
+        params={**params, "journal": entry.id, "resumed": True},
+        on_cancel=abandon,
+    )
+
+
+async def resume_journaled_operations() -> List[Job]:
+    """Retoma as mutações interrompidas registadas no journal (chamado no arranque)."""
+    jobs: List[Job] = []
+    for entry in await _run_in_thread(OperationJournal().claim_pending):
+        run = JOURNALED_OPERATIONS.get(entry.kind)
+        adapter_cls = get_adapter_by_id(entry.manager_id)
+        if run is None or adapter_cls is None:
+            logger.error("Journal %s: %s on %s cannot be resumed; abandoned", entry.id, entry.kind, entry.manager_id)
+            await _run_in_thread(entry.finish, error="Operation cannot be resumed")
+            continue
+        if not adapter_cls.detect():
+            # Fica no journal para o próximo arranque.
+            logger.warning("Journal %s: manager %s not available; not resumed", entry.id, entry.manager_id)
+            await _run_in_thread(entry.close)
+            continue
+
+        logger.warning(
+            "Resuming interrupted %s on %s (journal %s, %d of %s steps done)",
+            entry.kind,
+            entry.manager_id,
+            entry.id,
+            len(entry.completed),
+            len(entry.plan) if entry.plan is not None else "?",
+        )
+        jobs.append(_submit_journaled(entry.kind, entry.manager_id, adapter_cls(), run, entry.params, entry=entry))
+    return jobs
+
+
 # --- Batch Operations ---
 
 
@@ -181,16 +302,90 @@ class BatchUninstallResponse(BaseModel):
     snapshot_id: Optional[str]
 
 
+def _complete_steps(entry: JournalEntry, results: List[Dict[str, Any]]) -> None:
+    for item in results:
+        entry.complete_step(item["package"], bool(item["success"]), item.get("error"))
+
+
+async def _run_batch_uninstall(
+    entry: JournalEntry,
+    adapter: BaseAdapter,
+    snapshot_manager: SnapshotManager,
+) -> Dict[str, Any]:
+    manager_id = entry.manager_id
+    packages: List[str] = entry.params.get("packages", [])
+    force = bool(entry.params.get("force", False))
+
+    if "snapshot_id" not in entry.state:
+        # Create snapshot before batch operation
+        packages_before = await adapter.list_packages_cached_async()
+        snapshot = await _run_in_thread(
+            snapshot_manager.create_snapshot,
+            {manager_id: packages_before},
+            {"reason": "pre-batch-uninstall", "packages": packages},
+        )
+        await _run_in_thread(entry.checkpoint, snapshot_id=snapshot.id if snapshot else None)
+    snapshot_id = entry.state["snapshot_id"]
+
+    if entry.plan is None:
+        await _run_in_thread(entry.set_plan, packages)
+    elif entry.in_doubt:
+        baseline = None
+        if snapshot_id:
+            baseline = await _run_in_thread(snapshot_manager.get_manager_packages, snapshot_id, manager_id)
+        await _reconcile_in_doubt(entry, adapter, baseline)
+
+    # Um lock (o do job) para todo o lote e um registo no journal por bloco do adapter.
+    pending = entry.pending_steps
+    for start in range(0, len(pending), adapter.UNINSTALL_BATCH_SIZE):
+        chunk = pending[start : start + adapter.UNINSTALL_BATCH_SIZE]
+        await _run_in_thread(entry.start_steps, chunk)
+        try:
+            async with get_single_flight().mutation(manager_id):
+                result = await adapter.uninstall_many_async(chunk, force)
+        except Exception as exc:
+            logger.exception("Batch uninstall failed for %s", manager_id)
+            result = {
+                "results": [
+                    {"package": package, "success": False, "error": str(exc)}
+                    for package in chunk
+                ]
+            }
+        await _run_in_thread(_complete_steps, entry, result["results"])
+
+    succeeded: List[str] = []
+    failed: List[Dict[str, Any]] = []
+    for package in entry.plan or []:
+        outcome = entry.completed.get(package)
+        if outcome is None:
+            continue
+        if outcome["success"]:
+            succeeded.append(package)
+        else:
+            failed.append({"package": package, "error": outcome.get("error") or "Unknown error"})
+
+    return BatchUninstallResponse(
+        manager=manager_id,
+        total=len(packages),
+        succeeded=succeeded,
+        failed=failed,
+        snapshot_id=snapshot_id,
+    ).model_dump()
+
+
 @router.post(
     "/{manager_id}/batch-uninstall",
-    summary="Desinstala múltiplos pacotes em batch",
-    response_model=BatchUninstallResponse,
+    summary="Enfileira a desinstalação de múltiplos pacotes em batch",
+    status_code=status.HTTP_202_ACCEPTED,
 )
 async def batch_uninstall(
     manager_id: str,
     request: BatchUninstallRequest,
-) -> BatchUninstallResponse:
-    """Desinstala múltiplos pacotes de uma só vez."""
+) -> Dict[str, Any]:
+    """Desinstala múltiplos pacotes de uma só vez, num job em segundo plano.
+
+    O resultado do job segue o modelo BatchUninstallResponse.
+    """
     try:
         clean_manager_id = ValidationLayer.sanitize_manager_id(manager_id)
     except InvalidPackageNameError as exc:
@@ -212,10 +407,6 @@ async def batch_uninstall(
             detail=f"Manager {clean_manager_id} not found.",
         )
 
-    adapter = adapter_cls()
-    snapshot_manager = SnapshotManager()
-    operation_queue: OperationQueue = get_operation_queue()
-
     # Sanitize all package names
     try:
         clean_packages = [
@@ -227,75 +418,89 @@ async def batch_uninstall(
             detail=f"Invalid package name: {exc}",
         ) from exc
 
-    # Create snapshot before batch operation
-    packages_before = await _run_in_thread(adapter.list_packages)
-    snapshot = await _run_in_thread(
-        snapshot_manager.create_snapshot,
-        {clean_manager_id: packages_before},
-        {"reason": "pre-batch-uninstall", "packages": clean_packages},
+    job = _submit_journaled(
+        "batch-uninstall",
+        clean_manager_id,
+        adapter_cls(),
+        _run_batch_uninstall,
+        {"packages": clean_packages, "force": request.force},
     )
+    return job_payload(job)
 
-    succeeded = []
-    failed = []
 
-    # Execute uninstall for each package
-    for package in clean_packages:
-        operation_id = f"batch-uninstall:{clean_manager_id}:{package}"
+# --- Rollback ---
 
-        async def perform_uninstall():
-            return await _run_in_thread(adapter.uninstall, package, request.force)
 
-        try:
-            result = await operation_queue.execute(
-                operation_id,
-                OperationType.MUTATION,
-                perform_uninstall,
-            )
-
-            if result.get("success"):
-                succeeded.append(package)
-            else:
-                failed.append(
-                    {
-                        "package": package,
-                        "error": result.get("stderr", "Unknown error"),
-                    }
-                )
-
-        except OperationInProgressError:
-            failed.append(
-                {
-                    "package": package,
-                    "error": "Operation already in progress",
-                }
-            )
-        except Exception as exc:
-            logger.exception("Failed to uninstall %s", package)
-            failed.append(
-                {
-                    "package": package,
-                    "error": str(exc),
-                }
-            )
+async def _run_rollback(
+    entry: JournalEntry,
+    adapter: BaseAdapter,
+    snapshot_manager: SnapshotManager,
+) -> Dict[str, Any]:
+    manager_id = entry.manager_id
+    snapshot_id = entry.params["snapshot_id"]
 
-    return BatchUninstallResponse(
-        manager=clean_manager_id,
-        total=len(clean_packages),
-        succeeded=succeeded,
-        failed=failed,
-        snapshot_id=snapshot.id if snapshot else None,
-    )
+    if entry.plan is None:
+        snapshot_packages = await _run_in_thread(
+            snapshot_manager.get_manager_packages,
+            snapshot_id,
+            manager_id,
+        )
+        if snapshot_packages is None:
+            raise LookupError(f"Snapshot {snapshot_id} has no packages for manager {manager_id}.")
+        current_packages = await adapter.list_packages_cached_async()
+
+        # Calculate differences
+        # Note: to_install would require package installation functionality
+        # Pacotes injetados (pipx) não são desinstaláveis pelo nome: `uninstall`
+        # removeria a aplicação homónima. Saem com o venv anfitrião.
+        await _run_in_thread(
+            entry.set_plan,
+            [
+                change["name"]
+                for change in diff_packages(snapshot_packages, current_packages, manager_id)
+                if change["change"] == "added" and "injected_into" not in change
+            ],
+        )
+    await _reconcile_in_doubt(entry, adapter)
 
+    # Uninstall packages that weren't in snapshot
+    for package in entry.pending_steps:
+        await _run_in_thread(entry.start_steps, [package])
+        try:
+            async with get_single_flight().mutation(manager_id):
+                result = await adapter.uninstall_async(package, force=False)
+        except Exception as exc:
+            logger.exception("Failed to uninstall %s during rollback", package)
+            await _run_in_thread(entry.complete_step, package, False, str(exc))
+        else:
+            success = bool(result.get("success"))
+            await _run_in_thread(entry.complete_step, package, success, None if success else result.get("stderr"))
 
-# --- Rollback ---
+    results: Dict[str, Any] = {
+        "snapshot_id": snapshot_id,
+        "manager": manager_id,
+        "uninstalled": [],
+        "failed": [],
+        "note": "Only uninstall rollback is implemented. Install functionality needed for full rollback.",
+    }
+    for package in entry.plan or []:
+        outcome = entry.completed.get(package)
+        if outcome is None:
+            continue
+        if outcome["success"]:
+            results["uninstalled"].append(package)
+        else:
+            results["failed"].append({"package": package, "error": outcome.get("error")})
+    return results
 
 
 @router.post(
     "/{manager_id}/rollback/{snapshot_id}",
-    summary="Faz rollback para um snapshot anterior",
+    summary="Enfileira o rollback para um snapshot anterior",
+    status_code=status.HTTP_202_ACCEPTED,
 )
-async def rollback_to_snapshot(manager_id: str, snapshot_id: str):
-    """Restaura o estado de um snapshot anterior."""
+async def rollback_to_snapshot(manager_id: str, snapshot_id: str) -> Dict[str, Any]:
+    """Restaura o estado de um snapshot anterior, num job em segundo plano."""
     try:
         clean_manager_id = ValidationLayer.sanitize_manager_id(manager_id)
     except InvalidPackageNameError as exc:
@@ -306,16 +511,20 @@ async def rollback_to_snapshot(manager_id: str, snapshot_id: str):
 
     snapshot_manager = SnapshotManager()
 
-    # Load snapshot
-    try:
-        snapshot = await _run_in_thread(snapshot_manager.load_snapshot, snapshot_id)
-    except Exception as exc:
+    summary = await _run_in_thread(snapshot_manager.get_summary, snapshot_id)
+    if summary is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Snapshot {snapshot_id} not found: {exc}",
-        ) from exc
+            detail=f"Snapshot {snapshot_id} not found.",
+        )
+
+    # Sem secção do gestor no snapshot, o plano seria desinstalar tudo.
+    if clean_manager_id not in summary.managers:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Snapshot {snapshot_id} has no packages for manager {clean_manager_id}.",
+        )
 
-    # Get current state
     adapter_cls = get_adapter_by_id(clean_manager_id)
     if adapter_cls is None:
         raise HTTPException(
@@ -329,38 +538,17 @@ async def rollback_to_snapshot(manager_id: str, snapshot_id: str):
             detail=f"Manager {clean_manager_id} not found.",
         )
 
-    adapter = adapter_cls()
-    current_packages = await _run_in_thread(adapter.list_packages)
-    current_names = {pkg["name"] for pkg in current_packages}
-
-    # Get snapshot packages for this manager
-    snapshot_packages = snapshot.data.get(clean_manager_id, [])
-    snapshot_names = {pkg["name"] for pkg in snapshot_packages}
-
-    # Calculate differences
-    to_uninstall = current_names - snapshot_names
-    # Note: to_install would require package installation functionality
-
-    results = {
-        "snapshot_id": snapshot_id,
-        "manager": clean_manager_id,
-        "uninstalled": [],
-        "failed": [],
-        "note": "Only uninstall rollback is implemented. Install functionality needed for full rollback.",
-    }
+    job = _submit_journaled(
+        "rollback",
+        clean_manager_id,
+        adapter_cls(),
+        _run_rollback,
+        {"snapshot_id": snapshot_id},
+    )
+    return job_payload(job)
 
-    # Uninstall packages that weren't in snapshot
-    for package in to_uninstall:
-        try:
-            result = await _run_in_thread(adapter.uninstall, package, force=False)
-            if result.get("success"):
-                results["uninstalled"].append(package)
-            else:
-                results["failed"].append(
-                    {"package": package, "error": result.get("stderr")}
-                )
-        except Exception as exc:
-            logger.exception("Failed to uninstall %s during rollback", package)
-            results["failed"].append({"package": package, "error": str(exc)})
 
-    return results
+JOURNALED_OPERATIONS: Dict[str, JournaledOperation] = {
+    "batch-uninstall": _run_batch_uninstall,
+    "rollback": _run_rollback,
+}
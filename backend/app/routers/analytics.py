@@ -0,0 +1,92 @@
+"""Router para consultas analíticas sobre o histórico de snapshots."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.analysis.snapshot_analytics import (
+    AnalyticsUnavailableError,
+    SnapshotAnalytics,
+    get_snapshot_analytics,
+)
+from app.core.validation import InvalidPackageNameError, ValidationLayer
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+
+def _analytics() -> SnapshotAnalytics:
+    try:
+        return get_snapshot_analytics()
+    except AnalyticsUnavailableError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(exc),
+        ) from exc
+
+
+def _manager_filter(manager: Optional[str]) -> Optional[str]:
+    if manager is None:
+        return None
+    try:
+        return ValidationLayer.sanitize_manager_id(manager)
+    except InvalidPackageNameError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+
+
+@router.get(
+    "/packages/{package}/first-seen",
+    summary="Primeiro snapshot em que um pacote aparece",
+)
+async def first_seen(
+    package: str,
+    manager: Optional[str] = Query(None, description="Restringe a consulta a um gestor"),
+) -> Dict[str, Any]:
+    analytics = _analytics()
+    rows = await asyncio.to_thread(analytics.first_seen, package, _manager_filter(manager))
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Package {package} not found in any snapshot.",
+        )
+    return {"package": package, "managers": rows}
+
+
+@router.get(
+    "/packages/{package}/versions",
+    summary="Histórico de versões de um pacote ao longo dos snapshots",
+)
+async def version_history(
+    package: str,
+    manager: Optional[str] = Query(None, description="Restringe a consulta a um gestor"),
+) -> Dict[str, Any]:
+    analytics = _analytics()
+    rows = await asyncio.to_thread(analytics.version_history, package, _manager_filter(manager))
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Package {package} not found in any snapshot.",
+        )
+    return {"package": package, "versions": rows}
+
+
+@router.get(
+    "/churn",
+    summary="Gestores com mais alterações entre snapshots consecutivos",
+)
+async def churn(
+    since: Optional[datetime] = Query(None, description="Início do intervalo (omissão: início do mês)"),
+    until: Optional[datetime] = Query(None, description="Fim do intervalo (exclusivo)"),
+    limit: int = Query(10, ge=1, le=100),
+) -> Dict[str, List[Dict[str, Any]]]:
+    analytics = _analytics()
+    rows = await asyncio.to_thread(analytics.churn, since, until, limit)
+    return {"managers": rows}
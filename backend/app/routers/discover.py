@@ -5,7 +5,8 @@ from typing import Dict, List, Type
 
 from fastapi import APIRouter
 
-from app.adapters import BaseAdapter, get_registered_adapters
+from app.adapters import BaseAdapter, discover_managers as probe_managers
+from app.adapters import get_registered_adapters
 
 router = APIRouter(prefix="/api/discover", tags=["discover"])
 
@@ -18,17 +19,14 @@ def _available_adapters() -> List[Type[BaseAdapter]]:
 @router.post("", summary="Detecta gestores instalados")
 async def discover_managers() -> Dict[str, List[Dict[str, str]]]:
     """Deteta gestores suportados e retorna metadados base."""
-    detected: List[Dict[str, str]] = []
-
-    for adapter_cls in _available_adapters():
-        if adapter_cls.detect():
-            version = adapter_cls.get_version()
-            detected.append(
-                {
-                    "id": adapter_cls.manager_id,
-                    "name": adapter_cls.display_name,
-                    "version": version or "unknown",
-                }
-            )
-
-    return {"managers": detected}
+    detected = await probe_managers(_available_adapters())
+    return {
+        "managers": [
+            {
+                "id": item.adapter.manager_id,
+                "name": item.adapter.display_name,
+                "version": item.version or "unknown",
+            }
+            for item in detected
+        ]
+    }
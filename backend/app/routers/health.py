@@ -5,11 +5,18 @@ import platform
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from app.core.jobs import get_job_manager
+from app.core.locking import get_lock_manager
+from app.core.path_index import get_path_index
+from app.core.rate_limiter import rate_limiter_stats
+from app.core.singleflight import get_single_flight
+from app.storage.json_storage import get_read_cache
+
 router = APIRouter(prefix="/health", tags=["health"])
 
 
@@ -30,6 +37,12 @@ class DetailedHealthStatus(HealthStatus):
     package_managers: Dict[str, bool]
     storage_available: bool
     storage_path: str
+    path_index: Dict[str, int]
+    single_flight: Dict[str, int]
+    storage_cache: Dict[str, int]
+    locks: Dict[str, Dict[str, Any]]
+    jobs: Dict[str, int]
+    rate_limiter: Dict[str, int]
 
 
 # Store startup time for uptime calculation
@@ -65,18 +78,16 @@ async def detailed_health_check() -> dict:
     Returns:
         Comprehensive health status including package manager availability
     """
-    import shutil
-    from app.adapters import BrewAdapter, NpmAdapter, PipAdapter, WingetAdapter
-
     current_time = datetime.now()
     uptime = (current_time - _startup_time).total_seconds()
 
     # Check package manager availability
+    path_index = get_path_index()
     package_managers = {
-        "npm": shutil.which("npm") is not None,
-        "pip": shutil.which("pip") is not None or shutil.which("pip3") is not None,
-        "brew": shutil.which("brew") is not None,
-        "winget": shutil.which("winget") is not None,
+        "npm": path_index.which("npm") is not None,
+        "pip": path_index.which("pip") is not None or path_index.which("pip3") is not None,
+        "brew": path_index.which("brew") is not None,
+        "winget": path_index.which("winget") is not None,
     }
 
     # Check storage availability
@@ -98,6 +109,12 @@ async def detailed_health_check() -> dict:
         "package_managers": package_managers,
         "storage_available": storage_available,
         "storage_path": str(storage_path),
+        "path_index": path_index.stats(),
+        "single_flight": get_single_flight().stats(),
+        "storage_cache": get_read_cache().stats(),
+        "locks": get_lock_manager().list_locks(),
+        "jobs": get_job_manager().stats(),
+        "rate_limiter": rate_limiter_stats(),
     }
 
 
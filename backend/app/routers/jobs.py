@@ -0,0 +1,163 @@
+"""Router para consulta e acompanhamento de jobs de mutação."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.core.jobs import FINAL_STATUSES, Job, JobStatus, get_job_manager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# Intervalo máximo sem eventos no stream; envia um keep-alive para manter a ligação.
+KEEPALIVE_SECONDS = 15
+# Jobs de outro worker não notificam este processo: o stream relê o store partilhado.
+SHARED_POLL_SECONDS = 0.5
+
+
+def job_payload(job: Job) -> Dict[str, Any]:
+    """Representação pública de um job, com a posição na fila e o URL de estado."""
+    payload = job.to_dict()
+    payload["position"] = get_job_manager().position(job)
+    payload["status_url"] = f"{router.prefix}/{job.id}"
+    return payload
+
+
+def shared_job_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Representação pública de um job lido do store partilhado (de outro worker)."""
+    return {**payload, "status_url": f"{router.prefix}/{payload['id']}"}
+
+
+def _not_found(job_id: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Job {job_id} not found.",
+    )
+
+
+async def _get_shared_job(job_id: str) -> Dict[str, Any]:
+    """Job de outro worker (só com JOBS_BACKEND=sqlite); 404 se desconhecido."""
+    shared = await get_job_manager().get_shared(job_id)
+    if shared is None:
+        raise _not_found(job_id)
+    return shared[0]
+
+
+@router.get("", summary="Lista os jobs recentes")
+async def list_jobs(
+    manager: Optional[str] = Query(None, description="Filtra por gestor"),
+    job_status: Optional[JobStatus] = Query(None, alias="status", description="Filtra por estado"),
+) -> Dict[str, List[Dict[str, Any]]]:
+    job_manager = get_job_manager()
+    # O estado local é o mais recente para os jobs deste processo.
+    local = {job.id: job_payload(job) for job in job_manager.list_jobs(manager_id=manager, status=job_status)}
+    shared = [
+        shared_job_payload(payload)
+        for payload in await job_manager.list_shared(manager_id=manager, status=job_status)
+        if payload["id"] not in local
+    ]
+    jobs = sorted([*local.values(), *shared], key=lambda payload: payload["created_at"], reverse=True)
+    return {"jobs": jobs}
+
+
+@router.get("/{job_id}", summary="Estado de um job")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    job = get_job_manager().get(job_id)
+    if job is not None:
+        return job_payload(job)
+    return shared_job_payload(await _get_shared_job(job_id))
+
+
+@router.delete("/{job_id}", summary="Cancela um job ainda em fila")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    job_manager = get_job_manager()
+    job = job_manager.get(job_id)
+    if job is not None:
+        if not job_manager.cancel(job_id):
+            raise _cannot_cancel(job_id, job.status.value)
+        return job_payload(job)
+
+    outcome = await job_manager.cancel_shared(job_id)
+    if outcome is None:
+        raise _not_found(job_id)
+    cancelled, payload = outcome
+    if not cancelled:
+        raise _cannot_cancel(job_id, payload["status"])
+    return shared_job_payload(payload)
+
+
+def _cannot_cancel(job_id: str, job_status: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Job {job_id} is {job_status} and can no longer be cancelled.",
+    )
+
+
+@router.get("/{job_id}/events", summary="Acompanha um job em tempo real (SSE)")
+async def job_events(job_id: str) -> StreamingResponse:
+    """Emite um evento `job` a cada mudança de estado e termina quando o job fica final."""
+    if get_job_manager().get(job_id) is not None:
+        events = _local_job_events(job_id)
+    else:
+        await _get_shared_job(job_id)
+        events = _shared_job_events(job_id)
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+async def _local_job_events(job_id: str) -> AsyncIterator[str]:
+    job_manager = get_job_manager()
+    sent_version: Optional[int] = None
+    while True:
+        try:
+            async for current in job_manager.watch(job_id, timeout=KEEPALIVE_SECONDS):
+                # Após um keep-alive, watch() volta a emitir o estado atual: só
+                # é enviado se mudou entretanto.
+                if current.version == sent_version:
+                    continue
+                sent_version = current.version
+                yield f"event: job\ndata: {json.dumps(job_payload(current))}\n\n"
+            return
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+        except KeyError:
+            # Removido do histórico entretanto.
+            return
+
+
+async def _shared_job_events(job_id: str) -> AsyncIterator[str]:
+    """Eventos de um job de outro worker, por leitura periódica do store partilhado."""
+    job_manager = get_job_manager()
+    loop = asyncio.get_running_loop()
+    final = {job_status.value for job_status in FINAL_STATUSES}
+    sent_version: Optional[int] = None
+    last_sent = loop.time()
+    while True:
+        shared = await job_manager.get_shared(job_id)
+        if shared is None:
+            # Removido do histórico entretanto.
+            return
+        payload, version = shared
+        if version != sent_version:
+            sent_version = version
+            last_sent = loop.time()
+            yield f"event: job\ndata: {json.dumps(shared_job_payload(payload))}\n\n"
+        if payload["status"] in final:
+            return
+        if loop.time() - last_sent >= KEEPALIVE_SECONDS:
+            last_sent = loop.time()
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(SHARED_POLL_SECONDS)
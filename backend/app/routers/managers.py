@@ -6,7 +6,13 @@ from typing import Any, Dict, List
 
 from fastapi import APIRouter, HTTPException, status
 
-from app.adapters import BaseAdapter, get_adapter_by_id, get_registered_adapters
+from app.adapters import (
+    BaseAdapter,
+    discover_managers,
+    get_adapter_by_id,
+    get_registered_adapters,
+)
+from app.core.singleflight import get_single_flight
 from app.core.validation import InvalidPackageNameError, ValidationLayer
 
 logger = logging.getLogger(__name__)
@@ -20,20 +26,16 @@ def _capabilities(adapter: BaseAdapter) -> List[str]:
 
 @router.get("", summary="Lista gestores de pacotes disponíveis")
 async def list_managers() -> Dict[str, List[Dict[str, Any]]]:
-    managers: List[Dict[str, Any]] = []
-
-    for adapter_cls in get_registered_adapters():
-        if adapter_cls.detect():
-            version = adapter_cls.get_version()
-            managers.append(
-                {
-                    "id": adapter_cls.manager_id,
-                    "name": adapter_cls.display_name,
-                    "version": version or "unknown",
-                    "capabilities": _capabilities(adapter_cls),
-                }
-            )
-
+    detected = await discover_managers(get_registered_adapters())
+    managers: List[Dict[str, Any]] = [
+        {
+            "id": item.adapter.manager_id,
+            "name": item.adapter.display_name,
+            "version": item.version or "unknown",
+            "capabilities": _capabilities(item.adapter),
+        }
+        for item in detected
+    ]
     return {"managers": managers}
 
 
@@ -64,7 +66,9 @@ async def list_packages(manager_id: str) -> Dict[str, List[Dict[str, Any]]]:
     adapter = adapter_cls()
 
     try:
-        packages = adapter.list_packages()
+        packages = await get_single_flight().do(
+            clean_manager_id, "list_packages", adapter.list_packages_cached_async
+        )
         return {"packages": packages}
     except Exception as exc:
         logger.error(f"Erro ao listar pacotes do gestor {clean_manager_id}: {exc}")
@@ -9,9 +9,10 @@ from fastapi import APIRouter, HTTPException, status
 
 from app.adapters import get_adapter_by_id
 from app.analysis import SnapshotManager
-from app.core.locking import OperationInProgressError
-from app.core.queue import OperationType, OperationQueue, get_operation_queue
+from app.core.jobs import get_job_manager
+from app.core.singleflight import get_single_flight
 from app.core.validation import InvalidPackageNameError, ValidationLayer
+from app.routers.jobs import job_payload
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +25,8 @@ async def _run_in_thread(func, *args, **kwargs):
 
 @router.delete(
     "/{manager_id}/packages/{package_name}",
-    summary="Desinstala pacote através do gestor indicado",
+    summary="Enfileira a desinstalação de um pacote através do gestor indicado",
+    status_code=status.HTTP_202_ACCEPTED,
 )
 async def uninstall_package(
     manager_id: str,
@@ -62,42 +64,37 @@ async def uninstall_package(
 
     adapter = adapter_cls()
     snapshot_manager = SnapshotManager()
-    operation_queue: OperationQueue = get_operation_queue()
-    operation_id = f"uninstall:{clean_manager_id}:{clean_package_name}"
 
-    async def perform_uninstall():
-        packages = await _run_in_thread(adapter.list_packages)
-        snapshot = await _run_in_thread(
+    async def perform_uninstall() -> Dict[str, Any]:
+        packages = await adapter.list_packages_cached_async()
+        snapshot_summary = await _run_in_thread(
             snapshot_manager.create_snapshot,
             {clean_manager_id: packages},
             {"reason": "pre-uninstall", "package": clean_package_name},
         )
-        result = await _run_in_thread(adapter.uninstall, clean_package_name, force)
-        return snapshot, result
-
-    try:
-        snapshot_summary, uninstall_result = await operation_queue.execute(
-            operation_id,
-            OperationType.MUTATION,
-            perform_uninstall,
-        )
-    except OperationInProgressError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=str(exc),
-        ) from exc
-
-    response = {
-        "manager": clean_manager_id,
-        "package": clean_package_name,
-        "force": force,
-        "success": uninstall_result.get("success", False),
-        "snapshot_id": snapshot_summary.id if snapshot_summary else None,
-        "snapshot_created_at": snapshot_summary.created_at if snapshot_summary else None,
-        "command": {
-            "stdout": uninstall_result.get("stdout"),
-            "stderr": uninstall_result.get("stderr"),
-            "returncode": uninstall_result.get("returncode"),
-        },
-    }
-    return response
+        async with get_single_flight().mutation(clean_manager_id):
+            uninstall_result = await adapter.uninstall_async(clean_package_name, force)
+
+        return {
+            "manager": clean_manager_id,
+            "package": clean_package_name,
+            "force": force,
+            "success": uninstall_result.get("success", False),
+            "snapshot_id": snapshot_summary.id if snapshot_summary else None,
+            "snapshot_created_at": snapshot_summary.created_at if snapshot_summary else None,
+            "command": {
+                "stdout": uninstall_result.get("stdout"),
+                "stderr": uninstall_result.get("stderr"),
+                "returncode": uninstall_result.get("returncode"),
+            },
+        }
+
+    # O pedido não espera pelo uninstall: devolve o job e o cliente acompanha-o em /api/jobs.
+    job = get_job_manager().submit(
+        "uninstall",
+        clean_manager_id,
+        perform_uninstall,
+        operation_id=f"uninstall:{clean_manager_id}:{clean_package_name}",
+        params={"package": clean_package_name, "force": force},
+    )
+    return job_payload(job)
@@ -0,0 +1,92 @@
+"""Router para comparação de snapshots."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.adapters import load_live_packages
+from app.analysis import SnapshotManager, iter_diff
+from app.core.validation import InvalidPackageNameError, ValidationLayer
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/snapshots", tags=["snapshots"])
+
+LIVE_TARGET = "live"
+
+
+async def _run_in_thread(func, *args, **kwargs):
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+def _ndjson(records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record) + "\n"
+
+
+@router.get(
+    "/diff",
+    summary="Compara dois snapshots ou um snapshot com o inventário atual",
+)
+async def diff_snapshots(
+    from_id: str = Query(..., alias="from", description="Snapshot de origem"),
+    to_id: Optional[str] = Query(
+        None,
+        alias="to",
+        description="Snapshot de destino; omitido compara com o inventário atual",
+    ),
+    manager: Optional[List[str]] = Query(None, description="Restringe o diff a estes gestores"),
+) -> StreamingResponse:
+    """Devolve o diff em NDJSON, gerado gestor a gestor sem o montar em memória.
+
+    Cada linha é um registo `change` (added/removed/upgraded/downgraded/changed),
+    um `summary` por gestor ou um `error` se um gestor não puder ser carregado.
+    """
+    try:
+        requested = [ValidationLayer.sanitize_manager_id(item) for item in manager or []]
+    except InvalidPackageNameError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc),
+        ) from exc
+
+    snapshot_manager = SnapshotManager()
+    source = await _run_in_thread(snapshot_manager.get_summary, from_id)
+    if source is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Snapshot {from_id} not found.",
+        )
+
+    managers = set(source.managers)
+    if to_id is None:
+        load_after = load_live_packages
+    else:
+        target = await _run_in_thread(snapshot_manager.get_summary, to_id)
+        if target is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Snapshot {to_id} not found.",
+            )
+        managers.update(target.managers)
+
+        def load_after(manager_id: str) -> List[Dict[str, Any]]:
+            return snapshot_manager.get_manager_packages(to_id, manager_id)
+
+    if requested:
+        managers = set(requested)
+
+    def load_before(manager_id: str) -> List[Dict[str, Any]]:
+        return snapshot_manager.get_manager_packages(from_id, manager_id)
+
+    def records() -> Iterator[Dict[str, Any]]:
+        yield {"type": "diff", "from": from_id, "to": to_id or LIVE_TARGET, "managers": sorted(managers)}
+        yield from iter_diff(sorted(managers), load_before, load_after)
+
+    # Iterador síncrono: o Starlette consome-o numa threadpool, linha a linha.
+    return StreamingResponse(_ndjson(records()), media_type="application/x-ndjson")
@@ -14,6 +14,7 @@ from app.adapters import get_adapter_by_id
 from app.analysis import SnapshotManager
 from app.core.locking import OperationInProgressError
 from app.core.queue import OperationType, OperationQueue, get_operation_queue
+from app.core.singleflight import get_single_flight
 from app.core.validation import InvalidPackageNameError, ValidationLayer
 
 logger = logging.getLogger(__name__)
@@ -56,7 +57,7 @@ async def event_generator(
         yield f"event: log\ndata: {json.dumps({'message': 'Creating snapshot...'})}\n\n"
 
         async def perform_uninstall():
-            packages = await _run_in_thread(adapter.list_packages)
+            packages = await adapter.list_packages_cached_async()
             snapshot = await _run_in_thread(
                 snapshot_manager.create_snapshot,
                 {clean_manager_id: packages},
@@ -66,7 +67,8 @@ async def event_generator(
 
             yield f"event: log\ndata: {json.dumps({'message': f'Uninstalling {clean_package_name}...'})}\n\n"
 
-            result = await _run_in_thread(adapter.uninstall, clean_package_name, force)
+            async with get_single_flight().mutation(clean_manager_id):
+                result = await adapter.uninstall_async(clean_package_name, force)
 
             # Yield the result as an event instead of returning it
             yield f"event: result\ndata: {json.dumps({{'snapshot_id': snapshot.id if snapshot else None, 'success': result}})}\n\n"
@@ -0,0 +1,31 @@
+"""Backends de armazenamento e seleção por configuração (STORAGE_BACKEND)."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+from app.storage.json_storage import JSONStorage, ReadCache
+from app.storage.sqlite_storage import SQLiteStorage
+
+Storage = Union[JSONStorage, SQLiteStorage]
+
+STORAGE_BACKENDS = ("json", "sqlite")
+
+
+def create_storage(
+    base_dir: Optional[Path] = None,
+    cache: Optional[ReadCache] = None,
+) -> Storage:
+    """Cria o backend indicado em STORAGE_BACKEND (json por omissão)."""
+    backend = os.getenv("STORAGE_BACKEND", "json").strip().lower()
+    if backend == "json":
+        return JSONStorage(base_dir=base_dir, cache=cache)
+    if backend == "sqlite":
+        return SQLiteStorage(base_dir=base_dir, cache=cache)
+    raise ValueError(
+        f"STORAGE_BACKEND inválido: {backend!r} (esperado: {', '.join(STORAGE_BACKENDS)})"
+    )
+
+
+__all__ = ["JSONStorage", "SQLiteStorage", "Storage", "STORAGE_BACKENDS", "create_storage"]
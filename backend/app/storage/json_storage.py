@@ -4,25 +4,111 @@ from __future__ import annotations
 import json
 import logging
 import os
+import pickle
 import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from app.core.validation import PathTraversalError, ValidationLayer
 
 
 logger = logging.getLogger(__name__)
 
+# (st_mtime_ns, st_size) do ficheiro no momento da leitura.
+FileStamp = Tuple[int, int]
+
+
+class ReadCache:
+    """Cache LRU de objetos JSON já interpretados, limitada em bytes.
+
+    As entradas são indexadas pelo caminho resolvido e validadas com
+    (st_mtime_ns, st_size): um ficheiro alterado por outro processo deixa de
+    corresponder e é relido. O custo de cada entrada é o tamanho do ficheiro.
+    Os objetos são guardados serializados com pickle (mais rápido de
+    reconstruir do que o JSON): cada leitura recebe uma cópia própria, que
+    pode modificar sem afetar a cache nem os outros leitores.
+    """
+
+    DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Path, Tuple[FileStamp, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, stamp: FileStamp) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                self._hits += 1
+                payload = entry[1]
+            else:
+                self._misses += 1
+                return False, None
+        return True, pickle.loads(payload)
+
+    def put(self, path: Path, stamp: FileStamp, value: Any) -> None:
+        size = stamp[1]
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL) if size <= self.max_bytes else None
+        with self._lock:
+            self._discard(path)
+            if payload is None:
+                return
+            self._entries[path] = (stamp, payload)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self._evictions += 1
+
+    def evict(self, path: Path) -> None:
+        with self._lock:
+            self._discard(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _discard(self, path: Path) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[0][1]
+
 
 class JSONStorage:
     """Gestor simples para leitura/escrita de ficheiros JSON."""
 
     DEFAULT_SUBDIR = "storage"
 
-    def __init__(self, base_dir: Optional[Path] = None) -> None:
+    def __init__(
+        self,
+        base_dir: Optional[Path] = None,
+        cache: Optional[ReadCache] = None,
+    ) -> None:
         allowed_base = ValidationLayer.ALLOWED_BASE_DIR
         self.base_dir = base_dir or allowed_base / self.DEFAULT_SUBDIR
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = cache
 
     def _resolve_path(self, relative_path: str) -> Path:
         target = Path(relative_path)
@@ -43,11 +129,43 @@ class JSONStorage:
     def exists(self, relative_path: str) -> bool:
         return self._resolve_path(relative_path).exists()
 
+    def size(self, relative_path: str) -> int:
+        return self._resolve_path(relative_path).stat().st_size
+
+    def list_names(self, directory: str = "", suffix: str = "") -> List[str]:
+        """Caminhos relativos dos ficheiros diretamente dentro de `directory`."""
+        folder = self._resolve_path(directory) if directory else self.base_dir
+        if not folder.is_dir():
+            return []
+        prefix = f"{directory.strip('/')}/" if directory else ""
+        return sorted(
+            prefix + entry.name
+            for entry in folder.iterdir()
+            if entry.is_file() and entry.name.endswith(suffix) and not entry.name.endswith(".tmp")
+        )
+
+    @contextmanager
+    def batch(self) -> Iterator["JSONStorage"]:
+        """Agrupa escritas; no backend JSON cada escrita já é atómica por si."""
+        yield self
+
     def read(self, relative_path: str) -> Any:
         path = self._resolve_path(relative_path)
         logger.debug("Reading JSON from %s", path)
         with open(path, "r", encoding="utf-8") as handle:
-            return json.load(handle)
+            if self.cache is None:
+                return json.load(handle)
+
+            # fstat do descritor aberto: o stamp corresponde ao conteúdo lido,
+            # mesmo que o ficheiro seja substituído entretanto.
+            stat = os.fstat(handle.fileno())
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            hit, value = self.cache.get(path, stamp)
+            if hit:
+                return value
+            value = json.load(handle)
+        self.cache.put(path, stamp, value)
+        return value
 
     def write(self, relative_path: str, data: Any) -> Path:
         path = self._resolve_path(relative_path)
@@ -64,9 +182,38 @@ class JSONStorage:
             json.dump(data, tmp, indent=2)
             tmp.flush()
             os.fsync(tmp.fileno())
+            stat = os.fstat(tmp.fileno())
             temp_name = tmp.name
 
         os.replace(temp_name, path)
+        if self.cache is not None:
+            self.cache.put(path, (stat.st_mtime_ns, stat.st_size), data)
+        return path
+
+    def read_bytes(self, relative_path: str) -> bytes:
+        path = self._resolve_path(relative_path)
+        logger.debug("Reading bytes from %s", path)
+        return path.read_bytes()
+
+    def write_bytes(self, relative_path: str, data: bytes) -> Path:
+        path = self._resolve_path(relative_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        logger.debug("Writing bytes to %s", path)
+        with tempfile.NamedTemporaryFile(
+            "wb",
+            delete=False,
+            dir=str(path.parent),
+            suffix=".tmp",
+        ) as tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+            temp_name = tmp.name
+
+        os.replace(temp_name, path)
+        if self.cache is not None:
+            self.cache.evict(path)
         return path
 
     def delete(self, relative_path: str) -> bool:
@@ -74,5 +221,17 @@ class JSONStorage:
         if not path.exists():
             return False
         logger.debug("Deleting JSON file %s", path)
+        if self.cache is not None:
+            self.cache.evict(path)
         path.unlink()
         return True
+
+
+_read_cache: Optional[ReadCache] = None
+
+
+def get_read_cache() -> ReadCache:
+    global _read_cache
+    if _read_cache is None:
+        _read_cache = ReadCache()
+    return _read_cache
@@ -0,0 +1,248 @@
+"""Armazenamento numa única base SQLite (modo WAL) com a API do JSONStorage."""
+from __future__ import annotations
+
+import errno
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.validation import PathTraversalError, ValidationLayer
+from app.storage.json_storage import JSONStorage, ReadCache
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    updated_ns INTEGER NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID
+"""
+
+# Ligações por thread (sqlite3 não as partilha entre threads) e por base.
+_local = threading.local()
+
+
+class SQLiteStorage:
+    """Guarda cada "ficheiro" como uma linha (namespace, key) numa base SQLite.
+
+    O namespace é o diretório que o JSONStorage equivalente usaria, relativo ao
+    ALLOWED_BASE_DIR (ex.: "snapshots", "storage"), pelo que todos os
+    componentes partilham uma única base. A chave primária serve as leituras e
+    as listagens por prefixo; `batch()` agrupa várias escritas numa transação.
+    """
+
+    DB_NAME = "storage.db"
+    BUSY_TIMEOUT_MS = 5000
+
+    def __init__(
+        self,
+        base_dir: Optional[Path] = None,
+        cache: Optional[ReadCache] = None,
+        db_path: Optional[Path] = None,
+    ) -> None:
+        allowed_base = ValidationLayer.ALLOWED_BASE_DIR
+        self.base_dir = base_dir or allowed_base / JSONStorage.DEFAULT_SUBDIR
+        self.db_path = db_path or allowed_base / self.DB_NAME
+        self.namespace = self._namespace(self.base_dir, allowed_base)
+        self.cache = cache
+        self._connection()
+
+    # --- API equivalente ao JSONStorage ---------------------------------------------
+
+    def exists(self, relative_path: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, self._key(relative_path)),
+        ).fetchone()
+        return row is not None
+
+    def size(self, relative_path: str) -> int:
+        key = self._key(relative_path)
+        row = self._connection().execute(
+            "SELECT size FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            raise self._not_found(key)
+        return row[0]
+
+    def read(self, relative_path: str) -> Any:
+        key = self._key(relative_path)
+        conn = self._connection()
+        if self.cache is None:
+            return json.loads(self._fetch(conn, key))
+
+        # Só o stamp é lido primeiro: um hit evita transferir e interpretar os dados.
+        row = conn.execute(
+            "SELECT updated_ns, size FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            raise self._not_found(key)
+        cache_key = self._cache_key(key)
+        stamp = (row[0], row[1])
+        hit, value = self.cache.get(cache_key, stamp)
+        if hit:
+            return value
+        value = json.loads(self._fetch(conn, key))
+        self.cache.put(cache_key, stamp, value)
+        return value
+
+    def write(self, relative_path: str, data: Any) -> Path:
+        payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        key = self._store(relative_path, payload)
+        if self.cache is not None:
+            self.cache.evict(self._cache_key(key))
+        return self.base_dir / key
+
+    def read_bytes(self, relative_path: str) -> bytes:
+        return self._fetch(self._connection(), self._key(relative_path))
+
+    def write_bytes(self, relative_path: str, data: bytes) -> Path:
+        key = self._store(relative_path, bytes(data))
+        if self.cache is not None:
+            self.cache.evict(self._cache_key(key))
+        return self.base_dir / key
+
+    def delete(self, relative_path: str) -> bool:
+        key = self._key(relative_path)
+        if self.cache is not None:
+            self.cache.evict(self._cache_key(key))
+        cursor = self._connection().execute(
+            "DELETE FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+        return cursor.rowcount > 0
+
+    def list_names(self, directory: str = "", suffix: str = "") -> List[str]:
+        """Chaves diretamente dentro de `directory` (consulta por intervalo na PK)."""
+        prefix = f"{directory.strip('/')}/" if directory else ""
+        rows = self._connection().execute(
+            "SELECT key FROM entries WHERE namespace = ? AND key >= ? AND key < ? ORDER BY key",
+            (self.namespace, prefix, prefix + "\uffff"),
+        )
+        return [
+            key
+            for (key,) in rows
+            if "/" not in key[len(prefix) :] and key.endswith(suffix)
+        ]
+
+    @contextmanager
+    def batch(self) -> Iterator["SQLiteStorage"]:
+        """Executa as escritas do bloco numa única transação (aninhável)."""
+        conn = self._connection()
+        depth = _local.depth.get(str(self.db_path), 0)
+        if depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        _local.depth[str(self.db_path)] = depth + 1
+        try:
+            yield self
+        except BaseException:
+            _local.depth[str(self.db_path)] = depth
+            if depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        _local.depth[str(self.db_path)] = depth
+        if depth == 0:
+            conn.execute("COMMIT")
+
+    # --- Internos ---------------------------------------------------------------------
+
+    @staticmethod
+    def _namespace(base_dir: Path, allowed_base: Path) -> str:
+        try:
+            return base_dir.relative_to(allowed_base).as_posix()
+        except ValueError:
+            return base_dir.resolve().as_posix()
+
+    @staticmethod
+    def _key(relative_path: str) -> str:
+        path = PurePosixPath(str(relative_path).replace("\\", "/"))
+        if path.is_absolute():
+            raise PathTraversalError("Absolute paths are not allowed.")
+        if ".." in path.parts:
+            raise PathTraversalError(f"Path escapes storage directory: {relative_path}")
+        return path.as_posix()
+
+    def _cache_key(self, key: str) -> Path:
+        return self.db_path / self.namespace / key
+
+    @staticmethod
+    def _not_found(key: str) -> FileNotFoundError:
+        return FileNotFoundError(errno.ENOENT, "No such storage entry", key)
+
+    def _fetch(self, conn: sqlite3.Connection, key: str) -> bytes:
+        row = conn.execute(
+            "SELECT data FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            raise self._not_found(key)
+        return bytes(row[0])
+
+    def _store(self, relative_path: str, payload: bytes) -> str:
+        key = self._key(relative_path)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, data, size, updated_ns) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, payload, len(payload), time.time_ns()),
+        )
+        return key
+
+    def _connection(self) -> sqlite3.Connection:
+        connections: Dict[str, sqlite3.Connection] = getattr(_local, "connections", None)
+        if connections is None:
+            connections = _local.connections = {}
+            _local.depth = {}
+
+        db = str(self.db_path)
+        conn = connections.get(db)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None: autocommit por instrução; batch() abre transações.
+            conn = sqlite3.connect(db, isolation_level=None, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            connections[db] = conn
+        return conn
+
+
+def migrate_json_tree(
+    source_dir: Optional[Path] = None,
+    db_path: Optional[Path] = None,
+    namespaces: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """Importa a árvore de ficheiros do JSONStorage para a base SQLite.
+
+    Cada subdiretório (por omissão "storage" e "snapshots") passa a ser um
+    namespace; os ficheiros são copiados tal como estão, numa transação por
+    namespace. Devolve o número de entradas importadas por namespace.
+    """
+    source_dir = source_dir or ValidationLayer.ALLOWED_BASE_DIR
+    imported: Dict[str, int] = {}
+    for namespace in namespaces or [JSONStorage.DEFAULT_SUBDIR, "snapshots"]:
+        root = source_dir / namespace
+        if not root.is_dir():
+            continue
+        target = SQLiteStorage(base_dir=root, db_path=db_path or source_dir / SQLiteStorage.DB_NAME)
+        target.namespace = namespace
+        count = 0
+        with target.batch():
+            for path in sorted(root.rglob("*")):
+                # Temporários e ficheiros de lock não são dados.
+                if not path.is_file() or path.suffix in (".tmp", ".lock"):
+                    continue
+                target.write_bytes(path.relative_to(root).as_posix(), path.read_bytes())
+                count += 1
+        imported[namespace] = count
+        logger.info("Importadas %s entradas para o namespace %s", count, namespace)
+    return imported
@@ -1,14 +1,40 @@
 """Testes para o router advanced (Phase 2)."""
 from __future__ import annotations
 
+import time
+from typing import Any, Dict, List
+
 import pytest
 from fastapi.testclient import TestClient
 
+from app.adapters import BaseAdapter
+from app.analysis.snapshot_manager import SnapshotSummary
+from app.core import jobs as jobs_module
+from app.core import rate_limiter as rate_limiter_module
+from app.core.jobs import JobManager
+from app.core.journal import OperationJournal
+from app.core.validation import ValidationLayer
 from app.main import app
+from app.routers import advanced as advanced_router
 
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def patch_allowed_base_dir(tmp_path, monkeypatch):
+    # Rollbacks e batch-uninstall escrevem no journal de operações.
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", tmp_path / ".package-audit")
+
+
+def _wait_for_job(test_client: TestClient, job_id: str, timeout: float = 5.0) -> Dict[str, Any]:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = test_client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.01)
+
+
 class TestDependencyTree:
     """Testes para dependency tree endpoints."""
 
@@ -115,14 +141,13 @@ class TestBatchOperations:
             "/api/advanced/npm/batch-uninstall",
             json={"packages": [], "force": False},
         )
-        # Pode retornar 200 ou 404 dependendo se npm está disponível
-        assert response.status_code in [200, 404]
+        # Pode retornar 202 ou 404 dependendo se npm está disponível
+        assert response.status_code in [202, 404]
 
-        if response.status_code == 200:
+        if response.status_code == 202:
             data = response.json()
-            assert data["total"] == 0
-            assert data["succeeded"] == []
-            assert data["failed"] == []
+            assert data["kind"] == "batch-uninstall"
+            assert data["params"]["packages"] == []
 
     def test_batch_uninstall_invalid_package_name(self):
         """Testa batch uninstall com nome de pacote inválido."""
@@ -132,6 +157,69 @@ class TestBatchOperations:
         )
         assert response.status_code in [400, 404]
 
+    def test_batch_uninstall_uses_single_lock_and_batch(self, tmp_path, monkeypatch):
+        """Lote inteiro corre sob um lock e numa chamada uninstall_many."""
+        batches: List[List[str]] = []
+        operations: List[str] = []
+
+        class BatchAdapter(BaseAdapter):
+            manager_id = "dummy"
+            display_name = "Dummy"
+            executable_name = "dummy"
+
+            def list_packages(self):
+                return []
+
+            def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+                raise AssertionError("batch não deve desinstalar pacote a pacote")
+
+            def export_manifest(self):
+                return {}
+
+            async def uninstall_many_async(self, packages, force=False):
+                batches.append(list(packages))
+                return {
+                    "results": [
+                        {"package": "a", "success": True},
+                        {"package": "b", "success": False, "error": "still installed"},
+                    ]
+                }
+
+        class FakeQueue:
+            async def execute(self, operation_id, operation_type, func, *args, scope=None, **kwargs):
+                operations.append((operation_id, scope))
+                return await func(*args, **kwargs)
+
+        class FakeSnapshotManager:
+            def create_snapshot(self, package_map, metadata=None):
+                return SnapshotSummary(
+                    id="snap-batch", created_at="2025-01-01T00:00:00+00:00", managers=["dummy"], package_count=0
+                )
+
+        monkeypatch.setattr(advanced_router, "get_adapter_by_id", lambda mid: BatchAdapter)
+        monkeypatch.setattr(BatchAdapter, "detect", classmethod(lambda cls: True))
+        monkeypatch.setattr(jobs_module, "_job_manager", JobManager(FakeQueue()))
+        monkeypatch.setattr(advanced_router, "SnapshotManager", FakeSnapshotManager)
+        # Limiter próprio para não consumir a quota de mutações dos restantes testes.
+        monkeypatch.setattr(rate_limiter_module, "_path_rate_limiter", None)
+
+        # Com o context manager o loop do cliente continua ativo e o job corre.
+        with TestClient(app) as job_client:
+            response = job_client.post(
+                "/api/advanced/dummy/batch-uninstall",
+                json={"packages": ["a", "b"], "force": False},
+            )
+            assert response.status_code == 202, response.text
+            job = _wait_for_job(job_client, response.json()["id"])
+
+        assert job["status"] == "succeeded", job
+        data = job["result"]
+        assert data["succeeded"] == ["a"]
+        assert data["failed"] == [{"package": "b", "error": "still installed"}]
+        assert data["snapshot_id"] == "snap-batch"
+        assert batches == [["a", "b"]]
+        assert operations == [("batch-uninstall:dummy", "dummy")]
+
 
 class TestRollback:
     """Testes para rollback functionality."""
@@ -151,3 +239,70 @@ class TestRollback:
         response = client.post("/api/advanced/npm/rollback/../../../etc/passwd")
         # Deve falhar na validação ou não encontrar
         assert response.status_code in [400, 404]
+
+    def test_rollback_manager_missing_from_snapshot(self, monkeypatch):
+        """Snapshot sem secção do gestor não gera um plano de desinstalar tudo."""
+
+        class RollbackAdapter(BaseAdapter):
+            manager_id = "dummy"
+            display_name = "Dummy"
+            executable_name = "dummy"
+
+            def list_packages(self):
+                return [{"name": "a", "version": "1.0"}]
+
+            def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+                raise AssertionError("rollback não deve desinstalar nada")
+
+            def export_manifest(self):
+                return {}
+
+        class FakeSnapshotManager:
+            def get_summary(self, snapshot_id):
+                return SnapshotSummary(
+                    id=snapshot_id, created_at="2025-01-01T00:00:00+00:00", managers=["pip"], package_count=1
+                )
+
+        monkeypatch.setattr(advanced_router, "get_adapter_by_id", lambda mid: RollbackAdapter)
+        monkeypatch.setattr(RollbackAdapter, "detect", classmethod(lambda cls: True))
+        monkeypatch.setattr(advanced_router, "SnapshotManager", FakeSnapshotManager)
+        monkeypatch.setattr(rate_limiter_module, "_path_rate_limiter", None)
+
+        response = client.post("/api/advanced/dummy/rollback/snap-pip")
+        assert response.status_code == 404
+        assert "no packages for manager dummy" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_rollback_skips_injected_packages(self):
+        """Um pacote injetado com o nome de uma aplicação não a desinstala."""
+        uninstalled: List[str] = []
+
+        class PipxLikeAdapter(BaseAdapter):
+            manager_id = "dummy"
+            display_name = "Dummy"
+            executable_name = "dummy"
+
+            def list_packages(self):
+                return [
+                    {"name": "black", "version": "24.1.0"},
+                    {"name": "black", "version": "24.1.0", "injected_into": "poetry"},
+                    {"name": "ruff", "version": "0.4.0"},
+                ]
+
+            def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+                uninstalled.append(package)
+                return {"success": True}
+
+            def export_manifest(self):
+                return {}
+
+        class FakeSnapshotManager:
+            def get_manager_packages(self, snapshot_id, manager_id):
+                return [{"name": "black", "version": "24.1.0"}]
+
+        entry = OperationJournal().begin("rollback", "dummy", {"snapshot_id": "snap-1"})
+        result = await advanced_router._run_rollback(entry, PipxLikeAdapter(), FakeSnapshotManager())
+
+        assert entry.plan == ["ruff"]
+        assert uninstalled == ["ruff"]
+        assert result["uninstalled"] == ["ruff"]
@@ -2,12 +2,15 @@
 from __future__ import annotations
 
 import subprocess
+import threading
 from typing import Any, Dict, List
 
 import pytest
 
-from app.adapters.base import BaseAdapter
-from app.core.executor import CommandExecutionError
+from app.adapters.base import BaseAdapter, CommandRequest, Operation
+from app.core import version_cache as version_cache_module
+from app.core.executor import CommandExecutionError, CommandTimeoutError
+from app.core.path_index import PathIndex
 from app.core.validation import InvalidPackageNameError, ValidationLayer
 
 
@@ -34,17 +37,17 @@ def patch_allowed_base_dir(tmp_path, monkeypatch):
 
 
 def test_detect_returns_true_when_executable_found(monkeypatch):
-    monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/dummy")
+    monkeypatch.setattr(PathIndex, "which", lambda self, _: "/usr/bin/dummy")
     assert DummyAdapter.detect() is True
 
 
 def test_detect_returns_false_when_missing(monkeypatch):
-    monkeypatch.setattr("shutil.which", lambda _: None)
+    monkeypatch.setattr(PathIndex, "which", lambda self, _: None)
     assert DummyAdapter.detect() is False
 
 
 def test_get_version_returns_output(monkeypatch):
-    monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/dummy")
+    monkeypatch.setattr(PathIndex, "which", lambda self, _: "/usr/bin/dummy")
 
     def fake_run(cmd, timeout=None, check=True, cwd=None):
         return subprocess.CompletedProcess(cmd, 0, stdout="v1.2.3\n", stderr="")
@@ -54,7 +57,7 @@ def test_get_version_returns_output(monkeypatch):
 
 
 def test_get_version_handles_errors(monkeypatch):
-    monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/dummy")
+    monkeypatch.setattr(PathIndex, "which", lambda self, _: "/usr/bin/dummy")
 
     def fake_run(cmd, timeout=None, check=True, cwd=None):
         raise CommandExecutionError("boom")
@@ -94,3 +97,175 @@ def test_cache_operations(tmp_path):
     assert adapter.cache_read("test.json") == data
     assert adapter.cache_delete("test.json") is True
     assert adapter.cache_exists("test.json") is False
+
+
+class StatefulAdapter(DummyAdapter):
+    state_dir = None
+    calls = 0
+
+    def state_paths(self):
+        return [self.state_dir]
+
+    def list_packages(self) -> List[Dict[str, Any]]:
+        type(self).calls += 1
+        return [{"name": entry.name} for entry in sorted(self.state_dir.iterdir())]
+
+
+def test_list_packages_cached_without_state_paths():
+    adapter = DummyAdapter()
+    assert adapter.inventory_fingerprint() is None
+    assert adapter.list_packages_cached() == []
+    assert not adapter.cache_exists(DummyAdapter.INVENTORY_CACHE_NAME)
+
+
+def test_list_packages_cached_until_fingerprint_changes(tmp_path, monkeypatch):
+    state_dir = tmp_path / "site-packages"
+    state_dir.mkdir()
+    (state_dir / "a").mkdir()
+    monkeypatch.setattr(StatefulAdapter, "state_dir", state_dir)
+    monkeypatch.setattr(StatefulAdapter, "calls", 0)
+
+    adapter = StatefulAdapter()
+    assert adapter.list_packages_cached() == [{"name": "a"}]
+    assert StatefulAdapter().list_packages_cached() == [{"name": "a"}]
+    assert StatefulAdapter.calls == 1
+
+    (state_dir / "b").mkdir()
+    assert adapter.list_packages_cached() == [{"name": "a"}, {"name": "b"}]
+    assert StatefulAdapter.calls == 2
+
+
+def test_list_packages_cached_ignores_corrupt_cache(tmp_path, monkeypatch):
+    state_dir = tmp_path / "state"
+    state_dir.mkdir()
+    monkeypatch.setattr(StatefulAdapter, "state_dir", state_dir)
+    monkeypatch.setattr(StatefulAdapter, "calls", 0)
+
+    adapter = StatefulAdapter()
+    cache_path = adapter.cache_write(StatefulAdapter.INVENTORY_CACHE_NAME, {})
+    cache_path.write_text("{not json")
+    assert adapter.list_packages_cached() == []
+    assert StatefulAdapter.calls == 1
+
+
+@pytest.fixture
+def version_cache(monkeypatch):
+    monkeypatch.setattr(version_cache_module, "_version_cache", None)
+    yield
+    version_cache_module._version_cache = None
+
+
+def test_get_version_cached_by_binary(tmp_path, monkeypatch, version_cache):
+    binary = tmp_path / "dummy"
+    binary.write_text("#!/bin/sh\n")
+    monkeypatch.setattr(PathIndex, "which", lambda self, _: str(binary))
+    calls = []
+
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout=f"v{len(calls)}\n", stderr="")
+
+    monkeypatch.setattr(DummyAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    assert DummyAdapter.get_version() == "v1"
+    assert DummyAdapter.get_version() == "v1"
+    assert len(calls) == 1
+
+    # Cache persiste entre instâncias (ex.: reinício do servidor).
+    version_cache_module._version_cache = None
+    assert DummyAdapter.get_version() == "v1"
+    assert len(calls) == 1
+
+    binary.write_text("#!/bin/sh\n# upgraded\n")
+    assert DummyAdapter.get_version() == "v2"
+
+
+class OperationAdapter(DummyAdapter):
+    def _probe_operation(self) -> Operation[Dict[str, Any]]:
+        first = yield self.command("first")
+        try:
+            yield self.command("second", timeout=1)
+        except CommandTimeoutError as exc:
+            return {"first": first.stdout, "error": str(exc)}
+        return {"first": first.stdout}
+
+
+def test_run_operation_sends_results_and_throws_errors(monkeypatch):
+    calls = []
+
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        calls.append((cmd, timeout, check))
+        if cmd[-1] == "second":
+            raise CommandTimeoutError("slow")
+        return subprocess.CompletedProcess(cmd, 0, stdout="ok", stderr="")
+
+    monkeypatch.setattr(OperationAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    adapter = OperationAdapter()
+    assert adapter._run_operation(adapter._probe_operation()) == {"first": "ok", "error": "slow"}
+    assert calls == [
+        (["dummy", "first"], adapter.command_timeout, False),
+        (["dummy", "second"], 1, False),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_run_operation_async_uses_run_process(monkeypatch):
+    calls = []
+
+    async def fake_run_process(cmd, timeout=None, check=True, cwd=None):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="async", stderr="")
+
+    def fail_run(*args, **kwargs):
+        raise AssertionError("caminho assíncrono não deve usar run()")
+
+    monkeypatch.setattr(
+        OperationAdapter,
+        "command_executor",
+        type("Exec", (), {"run": staticmethod(fail_run), "run_process": staticmethod(fake_run_process)}),
+    )
+    adapter = OperationAdapter()
+    assert await adapter._run_operation_async(adapter._probe_operation()) == {"first": "async"}
+    assert calls == [["dummy", "first"], ["dummy", "second"]]
+
+
+@pytest.mark.asyncio
+async def test_run_operation_async_runs_operation_code_off_the_loop(monkeypatch):
+    threads = []
+
+    class ReadingAdapter(DummyAdapter):
+        def _read_operation(self) -> Operation[None]:
+            threads.append(threading.get_ident())
+            yield self.command("list")
+            threads.append(threading.get_ident())
+
+    async def fake_run_process(cmd, timeout=None, check=True, cwd=None):
+        threads.append(threading.get_ident())
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(
+        ReadingAdapter, "command_executor", type("Exec", (), {"run_process": staticmethod(fake_run_process)})
+    )
+    adapter = ReadingAdapter()
+    await adapter._run_operation_async(adapter._read_operation())
+
+    loop_thread = threading.get_ident()
+    assert threads[1] == loop_thread
+    assert threads[0] != loop_thread and threads[2] != loop_thread
+
+
+@pytest.mark.asyncio
+async def test_default_async_methods_delegate_to_sync():
+    adapter = DummyAdapter()
+    assert await adapter.list_packages_async() == []
+    assert await adapter.uninstall_async("pkg", True) == {"package": "pkg", "force": True}
+
+
+def test_command_builds_request():
+    request = DummyAdapter().command("list", "--json", timeout=5)
+    assert request == CommandRequest(["dummy", "list", "--json"], 5, False)
+
+
+def test_uninstall_many_falls_back_to_sequential_uninstall():
+    result = DummyAdapter().uninstall_many(["a", "b"], force=True)
+    assert [item["package"] for item in result["results"]] == ["a", "b"]
+    assert result["force"] is True
@@ -19,6 +19,44 @@ def patch_base_dir(tmp_path, monkeypatch):
     return base
 
 
+@pytest.fixture(autouse=True)
+def no_prefix(tmp_path, monkeypatch):
+    """Por omissão força o caminho via subprocesso; testes diretos sobrepõem."""
+    monkeypatch.setattr(BrewAdapter, "_prefix", tmp_path / "no-homebrew")
+    monkeypatch.setattr(BrewAdapter, "_prefix_failed_at", None)
+
+
+def _install_formula(prefix, name, version, deps=(), on_request=True):
+    keg = prefix / "Cellar" / name / version
+    keg.mkdir(parents=True)
+    receipt = {
+        "installed_on_request": on_request,
+        "runtime_dependencies": [
+            {"full_name": dep, "version": "1.0", "declared_directly": True} for dep in deps
+        ],
+    }
+    (keg / "INSTALL_RECEIPT.json").write_text(json.dumps(receipt))
+    return keg
+
+
+@pytest.fixture
+def fake_prefix(tmp_path, monkeypatch):
+    prefix = tmp_path / "homebrew"
+    _install_formula(prefix, "python@3.12", "3.12.4", deps=["openssl@3", "sqlite"])
+    _install_formula(prefix, "openssl@3", "3.2.1", deps=["ca-certificates"], on_request=False)
+    _install_formula(prefix, "openssl@3", "3.3.0", deps=["ca-certificates"], on_request=False)
+    _install_formula(prefix, "ca-certificates", "2024-03-11", on_request=False)
+    _install_formula(prefix, "sqlite", "3.45.2", on_request=False)
+    _install_formula(prefix, "wget", "1.24.5", deps=["openssl@3"])
+    (prefix / "opt").mkdir()
+    (prefix / "opt" / "openssl@3").symlink_to("../Cellar/openssl@3/3.2.1")
+    (prefix / "Caskroom" / "firefox" / "125.0").mkdir(parents=True)
+    (prefix / "Caskroom" / "firefox" / ".metadata").mkdir()
+
+    monkeypatch.setattr(BrewAdapter, "_prefix", prefix)
+    return prefix
+
+
 def test_list_packages_parses_formulae(monkeypatch):
     output = {
         "formulae": [
@@ -88,3 +126,68 @@ def test_export_manifest(monkeypatch):
     manifest = adapter.export_manifest()
     assert manifest["manager"] == "brew"
     assert manifest["packages"][0]["name"] == "python"
+
+
+def test_list_packages_reads_cellar(monkeypatch, fake_prefix):
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        raise AssertionError("brew não deve ser executado")
+
+    monkeypatch.setattr(BrewAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    packages = {pkg["name"]: pkg for pkg in BrewAdapter().list_packages()}
+    assert packages["python@3.12"]["version"] == "3.12.4"
+    assert packages["openssl@3"]["version"] == "3.2.1"
+    assert packages["firefox"] == {
+        "name": "firefox",
+        "version": "125.0",
+        "status": "unknown",
+        "manager": "brew",
+        "kind": "cask",
+    }
+
+
+def test_dependency_tree_from_receipts(fake_prefix):
+    result = BrewAdapter().get_dependency_tree()
+    assert result["supported"] is True
+    roots = result["tree"]["dependencies"]
+    assert sorted(roots) == ["python@3.12", "wget"]
+    python = roots["python@3.12"]
+    assert python["dependencies"]["openssl@3"]["dependencies"]["ca-certificates"] == {"version": "2024-03-11"}
+    assert roots["wget"]["dependencies"]["openssl@3"] == {"version": "3.2.1", "deduped": True}
+
+
+def test_dependency_tree_for_package(fake_prefix):
+    tree = BrewAdapter().get_dependency_tree("openssl@3")["tree"]
+    assert list(tree["dependencies"]) == ["openssl@3"]
+
+
+def test_resolve_prefix_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(BrewAdapter, "_prefix", None)
+    monkeypatch.setenv("HOMEBREW_PREFIX", str(tmp_path))
+    assert BrewAdapter._resolve_prefix() == tmp_path
+
+    monkeypatch.setenv("HOMEBREW_PREFIX", "/elsewhere")
+    assert BrewAdapter._resolve_prefix() == tmp_path
+
+
+def test_failed_prefix_resolution_is_cached(monkeypatch):
+    calls = []
+
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        calls.append(cmd)
+        raise CommandExecutionError("brew: command not found")
+
+    monkeypatch.setattr(BrewAdapter, "_prefix", None)
+    monkeypatch.delenv("HOMEBREW_PREFIX", raising=False)
+    monkeypatch.setattr(BrewAdapter, "_prefix_from_executable", classmethod(lambda cls: None))
+    monkeypatch.setattr(BrewAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+
+    assert BrewAdapter._resolve_prefix() is None
+    assert BrewAdapter().state_paths() == []
+    assert BrewAdapter._resolve_prefix() is None
+    assert len(calls) == 1
+
+    # Passado o intervalo, a resolução é tentada de novo.
+    expired = BrewAdapter._prefix_failed_at - BrewAdapter.PREFIX_RETRY_SECONDS
+    monkeypatch.setattr(BrewAdapter, "_prefix_failed_at", expired)
+    assert BrewAdapter._resolve_prefix() is None
+    assert len(calls) == 2
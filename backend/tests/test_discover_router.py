@@ -1,16 +1,26 @@
 """Testes para o endpoint /api/discover."""
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
 from typing import List, Type
 
 import pytest
 from fastapi.testclient import TestClient
 
 from app.adapters import BaseAdapter, NpmAdapter, PipAdapter, WinGetAdapter, BrewAdapter
+from app.adapters import discovery
 from app.main import create_app
 from app.routers import discover
 
 
+@pytest.fixture(autouse=True)
+def fresh_inflight(monkeypatch):
+    """Chamadas penduradas de um teste não são reaproveitadas pelo seguinte."""
+    monkeypatch.setattr(discovery, "_inflight", {})
+
+
 @pytest.fixture
 def client(monkeypatch):
     app = create_app()
@@ -51,3 +61,102 @@ def test_discover_returns_unknown_when_version_missing(monkeypatch, client):
     assert response.status_code == 200
     data = response.json()
     assert data["managers"][0]["version"] == "unknown"
+
+
+def test_discover_reports_unknown_for_hanging_version(monkeypatch, client):
+    def fake_available() -> List[Type[BaseAdapter]]:
+        return [NpmAdapter, PipAdapter]
+
+    def slow_version(cls):
+        time.sleep(0.5)
+        return "never"
+
+    monkeypatch.setattr(discover, "_available_adapters", fake_available)
+    monkeypatch.setattr(discovery, "DISCOVERY_TIMEOUT", 0.05)
+    monkeypatch.setattr(NpmAdapter, "detect", classmethod(lambda cls: True))
+    monkeypatch.setattr(NpmAdapter, "get_version", classmethod(slow_version))
+    monkeypatch.setattr(PipAdapter, "detect", classmethod(lambda cls: True))
+    monkeypatch.setattr(PipAdapter, "get_version", classmethod(lambda cls: "24.0"))
+
+    start = time.monotonic()
+    response = client.post("/api/discover")
+    elapsed = time.monotonic() - start
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "managers": [
+            {"id": "npm", "name": "npm", "version": "unknown"},
+            {"id": "pip", "name": "pip", "version": "24.0"},
+        ]
+    }
+    assert elapsed < 0.5
+
+
+def test_discover_managers_sync_runs_concurrently(monkeypatch):
+    def slow_version(cls):
+        time.sleep(0.2)
+        return cls.manager_id
+
+    for adapter_cls in (NpmAdapter, PipAdapter, BrewAdapter):
+        monkeypatch.setattr(adapter_cls, "detect", classmethod(lambda cls: True))
+        monkeypatch.setattr(adapter_cls, "get_version", classmethod(slow_version))
+
+    start = time.monotonic()
+    detected = discovery.discover_managers_sync([NpmAdapter, PipAdapter, BrewAdapter])
+    elapsed = time.monotonic() - start
+
+    assert [item.version for item in detected] == ["npm", "pip", "brew"]
+    assert elapsed < 0.5
+
+
+@pytest.mark.asyncio
+async def test_hanging_probe_is_not_resubmitted(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def hanging_version(cls):
+        calls.append(cls.manager_id)
+        release.wait(5)
+        return "late"
+
+    monkeypatch.setattr(NpmAdapter, "detect", classmethod(lambda cls: True))
+    monkeypatch.setattr(NpmAdapter, "get_version", classmethod(hanging_version))
+    monkeypatch.setattr(PipAdapter, "detect", classmethod(lambda cls: True))
+    monkeypatch.setattr(PipAdapter, "get_version", classmethod(lambda cls: "24.0"))
+
+    try:
+        # Mais chamadas do que threads no pool: sem reaproveitamento, o pool enchia.
+        for _ in range(12):
+            detected = await discovery.discover_managers([NpmAdapter, PipAdapter], timeout=0.05)
+            assert [(item.adapter, item.version) for item in detected] == [
+                (NpmAdapter, None),
+                (PipAdapter, "24.0"),
+            ]
+        assert calls == ["npm"]
+    finally:
+        release.set()
+
+    # Terminada a chamada pendurada, a seguinte volta a consultar o adapter.
+    for _ in range(100):
+        if not discovery._inflight:
+            break
+        await asyncio.sleep(0.01)
+    detected = await discovery.discover_managers([NpmAdapter], timeout=1.0)
+    assert detected[0].version == "late"
+    assert calls == ["npm", "npm"]
+
+
+@pytest.mark.asyncio
+async def test_hanging_detect_reports_unknown_version(monkeypatch):
+    release = threading.Event()
+
+    def hanging_detect(cls):
+        release.wait(5)
+        return True
+
+    monkeypatch.setattr(NpmAdapter, "detect", classmethod(hanging_detect))
+    try:
+        detected = await discovery.discover_managers([NpmAdapter], timeout=0.05)
+    finally:
+        release.set()
+    assert [(item.adapter, item.version) for item in detected] == [(NpmAdapter, None)]
@@ -77,3 +77,13 @@ async def test_run_async_timeout():
 async def test_run_async_type_error():
     with pytest.raises(TypeError):
         await CommandExecutor.run_async("python -c 'print(1)'")  # type: ignore[arg-type]
+
+
+@pytest.mark.asyncio
+async def test_run_process_returns_completed_process():
+    result = await CommandExecutor.run_process(
+        python_cmd("import sys", "print('out')", "sys.exit(3)"),
+        check=False,
+    )
+    assert result.returncode == 3
+    assert result.stdout.strip() == "out"
@@ -0,0 +1,297 @@
+"""Testes para o subsistema de jobs."""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import jobs as jobs_module
+from app.core import locking
+from app.core.jobs import JobManager, JobStatus, SQLiteJobStore, create_job_store
+from app.core.queue import OperationQueue
+from app.core.validation import ValidationLayer
+from app.main import create_app
+from app.routers import jobs as jobs_router
+
+
+@pytest.fixture(autouse=True)
+def patch_allowed_base_dir(tmp_path, monkeypatch):
+    # O arranque da app retoma operações do journal; isola-o por teste.
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", tmp_path / ".package-audit")
+
+
+@pytest.fixture
+def lock_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(locking.LockManager, "LOCK_DIR", tmp_path / "locks")
+    manager = locking.LockManager()
+    yield manager
+    manager.force_release()
+
+
+@pytest.fixture
+def job_manager(lock_manager):
+    return JobManager(OperationQueue(lock_manager))
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_one_manager_run_in_fifo_order(job_manager):
+    order = []
+
+    def make(name):
+        async def run():
+            order.append(("start", name))
+            await asyncio.sleep(0.01)
+            order.append(("end", name))
+            return name
+
+        return run
+
+    jobs = [job_manager.submit("uninstall", "npm", make(name)) for name in ("a", "b", "c")]
+    assert [job_manager.position(job) for job in jobs] == [0, 1, 2]
+
+    await job_manager.join()
+
+    assert order == [(step, name) for name in ("a", "b", "c") for step in ("start", "end")]
+    assert [job.result for job in jobs] == ["a", "b", "c"]
+    assert all(job.status == JobStatus.SUCCEEDED for job in jobs)
+
+
+@pytest.mark.asyncio
+async def test_different_managers_run_concurrently(job_manager):
+    started = {"npm": asyncio.Event(), "pip": asyncio.Event()}
+    release = asyncio.Event()
+
+    def make(manager_id):
+        async def run():
+            started[manager_id].set()
+            await release.wait()
+            return manager_id
+
+        return run
+
+    jobs = [job_manager.submit("uninstall", manager_id, make(manager_id)) for manager_id in started]
+    await asyncio.wait_for(asyncio.gather(*(event.wait() for event in started.values())), 1)
+    assert {job.status for job in jobs} == {JobStatus.RUNNING}
+
+    release.set()
+    await job_manager.join()
+    assert job_manager.stats()["succeeded"] == 2
+
+
+@pytest.mark.asyncio
+async def test_job_waits_for_lock_held_elsewhere(job_manager, lock_manager, monkeypatch):
+    monkeypatch.setattr(JobManager, "LOCK_RETRY_INTERVAL", 0.01)
+    other_process = locking.LockManager()
+    assert other_process.acquire_lock("uninstall:npm:cli", "npm")
+
+    async def run():
+        return "done"
+
+    job = job_manager.submit("uninstall", "npm", run)
+    await asyncio.sleep(0.05)
+    assert job.status == JobStatus.QUEUED
+    assert "uninstall:npm:cli" in job.blocked_by
+
+    other_process.release_lock("npm")
+    finished = await job_manager.wait(job.id, timeout=1)
+    assert finished.status == JobStatus.SUCCEEDED
+    assert finished.blocked_by is None
+
+
+@pytest.mark.asyncio
+async def test_failures_and_cancellation(job_manager):
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("npm uninstall falhou")
+
+    async def never_runs():
+        raise AssertionError("job cancelado não deve correr")
+
+    failed = job_manager.submit("uninstall", "npm", failing)
+    cancelled = job_manager.submit("uninstall", "npm", never_runs)
+    await asyncio.sleep(0)
+
+    assert job_manager.cancel(cancelled.id)
+    assert not job_manager.cancel(failed.id)  # já em execução
+    release.set()
+    await job_manager.join()
+
+    assert failed.status == JobStatus.FAILED
+    assert failed.error == "npm uninstall falhou"
+    assert cancelled.status == JobStatus.CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_watch_reports_each_transition(job_manager):
+    async def run():
+        await asyncio.sleep(0.01)
+        return {"success": True}
+
+    job = job_manager.submit("uninstall", "npm", run)
+    statuses = [current.status async for current in job_manager.watch(job.id, timeout=1)]
+    assert statuses == [JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.SUCCEEDED]
+
+
+def test_jobs_router(job_manager, monkeypatch):
+    monkeypatch.setattr(jobs_module, "_job_manager", job_manager)
+
+    async def run():
+        return {"success": True}
+
+    with TestClient(create_app()) as client:
+        job = client.portal.call(lambda: _submit(job_manager, run))
+
+        with client.stream("GET", f"/api/jobs/{job.id}/events") as response:
+            events = [
+                json.loads(line[len("data: "):])
+                for line in response.iter_lines()
+                if line.startswith("data: ")
+            ]
+        assert events[-1]["status"] == "succeeded"
+        assert events[-1]["result"] == {"success": True}
+
+        listed = client.get("/api/jobs", params={"manager": "npm", "status": "succeeded"}).json()
+        assert [item["id"] for item in listed["jobs"]] == [job.id]
+        assert client.delete(f"/api/jobs/{job.id}").status_code == 409
+        assert client.get("/api/jobs/missing").status_code == 404
+
+
+def test_job_events_send_only_pings_while_unchanged(job_manager, monkeypatch):
+    monkeypatch.setattr(jobs_module, "_job_manager", job_manager)
+    monkeypatch.setattr(jobs_router, "KEEPALIVE_SECONDS", 0.02)
+
+    async def run():
+        await asyncio.sleep(0.2)
+        return {"success": True}
+
+    with TestClient(create_app()) as client:
+        job = client.portal.call(lambda: _submit(job_manager, run))
+        with client.stream("GET", f"/api/jobs/{job.id}/events") as response:
+            lines = list(response.iter_lines())
+
+    statuses = [json.loads(line[len("data: "):])["status"] for line in lines if line.startswith("data: ")]
+    # Um evento por estado: os keep-alives não repetem o estado atual.
+    assert statuses[-2:] == ["running", "succeeded"]
+    assert len(statuses) == len(set(statuses))
+    assert lines.count(": keep-alive") >= 2
+
+
+async def _submit(job_manager, func):
+    return job_manager.submit("uninstall", "npm", func)
+
+
+class TestSharedStore:
+    """Dois JobManager com o mesmo store simulam dois workers do servidor."""
+
+    @pytest.fixture
+    def workers(self, lock_manager, tmp_path):
+        db_path = tmp_path / "jobs.db"
+        return [
+            JobManager(OperationQueue(lock_manager), store=SQLiteJobStore(db_path))
+            for _ in range(2)
+        ]
+
+    @staticmethod
+    async def _wait_shared(job_manager, job_id, job_status):
+        for _ in range(200):
+            shared = await job_manager.get_shared(job_id)
+            if shared is not None and shared[0]["status"] == job_status:
+                return shared[0]
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"job {job_id} nunca ficou {job_status}")
+
+    @pytest.mark.asyncio
+    async def test_job_state_is_visible_to_other_workers(self, workers):
+        owner, other = workers
+        release = asyncio.Event()
+
+        async def run():
+            await release.wait()
+            return {"success": True}
+
+        job = owner.submit("uninstall", "npm", run, params={"package": "lodash"})
+        await self._wait_shared(other, job.id, "running")
+        release.set()
+        await owner.join()
+
+        assert other.get(job.id) is None
+        payload = await self._wait_shared(other, job.id, "succeeded")
+        assert payload["result"] == {"success": True}
+        assert payload["params"] == {"package": "lodash"}
+        assert [item["id"] for item in await other.list_shared(manager_id="npm")] == [job.id]
+        assert await other.list_shared(status=JobStatus.FAILED) == []
+
+    @pytest.mark.asyncio
+    async def test_queued_job_can_be_cancelled_from_another_worker(self, workers):
+        owner, other = workers
+        release = asyncio.Event()
+        cancelled = []
+
+        async def blocker():
+            await release.wait()
+
+        async def never_runs():
+            raise AssertionError("job cancelado não deve correr")
+
+        running = owner.submit("uninstall", "npm", blocker)
+        queued = owner.submit("uninstall", "npm", never_runs, on_cancel=lambda: cancelled.append(True))
+        await self._wait_shared(other, running.id, "running")
+
+        assert (await other.cancel_shared(running.id))[0] is False
+        done, payload = await other.cancel_shared(queued.id)
+        assert done and payload["status"] == "cancelled"
+
+        release.set()
+        await owner.join()
+
+        assert queued.status == JobStatus.CANCELLED
+        assert cancelled == [True]
+        # A publicação do dono não sobrepõe o cancelamento.
+        assert (await other.get_shared(queued.id))[0]["status"] == "cancelled"
+
+    def test_router_serves_jobs_of_other_workers(self, workers, monkeypatch):
+        owner, other = workers
+
+        async def run():
+            return {"success": True}
+
+        async def run_on_owner():
+            job = owner.submit("uninstall", "npm", run)
+            await owner.join()
+            return job
+
+        job = asyncio.run(run_on_owner())
+        monkeypatch.setattr(jobs_module, "_job_manager", other)
+
+        with TestClient(create_app()) as client:
+            response = client.get(f"/api/jobs/{job.id}")
+            assert response.status_code == 200
+            assert response.json()["status"] == "succeeded"
+            assert response.json()["status_url"] == f"/api/jobs/{job.id}"
+
+            with client.stream("GET", f"/api/jobs/{job.id}/events") as events:
+                data = [line for line in events.iter_lines() if line.startswith("data: ")]
+            assert [json.loads(line[len("data: "):])["status"] for line in data] == ["succeeded"]
+
+            assert [item["id"] for item in client.get("/api/jobs").json()["jobs"]] == [job.id]
+            assert client.delete(f"/api/jobs/{job.id}").status_code == 409
+            assert client.get("/api/jobs/missing").status_code == 404
+
+
+def test_job_store_selected_by_configuration(monkeypatch, tmp_path):
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", tmp_path)
+    monkeypatch.setenv("JOBS_BACKEND", "sqlite")
+    store = create_job_store()
+    assert isinstance(store, SQLiteJobStore)
+    assert store.db_path == tmp_path / SQLiteJobStore.DB_NAME
+
+    monkeypatch.setenv("JOBS_BACKEND", "memory")
+    assert create_job_store() is None
+
+    monkeypatch.setenv("JOBS_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        create_job_store()
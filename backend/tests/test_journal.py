@@ -0,0 +1,247 @@
+"""Testes para o journal de operações e a retoma de mutações interrompidas."""
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Dict, List
+
+import pytest
+
+from app.adapters import BaseAdapter
+from app.core import jobs as jobs_module
+from app.core.jobs import JobManager, JobStatus
+from app.core.journal import JournalEntry, JournalError, OperationJournal
+from app.core.validation import ValidationLayer
+from app.routers import advanced as advanced_router
+
+
+@pytest.fixture(autouse=True)
+def isolated_base_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", tmp_path / ".package-audit")
+
+
+@pytest.fixture
+def journal():
+    return OperationJournal()
+
+
+def _records(path) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestOperationJournal:
+    def test_records_are_appended_in_order(self, journal):
+        entry = journal.begin("batch-uninstall", "npm", {"packages": ["a", "b"]})
+        entry.checkpoint(snapshot_id="snap-1")
+        entry.set_plan(["a", "b"])
+        entry.start_steps(["a"])
+        entry.complete_step("a", True)
+
+        types = [record["type"] for record in _records(entry.path)]
+        assert types == ["begin", "checkpoint", "plan", "start", "done"]
+        assert entry.pending_steps == ["b"]
+        assert entry.in_doubt == []
+
+    def test_claim_rebuilds_interrupted_operation(self, journal):
+        entry = journal.begin("batch-uninstall", "npm", {"packages": ["a", "b", "c"]})
+        entry.checkpoint(snapshot_id="snap-1")
+        entry.set_plan(["a", "b", "c"])
+        entry.start_steps(["a", "b"])
+        entry.complete_step("a", True)
+        entry.close()  # simula a paragem do processo
+
+        [claimed] = OperationJournal().claim_pending()
+        assert claimed.id == entry.id
+        assert claimed.kind == "batch-uninstall"
+        assert claimed.manager_id == "npm"
+        assert claimed.state == {"snapshot_id": "snap-1"}
+        assert claimed.completed == {"a": {"success": True}}
+        assert claimed.pending_steps == ["b", "c"]
+        assert claimed.in_doubt == ["b"]
+        assert claimed.resumed
+
+    def test_operation_held_by_live_owner_is_not_claimed(self, journal):
+        entry = journal.begin("rollback", "npm", {"snapshot_id": "snap-1"})
+        assert OperationJournal().claim_pending() == []
+        entry.close()
+        assert len(OperationJournal().claim_pending()) == 1
+
+    def test_finish_removes_journal(self, journal):
+        entry = journal.begin("rollback", "npm", {"snapshot_id": "snap-1"})
+        entry.finish(result={"ok": True})
+
+        assert not entry.path.exists()
+        assert journal.pending_count() == 0
+        with pytest.raises(JournalError):
+            entry.complete_step("a", True)
+
+    def test_torn_final_record_is_discarded(self, journal):
+        entry = journal.begin("batch-uninstall", "npm", {"packages": ["a"]})
+        entry.set_plan(["a"])
+        entry.close()
+        with open(entry.path, "a", encoding="utf-8") as handle:
+            handle.write('{"type":"done","step":"a","succ')
+
+        [claimed] = journal.claim_pending()
+        assert claimed.pending_steps == ["a"]
+        claimed.complete_step("a", True)
+        assert _records(entry.path)[-1]["step"] == "a"
+
+    def test_finished_but_not_removed_journal_is_cleaned_up(self, journal):
+        entry = journal.begin("rollback", "npm", {"snapshot_id": "snap-1"})
+        entry._append({"type": "end", "result": None, "error": None})
+        entry.close()
+
+        assert journal.claim_pending() == []
+        assert not entry.path.exists()
+
+
+class FakeQueue:
+    async def execute(self, operation_id, operation_type, func, *args, scope=None, **kwargs):
+        return await func(*args, **kwargs)
+
+
+class TestResume:
+    @pytest.mark.asyncio
+    async def test_resumed_batch_skips_finished_steps(self, journal, monkeypatch):
+        # "a" concluído; "b" e "c" a meio, mas só "c" chegou a ser removido.
+        installed = {"b", "d"}
+        batches: List[List[str]] = []
+
+        class ResumeAdapter(BaseAdapter):
+            manager_id = "dummy"
+            display_name = "Dummy"
+            executable_name = "dummy"
+
+            def list_packages(self):
+                return [{"name": name, "version": "1.0"} for name in sorted(installed)]
+
+            def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+                raise AssertionError("batch usa uninstall_many")
+
+            def export_manifest(self):
+                return {}
+
+            async def uninstall_many_async(self, packages, force=False):
+                batches.append(list(packages))
+                installed.difference_update(packages)
+                return {"results": [{"package": pkg, "success": True} for pkg in packages]}
+
+        class FakeSnapshotManager:
+            def get_manager_packages(self, snapshot_id, manager_id):
+                assert snapshot_id == "snap-1"
+                return [{"name": name, "version": "1.0"} for name in ("a", "b", "c", "d")]
+
+        entry = journal.begin("batch-uninstall", "dummy", {"packages": ["a", "b", "c", "d"], "force": False})
+        entry.checkpoint(snapshot_id="snap-1")
+        entry.set_plan(["a", "b", "c", "d"])
+        entry.start_steps(["a", "b", "c"])
+        entry.complete_step("a", True)
+        entry.close()
+
+        job_manager = JobManager(FakeQueue())
+        monkeypatch.setattr(jobs_module, "_job_manager", job_manager)
+        monkeypatch.setattr(advanced_router, "get_adapter_by_id", lambda mid: ResumeAdapter)
+        monkeypatch.setattr(ResumeAdapter, "detect", classmethod(lambda cls: True))
+        monkeypatch.setattr(advanced_router, "SnapshotManager", FakeSnapshotManager)
+
+        [job] = await advanced_router.resume_journaled_operations()
+        await job_manager.join()
+
+        assert job.status == JobStatus.SUCCEEDED, job.error
+        assert job.params["resumed"] is True
+        assert job.params["journal"] == entry.id
+        # "a" já estava feito e "c" foi reconciliado: só "b" e "d" correm.
+        assert batches == [["b", "d"]]
+        assert job.result["succeeded"] == ["a", "b", "c", "d"]
+        assert job.result["snapshot_id"] == "snap-1"
+        assert journal.pending_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_operation_is_abandoned(self, journal, monkeypatch):
+        entry = journal.begin("reinstall", "npm", {})
+        entry.close()
+        monkeypatch.setattr(jobs_module, "_job_manager", JobManager(FakeQueue()))
+
+        assert await advanced_router.resume_journaled_operations() == []
+        assert journal.pending_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_resumed_operation_is_not_resumed_again(self, journal, monkeypatch):
+        class IdleAdapter(BaseAdapter):
+            manager_id = "dummy"
+            display_name = "Dummy"
+            executable_name = "dummy"
+
+            def list_packages(self):
+                raise AssertionError("job cancelado não deve correr")
+
+            def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+                raise AssertionError("job cancelado não deve correr")
+
+            def export_manifest(self):
+                return {}
+
+        entry = journal.begin("rollback", "dummy", {"snapshot_id": "snap-1"})
+        entry.set_plan(["a"])
+        entry.close()
+
+        job_manager = JobManager(FakeQueue())
+        monkeypatch.setattr(jobs_module, "_job_manager", job_manager)
+        monkeypatch.setattr(advanced_router, "get_adapter_by_id", lambda mid: IdleAdapter)
+        monkeypatch.setattr(IdleAdapter, "detect", classmethod(lambda cls: True))
+
+        [job] = await advanced_router.resume_journaled_operations()
+        assert job_manager.cancel(job.id)
+        await job_manager.join()
+
+        assert job.status == JobStatus.CANCELLED
+        assert journal.pending_count() == 0
+        assert OperationJournal().claim_pending() == []
+
+    @pytest.mark.asyncio
+    async def test_journal_writes_run_off_the_event_loop(self, journal, monkeypatch):
+        installed = {"a", "b"}
+        writers: List[int] = []
+        append = JournalEntry._append
+
+        def recording_append(self, record):
+            writers.append(threading.get_ident())
+            return append(self, record)
+
+        class BatchAdapter(BaseAdapter):
+            manager_id = "dummy"
+            display_name = "Dummy"
+            executable_name = "dummy"
+
+            def list_packages(self):
+                return [{"name": name, "version": "1.0"} for name in sorted(installed)]
+
+            def uninstall(self, package: str, force: bool = False) -> Dict[str, Any]:
+                raise AssertionError("batch usa uninstall_many")
+
+            def export_manifest(self):
+                return {}
+
+            async def uninstall_many_async(self, packages, force=False):
+                installed.difference_update(packages)
+                return {"results": [{"package": pkg, "success": True} for pkg in packages]}
+
+        job_manager = JobManager(FakeQueue())
+        monkeypatch.setattr(jobs_module, "_job_manager", job_manager)
+        monkeypatch.setattr(JournalEntry, "_append", recording_append)
+
+        job = advanced_router._submit_journaled(
+            "batch-uninstall",
+            "dummy",
+            BatchAdapter(),
+            advanced_router._run_batch_uninstall,
+            {"packages": ["a", "b"], "force": False},
+        )
+        await job_manager.join()
+
+        assert job.status == JobStatus.SUCCEEDED, job.error
+        # begin, checkpoint, plan, start, done x2, end
+        assert len(writers) == 7
+        assert threading.get_ident() not in writers
+        assert journal.pending_count() == 0
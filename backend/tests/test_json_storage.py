@@ -7,7 +7,7 @@ from pathlib import Path
 import pytest
 
 from app.core.validation import PathTraversalError, ValidationLayer
-from app.storage.json_storage import JSONStorage
+from app.storage.json_storage import JSONStorage, ReadCache
 
 
 @pytest.fixture
@@ -60,3 +60,75 @@ def test_atomic_write(storage, tmp_path):
     with open(path, "r", encoding="utf-8") as handle:
         content = json.load(handle)
     assert content == data
+
+
+@pytest.fixture
+def cached_storage(tmp_path, monkeypatch):
+    base = tmp_path / ".package-audit"
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", base)
+    return JSONStorage(base_dir=base / "storage", cache=ReadCache(max_bytes=1024))
+
+
+def test_cached_read_skips_parsing(cached_storage, monkeypatch):
+    cached_storage.write("index.json", {"snapshots": []})
+    loads = []
+    original_load = json.load
+    monkeypatch.setattr(json, "load", lambda handle: loads.append(1) or original_load(handle))
+
+    assert cached_storage.read("index.json") == {"snapshots": []}
+    assert cached_storage.read("index.json") == {"snapshots": []}
+    assert loads == []
+    assert cached_storage.cache.stats()["hits"] == 2
+
+
+def test_cached_read_detects_external_changes(cached_storage):
+    cached_storage.write("data.json", {"value": 1})
+    path = cached_storage.base_dir / "data.json"
+    path.write_text('{"value": 22}')
+
+    assert cached_storage.read("data.json") == {"value": 22}
+    stats = cached_storage.cache.stats()
+    assert stats["misses"] == 1
+    assert cached_storage.read("data.json") == {"value": 22}
+    assert cached_storage.cache.stats()["hits"] == 1
+
+
+def test_delete_evicts_cached_entry(cached_storage):
+    cached_storage.write("data.json", {"value": 1})
+    cached_storage.delete("data.json")
+    assert cached_storage.cache.stats()["entries"] == 0
+    with pytest.raises(FileNotFoundError):
+        cached_storage.read("data.json")
+
+
+def test_cache_is_bounded_by_bytes(cached_storage):
+    for index in range(5):
+        cached_storage.write(f"file-{index}.json", {"payload": "x" * 300})
+
+    stats = cached_storage.cache.stats()
+    assert stats["bytes"] <= 1024
+    assert stats["entries"] == 3
+    assert stats["evictions"] == 2
+
+    # O mais antigo saiu; o mais recente continua em cache.
+    cached_storage.read("file-4.json")
+    cached_storage.read("file-0.json")
+    assert cached_storage.cache.stats()["hits"] == 1
+
+
+def test_oversized_entries_are_not_cached(cached_storage):
+    cached_storage.write("big.json", {"payload": "x" * 2048})
+    assert cached_storage.read("big.json")["payload"] == "x" * 2048
+    assert cached_storage.cache.stats()["entries"] == 0
+
+
+def test_cached_values_are_not_shared(cached_storage):
+    data = {"packages": [{"name": "react"}]}
+    cached_storage.write("inventory.json", data)
+    data["packages"].append({"name": "written-later"})
+
+    first = cached_storage.read("inventory.json")
+    first["packages"].append({"name": "mutated"})
+
+    assert cached_storage.read("inventory.json") == {"packages": [{"name": "react"}]}
+    assert cached_storage.cache.stats()["hits"] == 2
@@ -2,20 +2,20 @@
 from __future__ import annotations
 
 import json
-import time
-from datetime import datetime, timedelta
+import subprocess
+import sys
+import textwrap
+import threading
 from pathlib import Path
 
 import pytest
 
-from app.core.locking import LockManager
+from app.core.locking import GLOBAL_SCOPE, LockManager
 
 
 @pytest.fixture
 def lock_manager(tmp_path, monkeypatch):
-    lock_file = tmp_path / ".lock"
-
-    monkeypatch.setattr(LockManager, "LOCK_FILE", lock_file)
+    monkeypatch.setattr(LockManager, "LOCK_DIR", tmp_path / "locks")
     manager = LockManager()
 
     yield manager
@@ -40,33 +40,84 @@ class TestLockAcquisition:
     def test_release_without_lock(self, lock_manager):
         assert not lock_manager.release_lock()
 
-    def test_release_other_pid(self, lock_manager, monkeypatch):
-        lock_manager.acquire_lock("op:test")
-        info = lock_manager.get_lock_info()
-        info["pid"] = 99999
-        lock_manager.LOCK_FILE.write_text(json.dumps(info))
+    def test_release_lock_held_elsewhere(self, lock_manager):
+        other = LockManager()
+        assert other.acquire_lock("op:test")
         assert not lock_manager.release_lock()
-        lock_manager.force_release()
+        assert not lock_manager.release_lock(force=True)
+        assert lock_manager.is_locked()
+        other.force_release()
 
+    def test_rejects_invalid_scope(self, lock_manager):
+        with pytest.raises(ValueError):
+            lock_manager.acquire_lock("op:test", "../npm")
 
-class TestStaleLock:
-    def test_detect_stale_lock(self, lock_manager):
-        lock_manager.acquire_lock("op:test")
-        info = lock_manager.get_lock_info()
-        old = datetime.now() - timedelta(seconds=lock_manager.TIMEOUT + 10)
-        info["timestamp"] = old.isoformat()
-        lock_manager.LOCK_FILE.write_text(json.dumps(info))
-        assert lock_manager.is_stale()
-
-    def test_acquire_over_stale_lock(self, lock_manager):
-        stale_info = {
-            "operation": "old",
-            "pid": 999,
-            "timestamp": (datetime.now() - timedelta(seconds=60)).isoformat(),
-        }
-        lock_manager.LOCK_FILE.write_text(json.dumps(stale_info))
+
+class TestManagerScopes:
+    def test_different_managers_do_not_block_each_other(self, lock_manager):
+        assert lock_manager.acquire_lock("uninstall:npm:react", "npm")
+        assert lock_manager.acquire_lock("uninstall:pip:requests", "pip")
+        assert not lock_manager.acquire_lock("uninstall:npm:vue", "npm")
+
+    def test_global_lock_excludes_manager_locks(self, lock_manager):
+        assert lock_manager.acquire_lock("uninstall:npm:react", "npm")
+        assert not lock_manager.acquire_lock("cleanup:all")
+        assert lock_manager.is_locked()
+
+        lock_manager.release_lock("npm")
+        assert lock_manager.acquire_lock("cleanup:all")
+        assert not lock_manager.acquire_lock("uninstall:pip:requests", "pip")
+
+    def test_list_locks(self, lock_manager):
+        lock_manager.acquire_lock("uninstall:npm:react", "npm")
+        lock_manager.acquire_lock("uninstall:pip:requests", "pip")
+        lock_manager.release_lock("pip")
+
+        locks = lock_manager.list_locks()
+        assert list(locks) == ["npm"]
+        assert locks["npm"]["operation"] == "uninstall:npm:react"
+        assert lock_manager.get_lock_info()["scope"] == "npm"
+
+
+class TestDeadHolder:
+    def test_leftover_lock_file_is_not_a_lock(self, lock_manager):
+        lock_manager.LOCK_DIR.joinpath(f"{GLOBAL_SCOPE}.lock").write_text(
+            json.dumps({"operation": "old", "pid": 999})
+        )
+        assert not lock_manager.is_locked()
+        assert lock_manager.get_lock_info() is None
         assert lock_manager.acquire_lock("new")
 
+    def test_lock_released_when_holder_process_exits(self, lock_manager):
+        script = textwrap.dedent(
+            f"""
+            import sys
+            from pathlib import Path
+            from app.core.locking import LockManager
+            LockManager.LOCK_DIR = Path({str(lock_manager.LOCK_DIR)!r})
+            assert LockManager().acquire_lock("uninstall:npm:vue", "npm")
+            print("locked", flush=True)
+            sys.stdin.read()
+            """
+        )
+        holder = subprocess.Popen(
+            [sys.executable, "-c", script],
+            cwd=Path(__file__).resolve().parents[1],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert holder.stdout.readline().strip() == "locked"
+            assert lock_manager.is_locked("npm")
+            assert lock_manager.list_locks()["npm"]["operation"] == "uninstall:npm:vue"
+            assert not lock_manager.acquire_lock("uninstall:npm:react", "npm")
+        finally:
+            holder.kill()
+            holder.wait()
+
+        assert lock_manager.acquire_lock("uninstall:npm:react", "npm")
+
 
 class TestLockInfo:
     def test_get_lock_info(self, lock_manager):
@@ -98,6 +149,42 @@ class TestConcurrency:
         lock_manager.release_lock()
 
 
+class TestProbes:
+    def test_probes_do_not_make_concurrent_acquisitions_fail(self, lock_manager):
+        stop = threading.Event()
+        prober = LockManager()
+
+        def probe() -> None:
+            while not stop.is_set():
+                prober.is_locked("npm")
+                prober.is_locked()
+                prober.list_locks()
+
+        # Trocas de thread frequentes para que as consultas se intercalem com os acquires.
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        threads = [threading.Thread(target=probe) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        try:
+            failures = 0
+            for _ in range(1000):
+                if lock_manager.acquire_lock("uninstall:npm:react", "npm"):
+                    lock_manager.release_lock("npm")
+                else:
+                    failures += 1
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            sys.setswitchinterval(switch_interval)
+        assert failures == 0
+
+    def test_probe_does_not_create_lock_files(self, lock_manager):
+        assert not lock_manager.is_locked("pip")
+        assert not lock_manager.LOCK_DIR.joinpath("pip.lock").exists()
+
+
 class TestForceRelease:
     def test_force_release(self, lock_manager):
         lock_manager.acquire_lock("op:test")
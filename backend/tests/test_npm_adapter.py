@@ -2,13 +2,16 @@
 from __future__ import annotations
 
 import json
+import os
 import subprocess
+from pathlib import Path
 from typing import Any, Dict
 
 import pytest
 
 from app.adapters.npm import NpmAdapter
 from app.core.executor import CommandExecutionError
+from app.core.path_index import PathIndex
 from app.core.validation import InvalidPackageNameError, ValidationLayer
 
 
@@ -19,6 +22,32 @@ def patch_base_dir(tmp_path, monkeypatch):
     return base
 
 
+@pytest.fixture(autouse=True)
+def no_global_modules(tmp_path, monkeypatch):
+    """Por omissão força o caminho via subprocesso; testes diretos sobrepõem."""
+    monkeypatch.setattr(NpmAdapter, "_global_prefix", tmp_path / "no-npm")
+    monkeypatch.setattr(NpmAdapter, "_global_prefix_failed_at", None)
+    monkeypatch.setattr(NpmAdapter, "_global_modules_dir", lambda self: None)
+
+
+def _write_package(modules_dir, name, version):
+    package_dir = modules_dir / name
+    package_dir.mkdir(parents=True)
+    (package_dir / "package.json").write_text(json.dumps({"name": name, "version": version}))
+    return package_dir
+
+
+@pytest.fixture
+def global_modules(tmp_path, monkeypatch):
+    modules_dir = tmp_path / "prefix" / "lib" / "node_modules"
+    _write_package(modules_dir, "typescript", "5.4.2")
+    _write_package(modules_dir, "@angular/cli", "17.3.0")
+    (modules_dir / ".bin").mkdir()
+    (modules_dir / "no-manifest").mkdir()
+    monkeypatch.setattr(NpmAdapter, "_global_modules_dir", lambda self: modules_dir)
+    return modules_dir
+
+
 def test_list_packages_parses_dependencies(monkeypatch):
     output = {
         "dependencies": {
@@ -72,6 +101,28 @@ def test_uninstall_with_force(monkeypatch):
     assert captured["cmd"] == ["npm", "uninstall", "-g", "--force", "react"]
 
 
+@pytest.mark.asyncio
+async def test_async_methods_use_subprocess_exec(monkeypatch):
+    output = {"dependencies": {"react": {"version": "18.2.0"}}}
+    calls = []
+
+    async def fake_run_process(cmd, timeout=None, check=True, cwd=None):
+        calls.append(cmd)
+        stdout = json.dumps(output) if "list" in cmd else ""
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+
+    monkeypatch.setattr(
+        NpmAdapter, "command_executor", type("Exec", (), {"run_process": staticmethod(fake_run_process)})
+    )
+    adapter = NpmAdapter()
+    packages = await adapter.list_packages_async()
+    assert [pkg["name"] for pkg in packages] == ["react"]
+
+    result = await adapter.uninstall_async("react", force=True)
+    assert result["success"] is True
+    assert calls[-1] == ["npm", "uninstall", "-g", "--force", "react"]
+
+
 def test_uninstall_rejects_invalid_package(monkeypatch):
     adapter = NpmAdapter()
     with pytest.raises(InvalidPackageNameError):
@@ -89,3 +140,181 @@ def test_export_manifest(monkeypatch):
     manifest = adapter.export_manifest()
     assert manifest["manager"] == "npm"
     assert manifest["packages"][0]["name"] == "react"
+
+
+def test_list_packages_scans_global_modules(monkeypatch, global_modules):
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        raise AssertionError("npm não deve ser executado")
+
+    monkeypatch.setattr(NpmAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    packages = NpmAdapter().list_packages()
+    assert packages == [
+        {"name": "@angular/cli", "version": "17.3.0", "status": "unknown", "manager": "npm"},
+        {"name": "typescript", "version": "5.4.2", "status": "unknown", "manager": "npm"},
+    ]
+
+
+def test_resolve_global_prefix_from_npmrc(tmp_path, monkeypatch):
+    monkeypatch.setattr(NpmAdapter, "_global_prefix", None)
+    monkeypatch.delenv("npm_config_prefix", raising=False)
+    monkeypatch.delenv("NPM_CONFIG_PREFIX", raising=False)
+    monkeypatch.setattr("pathlib.Path.home", classmethod(lambda cls: tmp_path))
+    (tmp_path / ".npmrc").write_text("fund=false\nprefix=/opt/npm-global\n")
+
+    assert NpmAdapter._resolve_global_prefix() == Path("/opt/npm-global")
+    assert NpmAdapter._global_prefix == Path("/opt/npm-global")
+
+
+@pytest.mark.asyncio
+async def test_async_prefix_resolution_uses_subprocess_exec(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        raise AssertionError("o caminho assíncrono não deve bloquear em run()")
+
+    async def fake_run_process(cmd, timeout=None, check=True, cwd=None):
+        calls.append(cmd)
+        stdout = str(tmp_path / "prefix") if "prefix" in cmd else json.dumps({"dependencies": {}})
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+
+    monkeypatch.setattr(NpmAdapter, "_global_prefix", None)
+    monkeypatch.setattr(NpmAdapter, "_prefix_from_config", staticmethod(lambda: None))
+    monkeypatch.setattr(NpmAdapter, "_prefix_from_executable", classmethod(lambda cls: None))
+    monkeypatch.setattr(
+        NpmAdapter,
+        "command_executor",
+        type("Exec", (), {"run": staticmethod(fake_run), "run_process": staticmethod(fake_run_process)}),
+    )
+
+    await NpmAdapter().list_packages_cached_async()
+    assert calls[0] == ["npm", "prefix", "-g"]
+    assert NpmAdapter._global_prefix == tmp_path / "prefix"
+
+
+def test_failed_prefix_resolution_is_cached(monkeypatch):
+    calls = []
+
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        calls.append(cmd)
+        raise CommandExecutionError("npm: command not found")
+
+    monkeypatch.setattr(NpmAdapter, "_global_prefix", None)
+    monkeypatch.setattr(NpmAdapter, "_prefix_from_config", staticmethod(lambda: None))
+    monkeypatch.setattr(NpmAdapter, "_prefix_from_executable", classmethod(lambda cls: None))
+    monkeypatch.setattr(NpmAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+
+    assert NpmAdapter._resolve_global_prefix() is None
+    assert NpmAdapter._resolve_global_prefix() is None
+    assert len(calls) == 1
+
+    # Passado o intervalo, a resolução é tentada de novo.
+    expired = NpmAdapter._global_prefix_failed_at - NpmAdapter.PREFIX_RETRY_SECONDS
+    monkeypatch.setattr(NpmAdapter, "_global_prefix_failed_at", expired)
+    assert NpmAdapter._resolve_global_prefix() is None
+    assert len(calls) == 2
+
+
+def test_resolve_global_prefix_from_executable(tmp_path, monkeypatch):
+    prefix = tmp_path / "usr"
+    cli = prefix / "lib" / "node_modules" / "npm" / "bin" / "npm-cli.js"
+    cli.parent.mkdir(parents=True)
+    cli.write_text("")
+    (prefix / "bin").mkdir()
+    (prefix / "bin" / "npm").symlink_to(cli)
+    monkeypatch.setattr(PathIndex, "which", lambda self, _: str(prefix / "bin" / "npm"))
+
+    assert NpmAdapter._prefix_from_executable() == prefix.resolve()
+
+
+@pytest.fixture
+def hidden_lockfile(global_modules, monkeypatch):
+    monkeypatch.setattr(NpmAdapter, "_tree_cache", {})
+    _write_package(global_modules / "@angular/cli" / "node_modules", "semver", "7.6.0")
+    lockfile = {
+        "name": "lib",
+        "lockfileVersion": 3,
+        "packages": {
+            "node_modules/typescript": {"version": "5.4.2"},
+            "node_modules/@angular/cli": {
+                "version": "17.3.0",
+                "dependencies": {"semver": "^7.5.0", "typescript": "*", "gone": "^1.0.0"},
+                "optionalDependencies": {"fsevents": "^2.0.0"},
+            },
+            "node_modules/@angular/cli/node_modules/semver": {
+                "version": "7.6.0",
+                "dependencies": {"@angular/cli": "*"},
+            },
+        },
+    }
+    path = global_modules / ".package-lock.json"
+    path.write_text(json.dumps(lockfile))
+    return path
+
+
+def test_dependency_tree_from_hidden_lockfile(monkeypatch, hidden_lockfile):
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        raise AssertionError("npm não deve ser executado")
+
+    monkeypatch.setattr(NpmAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    result = NpmAdapter().get_dependency_tree()
+    assert result["supported"] is True
+
+    cli = result["tree"]["dependencies"]["@angular/cli"]
+    assert cli["version"] == "17.3.0"
+    assert cli["dependencies"]["semver"]["version"] == "7.6.0"
+    assert cli["dependencies"]["semver"]["dependencies"]["@angular/cli"]["deduped"] is True
+    assert cli["dependencies"]["typescript"] == {"version": "5.4.2"}
+    assert cli["dependencies"]["gone"] == {"required": "^1.0.0", "missing": True}
+    assert "fsevents" not in cli["dependencies"]
+    assert set(result["tree"]["dependencies"]) == {"@angular/cli", "typescript"}
+
+
+def test_dependency_tree_filters_by_package(hidden_lockfile):
+    tree = NpmAdapter().get_dependency_tree("semver")["tree"]
+    assert list(tree["dependencies"]) == ["@angular/cli"]
+
+
+def test_dependency_tree_prefers_package_json_over_stale_lockfile(global_modules, hidden_lockfile):
+    (global_modules / "typescript" / "package.json").write_text(
+        json.dumps({"name": "typescript", "version": "5.5.0"})
+    )
+    tree = NpmAdapter().get_dependency_tree()["tree"]
+    assert tree["dependencies"]["typescript"]["version"] == "5.5.0"
+
+
+def test_dependency_tree_cached_until_mtime_changes(monkeypatch, hidden_lockfile):
+    adapter = NpmAdapter()
+    first = adapter._load_global_tree()
+    assert adapter._load_global_tree() is first
+
+    stat = hidden_lockfile.stat()
+    os.utime(hidden_lockfile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert adapter._load_global_tree() is not first
+
+
+def test_dependency_tree_cache_sees_in_place_upgrades(hidden_lockfile, global_modules):
+    adapter = NpmAdapter()
+    first = adapter._load_global_tree()
+    assert first.render()["dependencies"]["typescript"]["version"] == "5.4.2"
+
+    # Reinstalação no lugar e pacote novo num scope: as mtimes dos diretórios de topo não mudam.
+    dirs = [global_modules, hidden_lockfile]
+    stats = [path.stat() for path in dirs]
+    (global_modules / "typescript" / "package.json").write_text(
+        json.dumps({"name": "typescript", "version": "5.5.0"})
+    )
+    _write_package(global_modules / "@angular", "core", "17.3.0")
+    for path, stat in zip(dirs, stats):
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    tree = adapter._load_global_tree()
+    assert tree is not first
+    dependencies = tree.render()["dependencies"]
+    assert dependencies["typescript"]["version"] == "5.5.0"
+    assert "@angular/core" in dependencies
+
+
+def test_export_lockfile_uses_hidden_lockfile(hidden_lockfile):
+    lockfile = NpmAdapter().export_lockfile()
+    assert lockfile["format"] == "npm-list-json"
+    assert "@angular/cli" in lockfile["lockfile"]["dependencies"]
@@ -1,6 +1,7 @@
 """Testes para o endpoint de uninstall de pacotes."""
 from __future__ import annotations
 
+import time
 from typing import Any, Dict
 
 import pytest
@@ -9,7 +10,8 @@ from fastapi.testclient import TestClient
 from app import adapters as adapters_module
 from app.adapters import BaseAdapter, registry
 from app.analysis.snapshot_manager import SnapshotSummary
-from app.core import queue as queue_module
+from app.core import jobs as jobs_module
+from app.core.jobs import JobManager
 from app.core.validation import ValidationLayer
 from app.main import create_app
 from app.routers import packages as packages_router
@@ -38,17 +40,27 @@ def patch_allowed_base_dir(tmp_path, monkeypatch):
 @pytest.fixture
 def client():
     app = create_app()
-    return TestClient(app)
+    # Context manager: mantém o loop ativo para os jobs correrem em segundo plano.
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _wait_for_job(client: TestClient, job_id: str, timeout: float = 5.0) -> Dict[str, Any]:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.01)
 
 
 @pytest.fixture(autouse=True)
 def stub_queue(monkeypatch):
     class FakeQueue:
-        async def execute(self, operation_id, operation_type, func, *args, **kwargs):
+        async def execute(self, operation_id, operation_type, func, *args, scope=None, **kwargs):
             return await func(*args, **kwargs)
 
-    monkeypatch.setattr(queue_module, "get_operation_queue", lambda: FakeQueue())
-    monkeypatch.setattr(packages_router, "get_operation_queue", lambda: FakeQueue())
+    monkeypatch.setattr(jobs_module, "_job_manager", JobManager(FakeQueue()))
 
 
 @pytest.fixture(autouse=True)
@@ -72,8 +84,14 @@ def test_uninstall_package_success(monkeypatch, client):
     monkeypatch.setattr(DummyAdapter, "detect", classmethod(lambda cls: True))
 
     response = client.delete("/api/managers/dummy/packages/dummy-package?force=true")
-    assert response.status_code == 200, response.text
-    body = response.json()
+    assert response.status_code == 202, response.text
+    accepted = response.json()
+    assert accepted["status_url"] == f"/api/jobs/{accepted['id']}"
+    assert accepted["operation"] == "uninstall:dummy:dummy-package"
+
+    job = _wait_for_job(client, accepted["id"])
+    assert job["status"] == "succeeded", job
+    body = job["result"]
     assert body["success"] is True
     assert body["snapshot_id"] == "snap-001"
     assert body["manager"] == "dummy"
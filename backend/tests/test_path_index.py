@@ -0,0 +1,78 @@
+"""Testes para PathIndex."""
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+
+import pytest
+
+from app.core.path_index import PathIndex
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="Testes usam bits de execução POSIX")
+
+
+def _make_executable(directory, name):
+    path = directory / name
+    path.write_text("#!/bin/sh\n")
+    path.chmod(0o755)
+    return path
+
+
+@pytest.fixture
+def path_dirs(tmp_path, monkeypatch):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    monkeypatch.setenv("PATH", os.pathsep.join([str(first), str(second)]))
+    return first, second
+
+
+def test_which_matches_shutil(path_dirs):
+    first, second = path_dirs
+    _make_executable(first, "tool")
+    _make_executable(second, "tool")
+    _make_executable(second, "other")
+    (second / "not-exec").write_text("")
+
+    index = PathIndex()
+    assert index.which("tool") == shutil.which("tool") == str(first / "tool")
+    assert index.which("other") == str(second / "other")
+    assert index.which("not-exec") is None
+    assert index.which("missing") is None
+
+
+def test_lookups_hit_index_until_directory_changes(path_dirs, monkeypatch):
+    first, _ = path_dirs
+    monkeypatch.setattr(PathIndex, "VALIDATE_INTERVAL", 0)
+    index = PathIndex()
+
+    assert index.which("tool") is None
+    assert index.which("tool") is None
+    assert index.stats()["rescans"] == 1
+    assert index.stats()["hits"] == 1
+
+    _make_executable(first, "tool")
+    stat = first.stat()
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert index.which("tool") == str(first / "tool")
+    assert index.stats()["rescans"] == 2
+
+
+def test_path_change_triggers_rescan(path_dirs, tmp_path, monkeypatch):
+    third = tmp_path / "third"
+    third.mkdir()
+    _make_executable(third, "late")
+
+    index = PathIndex()
+    assert index.which("late") is None
+    monkeypatch.setenv("PATH", str(third))
+    assert index.which("late") == str(third / "late")
+    assert index.stats()["rescans"] == 2
+
+
+def test_explicit_path_bypasses_index():
+    index = PathIndex()
+    assert index.which(sys.executable) == sys.executable
+    assert index.stats()["lookups"] == 0
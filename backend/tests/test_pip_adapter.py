@@ -19,6 +19,30 @@ def patch_base_dir(tmp_path, monkeypatch):
     return base
 
 
+@pytest.fixture(autouse=True)
+def no_site_packages(monkeypatch):
+    """Por omissão força o caminho via subprocesso; testes diretos sobrepõem."""
+    monkeypatch.setattr(PipAdapter, "_site_packages_dirs", classmethod(lambda cls: []))
+
+
+@pytest.fixture
+def site_packages(tmp_path, monkeypatch):
+    site = tmp_path / "lib" / "python3.11" / "site-packages"
+    (site / "requests-2.31.0.dist-info").mkdir(parents=True)
+    (site / "requests-2.31.0.dist-info" / "METADATA").write_text(
+        "Metadata-Version: 2.1\nName: requests\nVersion: 2.31.0\n\nLong description\n"
+    )
+    (site / "pip-24.0.dist-info").mkdir()
+    (site / "pip-24.0.dist-info" / "METADATA").write_text("Name: pip\nVersion: 24.0\n")
+    (site / "legacy_pkg-1.0.egg-info").mkdir()
+    (site / "legacy_pkg-1.0.egg-info" / "PKG-INFO").write_text("Name: legacy-pkg\nVersion: 1.0\n")
+    (site / "single-0.1.egg-info").write_text("Name: Single\nVersion: 0.1\n")
+    (site / "broken-1.0.dist-info").mkdir()
+
+    monkeypatch.setattr(PipAdapter, "_site_packages_dirs", classmethod(lambda cls: [site]))
+    return site
+
+
 def test_list_packages_parses_output(monkeypatch):
     output = [
         {"name": "requests", "version": "2.31.0"},
@@ -74,3 +98,80 @@ def test_export_manifest(monkeypatch):
     manifest = adapter.export_manifest()
     assert manifest["manager"] == "pip"
     assert manifest["packages"][0]["name"] == "numpy"
+
+
+def test_list_packages_reads_site_packages(monkeypatch, site_packages):
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        raise AssertionError("pip não deve ser executado")
+
+    monkeypatch.setattr(PipAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    packages = PipAdapter().list_packages()
+    assert {(pkg["name"], pkg["version"]) for pkg in packages} == {
+        ("requests", "2.31.0"),
+        ("pip", "24.0"),
+        ("legacy-pkg", "1.0"),
+        ("Single", "0.1"),
+    }
+    assert all(pkg["manager"] == "pip" and pkg["status"] == "unknown" for pkg in packages)
+
+
+def test_list_packages_falls_back_when_unreadable(monkeypatch, tmp_path):
+    missing = tmp_path / "missing-site-packages"
+    monkeypatch.setattr(PipAdapter, "_site_packages_dirs", classmethod(lambda cls: [missing]))
+
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps([{"name": "six", "version": "1.16.0"}]), stderr="")
+
+    monkeypatch.setattr(PipAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    assert [pkg["name"] for pkg in PipAdapter().list_packages()] == ["six"]
+
+
+def test_export_lockfile_uses_site_packages(site_packages):
+    lockfile = PipAdapter().export_lockfile()
+    assert lockfile["format"] == "requirements.txt"
+    assert lockfile["lockfile"] == "legacy-pkg==1.0\nrequests==2.31.0\nSingle==0.1\n"
+
+
+def test_discover_site_packages_from_venv(tmp_path):
+    venv = tmp_path / "venv"
+    (venv / "bin").mkdir(parents=True)
+    (venv / "pyvenv.cfg").write_text("home = /usr/bin\n")
+    site = venv / "lib" / "python3.11" / "site-packages"
+    site.mkdir(parents=True)
+    (venv / "lib" / "python3.12" / "site-packages").mkdir(parents=True)
+    pip_script = venv / "bin" / "pip"
+    pip_script.write_text(f"#!{venv}/bin/python3.11\nimport sys\n")
+
+    assert PipAdapter._discover_site_packages(pip_script) == [site]
+
+
+def test_uninstall_many_chunks_and_diffs_inventory(site_packages, monkeypatch):
+    calls = []
+
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        calls.append(cmd)
+        for name in cmd:
+            if name == "requests":
+                (site_packages / "requests-2.31.0.dist-info" / "METADATA").unlink()
+                (site_packages / "requests-2.31.0.dist-info").rmdir()
+            elif name == "single":
+                (site_packages / "single-0.1.egg-info").unlink()
+        # legacy-pkg "falha" e permanece instalado.
+        return subprocess.CompletedProcess(cmd, 1, stdout="", stderr="Cannot uninstall legacy-pkg")
+
+    monkeypatch.setattr(PipAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    monkeypatch.setattr(PipAdapter, "UNINSTALL_BATCH_SIZE", 2)
+    adapter = PipAdapter()
+    result = adapter.uninstall_many(["requests", "Legacy_Pkg", "single", "missing"])
+
+    assert calls == [
+        adapter.build_command("uninstall", "-y", "requests", "Legacy_Pkg"),
+        adapter.build_command("uninstall", "-y", "single"),
+    ]
+    assert result["success"] is False
+    assert result["results"] == [
+        {"package": "requests", "success": True},
+        {"package": "Legacy_Pkg", "success": False, "error": "Cannot uninstall legacy-pkg"},
+        {"package": "single", "success": True},
+        {"package": "missing", "success": False, "error": "Package not installed"},
+    ]
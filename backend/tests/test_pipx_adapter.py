@@ -0,0 +1,90 @@
+"""Testes para o PipxAdapter."""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+
+import pytest
+
+from app.adapters.pipx import PipxAdapter
+from app.core.validation import ValidationLayer
+
+
+@pytest.fixture(autouse=True)
+def patch_base_dir(tmp_path, monkeypatch):
+    base = tmp_path / ".package-audit"
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", base)
+    monkeypatch.setattr(PipxAdapter, "_venv_cache", {})
+    return base
+
+
+def _write_metadata(venv_dir, package, version, injected=None):
+    venv_dir.mkdir(parents=True)
+    metadata = {
+        "main_package": {"package": package, "package_version": version},
+        "injected_packages": injected or {},
+        "pipx_metadata_version": "0.5",
+    }
+    path = venv_dir / "pipx_metadata.json"
+    path.write_text(json.dumps(metadata))
+    return path
+
+
+@pytest.fixture
+def pipx_home(tmp_path, monkeypatch):
+    home = tmp_path / "pipx"
+    _write_metadata(home / "venvs" / "black", "black", "24.1.0")
+    _write_metadata(
+        home / "venvs" / "poetry",
+        "poetry",
+        "1.8.2",
+        injected={"poetry-plugin-export": {"package": "poetry-plugin-export", "package_version": "1.6.0"}},
+    )
+    (home / "venvs" / "broken").mkdir()
+    monkeypatch.setenv("PIPX_HOME", str(home))
+    return home
+
+
+def test_list_packages_reads_metadata(monkeypatch, pipx_home):
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        raise AssertionError("pipx não deve ser executado")
+
+    monkeypatch.setattr(PipxAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    packages = PipxAdapter().list_packages()
+    assert packages == [
+        {"name": "black", "version": "24.1.0", "status": "unknown", "manager": "pipx"},
+        {"name": "poetry", "version": "1.8.2", "status": "unknown", "manager": "pipx"},
+        {
+            "name": "poetry-plugin-export",
+            "version": "1.6.0",
+            "status": "unknown",
+            "manager": "pipx",
+            "injected_into": "poetry",
+        },
+    ]
+
+
+def test_venv_cache_invalidated_by_mtime(pipx_home):
+    adapter = PipxAdapter()
+    metadata_path = pipx_home / "venvs" / "black" / "pipx_metadata.json"
+    first = adapter._read_venv(metadata_path.parent)
+    assert adapter._read_venv(metadata_path.parent) is first
+
+    metadata = json.loads(metadata_path.read_text())
+    metadata["main_package"]["package_version"] = "24.2.0"
+    metadata_path.write_text(json.dumps(metadata))
+    stat = metadata_path.stat()
+    os.utime(metadata_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert adapter._read_venv(metadata_path.parent)[0]["version"] == "24.2.0"
+
+
+def test_list_packages_falls_back_without_pipx_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("PIPX_HOME", str(tmp_path / "missing"))
+    output = {"venvs": {"black": {"metadata": {"main_package": {"package": "black", "package_version": "24.1.0"}}}}}
+
+    def fake_run(cmd, timeout=None, check=True, cwd=None):
+        return subprocess.CompletedProcess(cmd, 0, stdout=json.dumps(output), stderr="")
+
+    monkeypatch.setattr(PipxAdapter, "command_executor", type("Exec", (), {"run": staticmethod(fake_run)}))
+    assert [pkg["name"] for pkg in PipxAdapter().list_packages()] == ["black"]
@@ -16,7 +16,7 @@ from app.core.queue import (
 
 @pytest.fixture
 def isolated_queue(tmp_path, monkeypatch):
-    monkeypatch.setattr(locking.LockManager, "LOCK_FILE", tmp_path / ".lock")
+    monkeypatch.setattr(locking.LockManager, "LOCK_DIR", tmp_path / "locks")
     locking._lock_manager = None  # reset singleton
     from app.core import queue as queue_module
 
@@ -78,6 +78,43 @@ async def test_mutation_serialization(isolated_queue):
     assert await task == "done"
 
 
+@pytest.mark.asyncio
+async def test_mutations_on_different_managers_run_concurrently(isolated_queue):
+    started = {"npm": asyncio.Event(), "pip": asyncio.Event()}
+    finish_event = asyncio.Event()
+
+    async def long_mutation(manager_id):
+        started[manager_id].set()
+        await finish_event.wait()
+        return manager_id
+
+    tasks = [
+        asyncio.create_task(
+            isolated_queue.execute(
+                f"mut:{manager_id}",
+                OperationType.MUTATION,
+                long_mutation,
+                manager_id,
+                scope=manager_id,
+            )
+        )
+        for manager_id in ("npm", "pip")
+    ]
+    await asyncio.gather(*(event.wait() for event in started.values()))
+
+    with pytest.raises(OperationInProgressError, match="mut:npm"):
+        await isolated_queue.execute(
+            "mut:npm:2",
+            OperationType.MUTATION,
+            long_mutation,
+            "npm",
+            scope="npm",
+        )
+
+    finish_event.set()
+    assert await asyncio.gather(*tasks) == ["npm", "pip"]
+
+
 @pytest.mark.asyncio
 async def test_mutation_releases_lock_on_error(isolated_queue):
     async def failing_mutation():
@@ -102,7 +139,7 @@ async def test_mutation_releases_lock_on_error(isolated_queue):
 
 @pytest.mark.asyncio
 async def test_get_operation_queue_singleton(tmp_path, monkeypatch):
-    monkeypatch.setattr(locking.LockManager, "LOCK_FILE", tmp_path / ".lock")
+    monkeypatch.setattr(locking.LockManager, "LOCK_DIR", tmp_path / "locks")
     locking._lock_manager = None
     from app.core import queue as queue_module
 
@@ -0,0 +1,288 @@
+"""Testes para o rate limiter de janela deslizante."""
+from __future__ import annotations
+
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core import rate_limiter as rate_limiter_module
+from app.core.rate_limiter import (
+    PATH_LIMITS,
+    PathRateLimiter,
+    RateLimiter,
+    SQLiteRateLimiter,
+    compile_route_template,
+    create_rate_limiter,
+)
+from app.core.validation import ValidationLayer
+from app.routers import advanced, discover, jobs, managers, streaming
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_020.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_limit_per_minute(clock):
+    limiter = RateLimiter(requests_per_minute=3, requests_per_hour=100, clock=clock)
+
+    results = [limiter.is_allowed("1.1.1.1", "/api/x")[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+    allowed, info = limiter.is_allowed("1.1.1.1", "/api/x")
+    assert not allowed
+    assert info["limit_type"] == "minute"
+    assert info["limit"] == 3
+    assert info["reset_at"] > clock.now
+
+    # Outros clientes não são afetados.
+    assert limiter.is_allowed("2.2.2.2", "/api/x")[0]
+
+
+def test_window_slides_instead_of_resetting(clock):
+    limiter = RateLimiter(requests_per_minute=10, requests_per_hour=1000, clock=clock)
+    bucket_start = 60 * 16_667
+    clock.now = bucket_start + 10
+    for _ in range(10):
+        assert limiter.is_allowed("ip", "/")[0]
+    clock.now = bucket_start + 50
+    assert not limiter.is_allowed("ip", "/")[0]
+
+    # A meio do bucket seguinte, metade do anterior já saiu da janela.
+    clock.now = bucket_start + 90
+    allowed = [limiter.is_allowed("ip", "/")[0] for _ in range(6)]
+    assert allowed == [True] * 5 + [False]
+
+
+def test_reset_at_matches_when_requests_are_allowed_again(clock):
+    limiter = RateLimiter(requests_per_minute=5, requests_per_hour=1000, clock=clock)
+    for _ in range(5):
+        limiter.is_allowed("ip", "/")
+    allowed, info = limiter.is_allowed("ip", "/")
+    assert not allowed
+
+    clock.now = info["reset_at"] - 2
+    assert not limiter.is_allowed("ip", "/")[0]
+    clock.now = info["reset_at"]
+    assert limiter.is_allowed("ip", "/")[0]
+
+
+def test_remaining_counts(clock):
+    limiter = RateLimiter(requests_per_minute=3, requests_per_hour=10, clock=clock)
+    _, info = limiter.is_allowed("ip", "/")
+    assert info["remaining_minute"] == 2
+    assert info["remaining_hour"] == 9
+
+
+def test_sweep_evicts_only_expired_clients(clock):
+    limiter = RateLimiter(clock=clock)
+    limiter.is_allowed("old", "/")
+    clock.now += 3 * 3600
+    limiter.is_allowed("recent", "/")
+    assert limiter.tracked_clients == 2
+
+    assert limiter.sweep() == 1
+    assert limiter.tracked_clients == 1
+    assert limiter.stats()["evicted"] == 1
+
+    # O cliente removido recomeça do zero.
+    assert limiter.is_allowed("old", "/")[1]["remaining_minute"] == limiter.requests_per_minute - 1
+
+
+def test_recent_clients_survive_sweep(clock):
+    limiter = RateLimiter(requests_per_minute=2, clock=clock)
+    limiter.is_allowed("ip", "/")
+    limiter.is_allowed("ip", "/")
+    clock.now += 60
+
+    assert limiter.sweep() == 0
+    assert not limiter.is_allowed("ip", "/")[0]
+
+
+def test_max_clients_evicts_least_recently_seen(clock):
+    limiter = RateLimiter(max_clients=2, clock=clock)
+    limiter.is_allowed("a", "/")
+    limiter.is_allowed("b", "/")
+    limiter.is_allowed("a", "/")
+    limiter.is_allowed("c", "/")
+
+    assert limiter.tracked_clients == 2
+    assert set(limiter._clients) == {"a", "c"}
+
+
+def test_sweep_covers_path_limiters(monkeypatch, clock):
+    path_limiter = PathRateLimiter()
+    monkeypatch.setattr(rate_limiter_module, "_path_rate_limiter", path_limiter)
+    monkeypatch.setattr(rate_limiter_module, "_rate_limiter", RateLimiter(clock=clock))
+
+    limiter = path_limiter.get_limiter_for_path("/api/discover")
+    limiter._clock = clock
+    limiter.is_allowed("ip", "/api/discover")
+    rate_limiter_module.get_rate_limiter().is_allowed("ip", "/")
+
+    stats = rate_limiter_module.rate_limiter_stats()
+    assert stats["limiters"] == len(path_limiter.path_limits) + 1
+    assert stats["tracked_clients"] == 2
+
+    clock.now += 3 * 3600
+    assert rate_limiter_module.sweep_rate_limiters() == 2
+    assert rate_limiter_module.rate_limiter_stats()["tracked_clients"] == 0
+
+
+@pytest.mark.parametrize(
+    ("path", "template"),
+    [
+        ("/api/advanced/npm/vulnerabilities", "/api/advanced/{manager_id}/vulnerabilities"),
+        ("/api/advanced/npm/rollback/snap-1", "/api/advanced/{manager_id}/rollback/{snapshot_id}"),
+        (
+            "/api/streaming/npm/packages/@scope/pkg/uninstall",
+            "/api/streaming/{manager_id}/packages/{package_name:path}/uninstall",
+        ),
+        ("/api/jobs/abc123", "/api/jobs/{job_id}"),
+        ("/api/managers", "/api/managers"),
+        ("/api/jobs", None),
+        ("/api/jobs/abc123/events", None),
+        ("/api/advanced/npm/dependency-tree/lodash", None),
+        ("/api/managers/npm/packages", None),
+    ],
+)
+def test_match_route(path, template):
+    assert PathRateLimiter().match_route(path) == template
+
+
+def test_each_route_template_has_its_own_limiter():
+    path_limiter = PathRateLimiter()
+    batch = path_limiter.get_limiter_for_path("/api/advanced/npm/batch-uninstall")
+    rollback = path_limiter.get_limiter_for_path("/api/advanced/npm/rollback/snap-1")
+
+    assert batch is not rollback
+    assert batch is path_limiter.get_limiter_for_path("/api/advanced/pip/batch-uninstall")
+    assert path_limiter.get_limiter_for_path("/api/snapshots") is None
+
+
+def test_compile_route_template_escapes_literals():
+    assert compile_route_template("/a.b/{x}") == r"/a\.b/[^/]+"
+
+
+def test_path_limits_reference_existing_routes():
+    route_paths = {
+        route.path
+        for module in (advanced, discover, jobs, managers, streaming)
+        for route in module.router.routes
+    }
+    assert set(PATH_LIMITS) <= route_paths
+
+
+class TestSQLiteRateLimiter:
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        return tmp_path / "ratelimit.db"
+
+    def test_counters_are_shared_between_instances(self, db_path, clock):
+        worker_a = SQLiteRateLimiter(requests_per_minute=4, clock=clock, db_path=db_path)
+        worker_b = SQLiteRateLimiter(requests_per_minute=4, clock=clock, db_path=db_path)
+
+        results = [limiter.is_allowed("ip", "/")[0] for limiter in (worker_a, worker_b) * 3]
+        assert results == [True, True, True, True, False, False]
+        assert worker_a.tracked_clients == worker_b.tracked_clients == 1
+
+    def test_limiters_with_different_names_are_independent(self, db_path, clock):
+        first = SQLiteRateLimiter(requests_per_minute=1, clock=clock, db_path=db_path, name="a")
+        second = SQLiteRateLimiter(requests_per_minute=1, clock=clock, db_path=db_path, name="b")
+
+        assert first.is_allowed("ip", "/")[0]
+        assert second.is_allowed("ip", "/")[0]
+        assert not first.is_allowed("ip", "/")[0]
+
+    def test_matches_in_memory_limiter(self, db_path, clock):
+        shared = SQLiteRateLimiter(requests_per_minute=10, clock=clock, db_path=db_path)
+        local = RateLimiter(requests_per_minute=10, clock=clock)
+        for offset in (0, 5, 30, 61, 90, 95, 200):
+            clock.now = 60 * 16_667 + offset
+            for _ in range(4):
+                assert shared.is_allowed("ip", "/") == local.is_allowed("ip", "/")
+
+    def test_sweep_deletes_expired_clients(self, db_path, clock):
+        limiter = SQLiteRateLimiter(clock=clock, db_path=db_path)
+        limiter.is_allowed("old", "/")
+        clock.now += 3 * 3600
+        limiter.is_allowed("recent", "/")
+
+        assert limiter.sweep() == 1
+        assert limiter.tracked_clients == 1
+        assert limiter.stats()["evicted"] == 1
+
+    def test_locked_database_fails_open_quickly(self, db_path, clock):
+        limiter = SQLiteRateLimiter(requests_per_minute=1, clock=clock, db_path=db_path)
+        holder = sqlite3.connect(str(db_path), isolation_level=None)
+        holder.execute("BEGIN IMMEDIATE")
+        try:
+            start = time.monotonic()
+            assert limiter.is_allowed("ip", "/") == (True, {})
+            assert time.monotonic() - start < 1.0
+        finally:
+            holder.execute("ROLLBACK")
+            holder.close()
+
+    @pytest.mark.asyncio
+    async def test_async_check_runs_off_the_event_loop(self, db_path, clock, monkeypatch):
+        limiter = SQLiteRateLimiter(requests_per_minute=1, clock=clock, db_path=db_path)
+        threads = []
+        check = limiter.is_allowed
+
+        def recording_check(client_ip, path):
+            threads.append(threading.get_ident())
+            return check(client_ip, path)
+
+        monkeypatch.setattr(limiter, "is_allowed", recording_check)
+
+        assert (await limiter.is_allowed_async("ip", "/"))[0]
+        assert not (await limiter.is_allowed_async("ip", "/"))[0]
+        assert threading.get_ident() not in threads
+
+    def test_counters_are_shared_across_processes(self, db_path):
+        backend_dir = Path(__file__).resolve().parents[1]
+        script = (
+            "import sys; from pathlib import Path; "
+            "from app.core.rate_limiter import SQLiteRateLimiter; "
+            "limiter = SQLiteRateLimiter(requests_per_minute=3, db_path=Path(sys.argv[1])); "
+            "print(sum(limiter.is_allowed('ip', '/')[0] for _ in range(2)))"
+        )
+        outputs = [
+            subprocess.run(
+                [sys.executable, "-c", script, str(db_path)],
+                cwd=backend_dir,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+            for _ in range(2)
+        ]
+        assert outputs == ["2", "1"]
+
+    def test_backend_selected_by_configuration(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", tmp_path)
+        monkeypatch.setenv("RATE_LIMIT_BACKEND", "sqlite")
+        limiter = create_rate_limiter(5, 50, name="/api/discover")
+        assert isinstance(limiter, SQLiteRateLimiter)
+        assert limiter.db_path == tmp_path / SQLiteRateLimiter.DB_NAME
+
+        monkeypatch.setenv("RATE_LIMIT_BACKEND", "memory")
+        assert type(create_rate_limiter(5, 50)) is RateLimiter
+
+        monkeypatch.setenv("RATE_LIMIT_BACKEND", "redis")
+        with pytest.raises(ValueError):
+            create_rate_limiter(5, 50)
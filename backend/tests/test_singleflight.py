@@ -0,0 +1,122 @@
+"""Testes para SingleFlight."""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.core import singleflight as singleflight_module
+from app.core.singleflight import SingleFlight, get_single_flight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    calls = []
+
+    async def list_packages():
+        calls.append(1)
+        await release.wait()
+        return ["react"]
+
+    tasks = [asyncio.create_task(flight.do("npm", "list_packages", list_packages)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*tasks) == [["react"]] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "invalidated": 0, "inflight": 0}
+
+
+@pytest.mark.asyncio
+async def test_distinct_keys_are_not_coalesced():
+    flight = SingleFlight()
+
+    async def tree(package=None):
+        await asyncio.sleep(0)
+        return package
+
+    results = await asyncio.gather(
+        flight.do("npm", "get_dependency_tree", tree, "react"),
+        flight.do("npm", "get_dependency_tree", tree, "vue"),
+        flight.do("pip", "get_dependency_tree", tree, "react"),
+    )
+
+    assert results == ["react", "vue", "react"]
+    assert flight.stats()["executed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_mutation_prevents_joining_stale_read():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    inventory = ["react", "eslint"]
+
+    async def list_packages():
+        snapshot = list(inventory)
+        started.set()
+        await release.wait()
+        return snapshot
+
+    stale = asyncio.create_task(flight.do("npm", "list_packages", list_packages))
+    await started.wait()
+
+    async with flight.mutation("npm"):
+        inventory.remove("eslint")
+
+    fresh = asyncio.create_task(flight.do("npm", "list_packages", list_packages))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await stale == ["react", "eslint"]
+    assert await fresh == ["react"]
+    stats = flight.stats()
+    assert stats["executed"] == 2
+    assert stats["coalesced"] == 0
+    assert stats["invalidated"] == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("npm list falhou")
+
+    results = await asyncio.gather(
+        flight.do("npm", "list_packages", failing),
+        flight.do("npm", "list_packages", failing),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()["executed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_execution():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def list_packages():
+        await release.wait()
+        return "ok"
+
+    first = asyncio.create_task(flight.do("npm", "list_packages", list_packages))
+    second = asyncio.create_task(flight.do("npm", "list_packages", list_packages))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    release.set()
+
+    assert await second == "ok"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+def test_get_single_flight_singleton(monkeypatch):
+    monkeypatch.setattr(singleflight_module, "_single_flight", None)
+    assert get_single_flight() is get_single_flight()
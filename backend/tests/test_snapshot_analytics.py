@@ -0,0 +1,107 @@
+"""Testes para as consultas analíticas sobre snapshots (DuckDB)."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("duckdb")
+
+from app.analysis import SnapshotManager
+from app.analysis import snapshot_analytics as analytics_module
+from app.analysis.snapshot_analytics import SnapshotAnalytics
+from app.core import rate_limiter as rate_limiter_module
+from app.core.validation import ValidationLayer
+from app.main import create_app
+
+STATES = [
+    ("2025-01-10T00:00:00+00:00", {"npm": [{"name": "react", "version": "17.0.2"}], "pip": [{"name": "requests", "version": "2.31.0"}]}),
+    ("2025-02-03T00:00:00+00:00", {"npm": [{"name": "react", "version": "18.2.0"}, {"name": "vue", "version": "3.4.0"}], "pip": [{"name": "requests", "version": "2.31.0"}]}),
+    ("2025-02-10T00:00:00+00:00", {"npm": [{"name": "react", "version": "18.3.0"}], "pip": [{"name": "requests", "version": "2.31.0"}]}),
+]
+
+
+@pytest.fixture(autouse=True)
+def patch_base_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", tmp_path / ".package-audit")
+    monkeypatch.setattr(rate_limiter_module, "_path_rate_limiter", None)
+    monkeypatch.setattr(rate_limiter_module, "_rate_limiter", None)
+    monkeypatch.setattr(analytics_module, "_snapshot_analytics", None)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = SnapshotManager()
+    for index, (created_at, state) in enumerate(STATES):
+        monkeypatch.setattr(manager, "_generate_snapshot_id", lambda i=index: f"snap-00{i}")
+        monkeypatch.setattr(manager, "_now_iso", lambda value=created_at: value)
+        manager.create_snapshot(state)
+    return manager
+
+
+def test_first_seen_and_version_history(manager):
+    analytics = SnapshotAnalytics(manager)
+
+    first = analytics.first_seen("react")
+    assert first == [
+        {
+            "manager": "npm",
+            "snapshot_id": "snap-000",
+            "first_seen": "2025-01-10T00:00:00+00:00",
+            "version": "17.0.2",
+            "last_seen": "2025-02-10T00:00:00+00:00",
+            "snapshots": 3,
+        }
+    ]
+    assert analytics.first_seen("react", manager="pip") == []
+
+    versions = [(row["version"], row["snapshots"]) for row in analytics.version_history("react")]
+    assert versions == [("17.0.2", 1), ("18.2.0", 1), ("18.3.0", 1)]
+
+
+def test_churn_counts_changes_between_consecutive_snapshots(manager):
+    analytics = SnapshotAnalytics(manager)
+
+    rows = analytics.churn(since=datetime(2025, 2, 1, tzinfo=timezone.utc))
+
+    assert rows[0] == {"manager": "npm", "snapshots": 2, "added": 1, "removed": 1, "changed": 2, "churn": 4}
+    # pip não mudou: os pares partilham o mesmo blob e não entram na comparação.
+    assert rows[1] == {"manager": "pip", "snapshots": 2, "added": 0, "removed": 0, "changed": 0, "churn": 0}
+    assert analytics.churn(since=datetime(2025, 2, 5), limit=1)[0]["churn"] == 2
+
+
+def test_refresh_is_incremental_and_follows_deletions(manager):
+    analytics = SnapshotAnalytics(manager)
+    assert analytics.refresh() == {"added": 3, "removed": 0}
+    # Blobs partilhados entre snapshots são carregados uma única vez.
+    assert analytics.stats() == {"snapshots": 3, "blobs": 4}
+    assert analytics.refresh() == {"added": 0, "removed": 0}
+
+    manager.delete_snapshot("snap-000")
+    assert analytics.first_seen("react")[0]["snapshot_id"] == "snap-001"
+    assert analytics.stats() == {"snapshots": 2, "blobs": 3}
+
+
+def test_analytics_router(manager):
+    client = TestClient(create_app())
+
+    response = client.get("/api/analytics/packages/vue/first-seen")
+    assert response.status_code == 200, response.text
+    assert response.json()["managers"][0]["snapshot_id"] == "snap-001"
+
+    response = client.get("/api/analytics/packages/react/versions", params={"manager": "npm"})
+    assert [row["version"] for row in response.json()["versions"]] == ["17.0.2", "18.2.0", "18.3.0"]
+
+    response = client.get("/api/analytics/churn", params={"since": "2025-01-01T00:00:00Z"})
+    assert [row["manager"] for row in response.json()["managers"]] == ["npm", "pip"]
+
+    assert client.get("/api/analytics/packages/missing/first-seen").status_code == 404
+    assert client.get("/api/analytics/packages/react/versions", params={"manager": "BAD MANAGER"}).status_code == 400
+
+
+def test_router_reports_missing_duckdb(monkeypatch):
+    monkeypatch.setattr(analytics_module, "duckdb", None)
+    client = TestClient(create_app())
+
+    assert client.get("/api/analytics/churn").status_code == 503
@@ -0,0 +1,129 @@
+"""Testes para o motor de diff de snapshots."""
+from __future__ import annotations
+
+import pytest
+
+from app.analysis.snapshot_diff import compare_versions, diff_packages, iter_diff, version_key
+
+
+def test_version_key_orders_naturally():
+    assert version_key("1.10.0") > version_key("1.9.3")
+    assert version_key("1.0.0") > version_key("1.0.0rc1")
+    assert version_key("1.0.1") > version_key("1.0")
+    assert version_key("3.10.1_1") > version_key("3.10.1")
+
+
+@pytest.mark.parametrize(
+    ("old", "new"),
+    [
+        ("1.0", "1.0.post1"),
+        ("1.0.dev1", "1.0a1"),
+        ("1.0a1", "1.0b2"),
+        ("1.0rc1", "1.0"),
+        ("1.0.post1", "1.1.dev0"),
+        ("2.0", "2.0.1"),
+    ],
+)
+def test_pip_versions_follow_pep440(old, new):
+    assert compare_versions(old, new, "pip") == 1
+    assert compare_versions(new, old, "pipx") == -1
+
+
+def test_pip_falls_back_for_invalid_versions():
+    assert compare_versions("1.0", "1.0", "pip") == 0
+    assert compare_versions("1.0.0", "1.0", "pip") == 0  # iguais segundo a PEP 440
+    assert compare_versions("2023-01", "2023-02", "pip") == 1
+    assert compare_versions(None, "1.0", "pip") == 1
+
+
+def test_diff_packages_uses_manager_version_rules():
+    before = [{"name": "black", "version": "24.1.0"}]
+    after = [{"name": "black", "version": "24.1.0.post1"}]
+
+    assert next(diff_packages(before, after, "pip"))["change"] == "upgraded"
+
+
+def test_diff_packages_classifies_changes():
+    before = [
+        {"name": "react", "version": "18.2.0"},
+        {"name": "eslint", "version": "9.0.0"},
+        {"name": "left-pad", "version": "1.0.0"},
+        {"name": "same", "version": "1.0.0"},
+        {"name": "retagged", "version": "1.0"},
+    ]
+    after = [
+        {"name": "react", "version": "18.10.0"},
+        {"name": "eslint", "version": "8.57.0"},
+        {"name": "same", "version": "1.0.0"},
+        {"name": "typescript", "version": "5.4.2"},
+        {"name": "retagged", "version": "1-0"},
+    ]
+
+    changes = {change["name"]: change for change in diff_packages(before, after)}
+
+    assert changes["react"]["change"] == "upgraded"
+    assert changes["eslint"]["change"] == "downgraded"
+    assert changes["left-pad"] == {"name": "left-pad", "change": "removed", "before": "1.0.0", "after": None}
+    assert changes["typescript"] == {"name": "typescript", "change": "added", "before": None, "after": "5.4.2"}
+    assert changes["retagged"]["change"] == "changed"
+    assert "same" not in changes
+
+
+def test_diff_packages_keeps_injected_packages_apart():
+    before = [
+        {"name": "black", "version": "24.1.0"},
+        {"name": "black", "version": "23.0.0", "injected_into": "poetry"},
+    ]
+    after = [
+        {"name": "black", "version": "24.1.0"},
+        {"name": "black", "version": "24.0.0", "injected_into": "poetry"},
+        {"name": "black", "version": "24.0.0", "injected_into": "hatch"},
+    ]
+
+    changes = list(diff_packages(before, after))
+
+    assert changes == [
+        {"name": "black", "change": "upgraded", "before": "23.0.0", "after": "24.0.0", "injected_into": "poetry"},
+        {"name": "black", "change": "added", "before": None, "after": "24.0.0", "injected_into": "hatch"},
+    ]
+
+
+def test_diff_packages_consumes_after_lazily():
+    consumed = []
+
+    def after():
+        for index in range(3):
+            consumed.append(index)
+            yield {"name": f"pkg-{index}", "version": "1.0"}
+
+    changes = diff_packages([], after())
+    assert next(changes)["name"] == "pkg-0"
+    assert consumed == [0]
+
+
+def test_iter_diff_emits_summaries_and_errors():
+    snapshots = {
+        "npm": ([{"name": "a", "version": "1"}], [{"name": "a", "version": "2"}, {"name": "b", "version": "1"}]),
+    }
+
+    def load_before(manager_id):
+        return snapshots[manager_id][0]
+
+    def load_after(manager_id):
+        if manager_id not in snapshots:
+            raise LookupError(f"Manager {manager_id} not available.")
+        return snapshots[manager_id][1]
+
+    records = list(iter_diff(["npm", "brew"], load_before, load_after))
+
+    assert [record["type"] for record in records] == ["change", "change", "summary", "error"]
+    assert records[2] == {
+        "type": "summary",
+        "manager": "npm",
+        "added": 1,
+        "removed": 0,
+        "upgraded": 1,
+        "downgraded": 0,
+        "changed": 0,
+    }
+    assert records[3]["manager"] == "brew"
@@ -1,6 +1,11 @@
 """Testes para SnapshotManager."""
 from __future__ import annotations
 
+import hashlib
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 
 from app.analysis.snapshot_manager import SnapshotManager
@@ -91,3 +96,213 @@ def test_restore_snapshot_returns_record(monkeypatch):
 
     restored = manager.restore_snapshot("snap-restore")
     assert restored["managers"]["npm"][0]["name"] == "react"
+
+
+def _create(manager, monkeypatch, snapshot_id, created_at, package_map=None):
+    monkeypatch.setattr(manager, "_generate_snapshot_id", lambda: snapshot_id)
+    monkeypatch.setattr(manager, "_now_iso", lambda: created_at)
+    return manager.create_snapshot(package_map or {"npm": [{"name": "react"}]})
+
+
+def test_list_snapshots_reads_only_index(monkeypatch):
+    manager = SnapshotManager()
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00")
+    _create(manager, monkeypatch, "snap-002", "2025-01-01T00:00:01+00:00")
+
+    reads = []
+    original_read = manager.storage.read
+    monkeypatch.setattr(manager.storage, "read", lambda name: reads.append(name) or original_read(name))
+
+    summaries = manager.list_snapshots()
+    assert [s.id for s in summaries] == ["snap-002", "snap-001"]
+    assert summaries[0].size == manager.storage.base_dir.joinpath("snap-002.json").stat().st_size
+    assert reads == [SnapshotManager.INDEX_FILE]
+
+
+def test_delete_snapshot_updates_index(monkeypatch):
+    manager = SnapshotManager()
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00")
+    _create(manager, monkeypatch, "snap-002", "2025-01-01T00:00:01+00:00")
+
+    assert manager.delete_snapshot("snap-001") is True
+    index = manager.storage.read(SnapshotManager.INDEX_FILE)
+    assert [entry["id"] for entry in index["snapshots"]] == ["snap-002"]
+    assert manager.delete_snapshot("snap-001") is False
+
+
+@pytest.mark.parametrize("corruption", ["missing", "invalid-json", "wrong-shape"])
+def test_index_rebuilt_when_missing_or_corrupt(monkeypatch, corruption):
+    manager = SnapshotManager()
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00")
+    _create(manager, monkeypatch, "snap-002", "2025-01-01T00:00:01+00:00", {"pip": [], "npm": []})
+
+    index_path = manager.storage.base_dir / SnapshotManager.INDEX_FILE
+    if corruption == "missing":
+        index_path.unlink()
+    elif corruption == "invalid-json":
+        index_path.write_text("{not json")
+    else:
+        index_path.write_text('{"version": 1, "snapshots": [{"id": "x"}]}')
+    (manager.storage.base_dir / "garbage.json").write_text("[]")
+
+    summaries = SnapshotManager().list_snapshots()
+    assert [s.id for s in summaries] == ["snap-002", "snap-001"]
+    assert summaries[0].managers == ["npm", "pip"]
+    assert manager.storage.read(SnapshotManager.INDEX_FILE)["version"] == SnapshotManager.INDEX_VERSION
+
+
+def _blob_files(manager):
+    return sorted(path.name for path in (manager.storage.base_dir / SnapshotManager.BLOB_DIR).iterdir())
+
+
+def test_identical_package_lists_share_blob(monkeypatch):
+    manager = SnapshotManager()
+    packages = {"npm": [{"name": "react"}], "pip": [{"name": "requests"}]}
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00", packages)
+    _create(manager, monkeypatch, "snap-002", "2025-01-01T00:00:01+00:00", {"npm": [{"name": "react"}], "pip": []})
+
+    assert len(_blob_files(manager)) == 3
+    manifest = manager.storage.read("snap-002.json")
+    assert "managers" not in manifest
+    assert manifest["blobs"]["npm"] == manager.storage.read("snap-001.json")["blobs"]["npm"]
+    assert manager.get_snapshot("snap-002")["managers"] == {"npm": [{"name": "react"}], "pip": []}
+
+
+def test_retention_collects_unreferenced_blobs(monkeypatch):
+    manager = SnapshotManager()
+    manager.RETENTION_LIMIT = 1
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00", {"npm": [{"name": "old"}]})
+    _create(manager, monkeypatch, "snap-002", "2025-01-01T00:00:01+00:00", {"npm": [{"name": "new"}]})
+
+    assert [s.id for s in manager.list_snapshots()] == ["snap-002"]
+    assert _blob_files(manager) == [f"{manager.storage.read('snap-002.json')['blobs']['npm']}.z"]
+
+
+def test_blob_collection_rereads_index_under_lock(monkeypatch):
+    manager = SnapshotManager()
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00")
+    [digest] = manager.get_blob_refs()["snap-001"].values()
+
+    with pytest.raises(RuntimeError):
+        manager._collect_blobs([digest], {})
+
+    # Vista desatualizada sem referências: o índice no disco ainda usa o blob.
+    with manager._index_lock():
+        manager._collect_blobs([digest], {})
+    assert len(_blob_files(manager)) == 1
+    assert manager.get_manager_packages("snap-001", "npm") == [{"name": "react"}]
+
+
+def test_delete_keeps_blobs_still_referenced(monkeypatch):
+    manager = SnapshotManager()
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00")
+    _create(manager, monkeypatch, "snap-002", "2025-01-01T00:00:01+00:00")
+
+    manager.delete_snapshot("snap-001")
+    assert len(_blob_files(manager)) == 1
+    manager.delete_snapshot("snap-002")
+    assert _blob_files(manager) == []
+
+
+def test_legacy_inline_snapshot_still_readable(monkeypatch):
+    manager = SnapshotManager()
+    manager.storage.write(
+        "snap-legacy.json",
+        {
+            "id": "snap-legacy",
+            "created_at": "2024-12-31T00:00:00+00:00",
+            "package_count": 1,
+            "managers": {"npm": [{"name": "react"}]},
+            "metadata": {},
+        },
+    )
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00")
+
+    assert [s.id for s in manager.list_snapshots()] == ["snap-001", "snap-legacy"]
+    assert manager.get_snapshot("snap-legacy")["managers"]["npm"][0]["name"] == "react"
+    assert manager.list_snapshots()[1].managers == ["npm"]
+
+
+def test_rebuild_removes_orphan_blobs(monkeypatch):
+    manager = SnapshotManager()
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00")
+    manager.storage.write(f"{SnapshotManager.BLOB_DIR}/{'0' * 64}.json", [])
+
+    manager.rebuild_index()
+    assert len(_blob_files(manager)) == 1
+
+
+def test_get_snapshot_reads_only_requested_sections(monkeypatch):
+    manager = SnapshotManager()
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00", {"npm": [{"name": "react"}], "pip": []})
+
+    reads = []
+    original_read_bytes = manager.storage.read_bytes
+    monkeypatch.setattr(manager.storage, "read_bytes", lambda name: reads.append(name) or original_read_bytes(name))
+
+    record = manager.get_snapshot("snap-001", managers=["npm"])
+    assert record["managers"] == {"npm": [{"name": "react"}]}
+    assert len(reads) == 1
+
+
+def test_get_manager_packages_distinguishes_missing_section(monkeypatch):
+    manager = SnapshotManager()
+    _create(manager, monkeypatch, "snap-001", "2025-01-01T00:00:00+00:00", {"npm": [{"name": "react"}], "pip": []})
+
+    assert manager.get_manager_packages("snap-001", "npm") == [{"name": "react"}]
+    assert manager.get_manager_packages("snap-001", "pip") == []
+    assert manager.get_manager_packages("snap-001", "brew") is None
+
+
+def test_migrate_converts_legacy_snapshots_and_blobs(monkeypatch):
+    manager = SnapshotManager()
+    manager.storage.write(
+        "snap-legacy.json",
+        {
+            "id": "snap-legacy",
+            "created_at": "2024-12-31T00:00:00+00:00",
+            "package_count": 1,
+            "managers": {"npm": [{"name": "react"}]},
+            "metadata": {"reason": "pre-uninstall"},
+        },
+    )
+    packages = [{"name": "requests"}]
+    digest = hashlib.sha256(SnapshotManager._canonical(packages)).hexdigest()
+    manager.storage.write(f"{SnapshotManager.BLOB_DIR}/{digest}.json", packages)
+    manager.storage.write(
+        "snap-json-blob.json",
+        {"id": "snap-json-blob", "created_at": "2025-01-01T00:00:00+00:00", "package_count": 1, "blobs": {"pip": digest}},
+    )
+    assert manager.get_snapshot("snap-json-blob")["managers"]["pip"] == packages
+
+    assert manager.migrate() == {"snapshots": 1, "blobs": 1}
+    assert manager.migrate() == {"snapshots": 0, "blobs": 0}
+
+    assert "blobs" in manager.storage.read("snap-legacy.json")
+    assert all(name.endswith(".z") for name in _blob_files(manager))
+    assert manager.get_snapshot("snap-legacy")["managers"] == {"npm": [{"name": "react"}]}
+    assert manager.get_snapshot("snap-legacy")["metadata"] == {"reason": "pre-uninstall"}
+    assert manager.get_snapshot("snap-json-blob")["managers"]["pip"] == packages
+    assert [s.id for s in manager.list_snapshots()] == ["snap-json-blob", "snap-legacy"]
+
+
+def test_index_updates_are_serialized_across_processes(patch_base_dir):
+    backend_dir = Path(__file__).resolve().parents[1]
+    script = (
+        "import sys; from pathlib import Path; "
+        "from app.core.validation import ValidationLayer; "
+        "ValidationLayer.ALLOWED_BASE_DIR = Path(sys.argv[1]); "
+        "from app.analysis.snapshot_manager import SnapshotManager; "
+        "manager = SnapshotManager(); "
+        "[manager.create_snapshot({'npm': [{'name': f'pkg-{sys.argv[2]}-{i}'}]}) for i in range(5)]"
+    )
+    workers = [
+        subprocess.Popen([sys.executable, "-c", script, str(patch_base_dir), str(worker)], cwd=backend_dir)
+        for worker in range(4)
+    ]
+    assert [worker.wait(timeout=60) for worker in workers] == [0] * 4
+
+    manager = SnapshotManager()
+    summaries, refs = manager._load_index()
+    assert len(summaries) == len(refs) == 20
+    assert len(_blob_files(manager)) == 20
@@ -0,0 +1,116 @@
+"""Testes para o endpoint de diff de snapshots."""
+from __future__ import annotations
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.adapters import BaseAdapter
+from app.adapters import registry
+from app.analysis import SnapshotManager
+from app.core import rate_limiter as rate_limiter_module
+from app.core.validation import ValidationLayer
+from app.main import create_app
+
+
+class LiveAdapter(BaseAdapter):
+    manager_id = "npm"
+    display_name = "npm"
+    executable_name = "npm"
+
+    def list_packages(self):
+        return [{"name": "react", "version": "19.0.0"}]
+
+    def uninstall(self, package, force=False):
+        return {}
+
+    def export_manifest(self):
+        return {}
+
+
+@pytest.fixture(autouse=True)
+def patch_base_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", tmp_path / ".package-audit")
+    monkeypatch.setattr(rate_limiter_module, "_path_rate_limiter", None)
+    monkeypatch.setattr(rate_limiter_module, "_rate_limiter", None)
+
+
+@pytest.fixture
+def client():
+    return TestClient(create_app())
+
+
+@pytest.fixture
+def snapshots(monkeypatch):
+    manager = SnapshotManager()
+    ids = []
+    states = [
+        {"npm": [{"name": "react", "version": "18.2.0"}, {"name": "eslint", "version": "9.0.0"}]},
+        {"npm": [{"name": "react", "version": "18.3.0"}], "pip": [{"name": "requests", "version": "2.31.0"}]},
+    ]
+    for index, state in enumerate(states):
+        monkeypatch.setattr(manager, "_generate_snapshot_id", lambda i=index: f"snap-00{i}")
+        monkeypatch.setattr(manager, "_now_iso", lambda i=index: f"2025-01-01T00:00:0{i}+00:00")
+        ids.append(manager.create_snapshot(state).id)
+    return ids
+
+
+def _records(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_diff_between_snapshots_streams_ndjson(client, snapshots):
+    response = client.get("/api/snapshots/diff", params={"from": snapshots[0], "to": snapshots[1]})
+
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = _records(response)
+    assert records[0] == {"type": "diff", "from": "snap-000", "to": "snap-001", "managers": ["npm", "pip"]}
+    changes = {(r["manager"], r["name"]): r["change"] for r in records if r["type"] == "change"}
+    assert changes == {
+        ("npm", "react"): "upgraded",
+        ("npm", "eslint"): "removed",
+        ("pip", "requests"): "added",
+    }
+    assert [r["manager"] for r in records if r["type"] == "summary"] == ["npm", "pip"]
+
+
+def test_diff_against_live_inventory(client, snapshots, monkeypatch):
+    monkeypatch.setattr(registry, "get_adapter_by_id", lambda mid: LiveAdapter if mid == "npm" else None)
+    monkeypatch.setattr(LiveAdapter, "detect", classmethod(lambda cls: True))
+
+    response = client.get("/api/snapshots/diff", params={"from": snapshots[1]})
+
+    records = _records(response)
+    assert records[0]["to"] == "live"
+    assert {
+        "type": "change",
+        "manager": "npm",
+        "name": "react",
+        "change": "upgraded",
+        "before": "18.3.0",
+        "after": "19.0.0",
+    } in records
+    assert {"type": "error", "manager": "pip", "error": "Manager pip not available."} in records
+
+
+def test_diff_filters_managers(client, snapshots):
+    response = client.get(
+        "/api/snapshots/diff",
+        params={"from": snapshots[0], "to": snapshots[1], "manager": ["pip"]},
+    )
+    records = _records(response)
+    assert {r["manager"] for r in records[1:]} == {"pip"}
+
+
+def test_diff_unknown_snapshot_returns_404(client, snapshots):
+    response = client.get("/api/snapshots/diff", params={"from": "missing", "to": snapshots[1]})
+    assert response.status_code == 404
+    response = client.get("/api/snapshots/diff", params={"from": snapshots[0], "to": "missing"})
+    assert response.status_code == 404
+
+
+def test_diff_rejects_invalid_manager(client, snapshots):
+    response = client.get("/api/snapshots/diff", params={"from": snapshots[0], "manager": "BAD MANAGER"})
+    assert response.status_code == 400
@@ -0,0 +1,146 @@
+"""Testes para SQLiteStorage e seleção do backend de armazenamento."""
+from __future__ import annotations
+
+import json
+import sqlite3
+
+import pytest
+
+from app.analysis.snapshot_manager import SnapshotManager
+from app.core.validation import PathTraversalError, ValidationLayer
+from app.storage import JSONStorage, SQLiteStorage, create_storage
+from app.storage.json_storage import ReadCache
+from app.storage.sqlite_storage import migrate_json_tree
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    base = tmp_path / ".package-audit"
+    monkeypatch.setattr(ValidationLayer, "ALLOWED_BASE_DIR", base)
+    return base
+
+
+@pytest.fixture
+def storage(base):
+    return SQLiteStorage(base_dir=base / "storage")
+
+
+def test_write_read_and_delete(storage):
+    data = {"name": "snapshot", "packages": ["a", "b"]}
+    path = storage.write("managers/npm.json", data)
+
+    assert path == storage.base_dir / "managers/npm.json"
+    assert storage.read("managers/npm.json") == data
+    assert storage.exists("managers/npm.json")
+    assert storage.size("managers/npm.json") == len(json.dumps(data, separators=(",", ":")))
+    assert storage.delete("managers/npm.json")
+    assert not storage.exists("managers/npm.json")
+    assert not storage.delete("managers/npm.json")
+    with pytest.raises(FileNotFoundError):
+        storage.read("managers/npm.json")
+
+
+def test_bytes_roundtrip(storage):
+    storage.write_bytes("blobs/abc.z", b"\x00\x01binary")
+    assert storage.read_bytes("blobs/abc.z") == b"\x00\x01binary"
+
+
+def test_rejects_path_traversal(storage):
+    with pytest.raises(PathTraversalError):
+        storage.write("../escape.json", {"bad": True})
+    with pytest.raises(PathTraversalError):
+        storage.read("/etc/passwd")
+
+
+def test_list_names_returns_direct_children(storage):
+    storage.write("a.json", {})
+    storage.write("b.json", {})
+    storage.write_bytes("blobs/x.z", b"")
+    storage.write_bytes("blobs/y.json", b"{}")
+    storage.write_bytes("blobs/nested/z.z", b"")
+
+    assert storage.list_names(suffix=".json") == ["a.json", "b.json"]
+    assert storage.list_names("blobs", ".z") == ["blobs/x.z"]
+    assert storage.list_names("blobs") == ["blobs/x.z", "blobs/y.json"]
+
+
+def test_namespaces_are_isolated(base):
+    first = SQLiteStorage(base_dir=base / "storage")
+    second = SQLiteStorage(base_dir=base / "snapshots")
+    first.write("index.json", {"owner": "storage"})
+
+    assert not second.exists("index.json")
+    assert (base / SQLiteStorage.DB_NAME).exists()
+
+
+def test_batch_rolls_back_on_error(storage):
+    storage.write("kept.json", {"v": 1})
+    with pytest.raises(RuntimeError):
+        with storage.batch():
+            storage.write("kept.json", {"v": 2})
+            with storage.batch():
+                storage.write("new.json", {"v": 1})
+            raise RuntimeError("falha a meio")
+
+    assert storage.read("kept.json") == {"v": 1}
+    assert not storage.exists("new.json")
+
+
+def test_database_uses_wal(storage):
+    conn = sqlite3.connect(storage.db_path)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+
+
+def test_cached_read_sees_new_writes(base):
+    storage = SQLiteStorage(base_dir=base / "storage", cache=ReadCache())
+    storage.write("versions.json", {"v": 1})
+    assert storage.read("versions.json") == {"v": 1}
+    assert storage.read("versions.json") == {"v": 1}
+    assert storage.cache.stats()["hits"] == 1
+
+    storage.write("versions.json", {"v": 2})
+    assert storage.read("versions.json") == {"v": 2}
+
+
+def test_snapshot_manager_on_sqlite(base):
+    manager = SnapshotManager(storage=SQLiteStorage(base_dir=base / "snapshots"))
+    first = manager.create_snapshot({"npm": [{"name": "react", "version": "18.0.0"}]})
+    second = manager.create_snapshot({"npm": [{"name": "react", "version": "18.0.0"}]})
+
+    assert first.size > 0
+    assert [item.id for item in manager.rebuild_index()] == [second.id, first.id]
+    assert manager.get_manager_packages(first.id, "npm") == [{"name": "react", "version": "18.0.0"}]
+    assert len(manager.storage.list_names(SnapshotManager.BLOB_DIR)) == 1
+
+    assert manager.delete_snapshot(first.id)
+    assert manager.delete_snapshot(second.id)
+    assert manager.storage.list_names(SnapshotManager.BLOB_DIR) == []
+
+
+def test_migrate_json_tree_imports_existing_files(base):
+    snapshots = SnapshotManager(storage=JSONStorage(base_dir=base / "snapshots"))
+    summary = snapshots.create_snapshot({"pip": [{"name": "requests", "version": "2.31.0"}]})
+    JSONStorage(base_dir=base / "storage").write("versions.json", {"npm": "10.0.0"})
+
+    result = migrate_json_tree()
+
+    assert result == {"storage": 1, "snapshots": 3}
+    migrated = SnapshotManager(storage=SQLiteStorage(base_dir=base / "snapshots"))
+    assert [item.id for item in migrated.list_snapshots()] == [summary.id]
+    assert migrated.get_manager_packages(summary.id, "pip")[0]["name"] == "requests"
+    assert SQLiteStorage(base_dir=base / "storage").read("versions.json") == {"npm": "10.0.0"}
+
+
+def test_create_storage_follows_env(base, monkeypatch):
+    monkeypatch.delenv("STORAGE_BACKEND", raising=False)
+    assert isinstance(create_storage(base_dir=base / "storage"), JSONStorage)
+
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    assert isinstance(create_storage(base_dir=base / "storage"), SQLiteStorage)
+
+    monkeypatch.setenv("STORAGE_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        create_storage(base_dir=base / "storage")
@@ -2,8 +2,9 @@
 from __future__ import annotations
 
 import sys
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import typer
 from rich import print as rprint
@@ -14,8 +15,9 @@ from rich.table import Table
 backend_path = Path(__file__).resolve().parents[2] / "backend"
 sys.path.insert(0, str(backend_path))
 
-from app.adapters import get_registered_adapters
-from app.adapters.base import BaseAdapter
+from app.adapters import discover_managers_sync, get_registered_adapters, load_live_packages
+from app.analysis import SnapshotManager, iter_diff
+from app.core.validation import InvalidPackageNameError, ValidationLayer
 
 app = typer.Typer(
     name="audit-cli",
@@ -32,12 +34,7 @@ def discover() -> None:
     """
     console.print("\n🔍 [bold cyan]Discovering package managers...[/bold cyan]\n")
 
-    adapters = get_registered_adapters()
-    detected: list[BaseAdapter] = []
-
-    for adapter_cls in adapters:
-        if adapter_cls.detect():
-            detected.append(adapter_cls)
+    detected = discover_managers_sync(get_registered_adapters())
 
     if not detected:
         console.print(
@@ -53,12 +50,11 @@ def discover() -> None:
     table.add_column("Version", style="green")
     table.add_column("Status", style="bold green")
 
-    for adapter in detected:
-        version = adapter.get_version() or "unknown"
+    for item in detected:
         table.add_row(
-            adapter.manager_id,
-            adapter.display_name,
-            version,
+            item.adapter.manager_id,
+            item.adapter.display_name,
+            item.version or "unknown",
             "✓ Active",
         )
 
@@ -104,7 +100,7 @@ def list_packages(
     # List packages
     try:
         adapter = adapter_cls()
-        packages = adapter.list_packages()
+        packages = adapter.list_packages_cached()
 
         if not packages:
             console.print("[yellow]No packages found.[/yellow]\n")
@@ -174,6 +170,195 @@ def uninstall(
         raise typer.Exit(code=1)
 
 
+@app.command()
+def migrate_snapshots() -> None:
+    """
+    Convert legacy JSON snapshots to the compressed snapshot format.
+    """
+    console.print("\n🗜️  [bold cyan]Migrating snapshots...[/bold cyan]\n")
+
+    try:
+        result = SnapshotManager().migrate()
+    except Exception as e:
+        console.print(f"[red]✗ Error:[/red] {e}\n")
+        raise typer.Exit(code=1)
+
+    console.print(
+        f"[green]✓[/green] Converted [bold]{result['snapshots']}[/bold] snapshot(s) "
+        f"and [bold]{result['blobs']}[/bold] blob(s)\n"
+    )
+
+
+@app.command()
+def migrate_storage() -> None:
+    """
+    Import the JSON storage tree into the SQLite storage backend.
+    """
+    from app.storage.sqlite_storage import migrate_json_tree
+
+    console.print("\n🗄️  [bold cyan]Migrating storage to SQLite...[/bold cyan]\n")
+
+    try:
+        result = migrate_json_tree()
+    except Exception as e:
+        console.print(f"[red]✗ Error:[/red] {e}\n")
+        raise typer.Exit(code=1)
+
+    for namespace, count in result.items():
+        console.print(f"[green]✓[/green] {namespace}: [bold]{count}[/bold] entr{'y' if count == 1 else 'ies'}")
+    console.print("\nSet [bold]STORAGE_BACKEND=sqlite[/bold] to use the migrated database.\n")
+
+
+@app.command()
+def diff_snapshots(
+    from_id: str = typer.Argument(..., help="Snapshot to compare from"),
+    to_id: Optional[str] = typer.Argument(
+        None, help="Snapshot to compare to (defaults to the live inventory)"
+    ),
+    manager: Optional[List[str]] = typer.Option(
+        None, "--manager", "-m", help="Restrict the diff to these managers"
+    ),
+) -> None:
+    """
+    Show packages added, removed, upgraded or downgraded between two states.
+    """
+    try:
+        requested = [ValidationLayer.sanitize_manager_id(item) for item in manager or []]
+    except InvalidPackageNameError as e:
+        console.print(f"[red]✗ Error:[/red] {e}\n")
+        raise typer.Exit(code=1)
+
+    snapshot_manager = SnapshotManager()
+    source = snapshot_manager.get_summary(from_id)
+    if source is None:
+        console.print(f"[red]✗[/red] Snapshot '{from_id}' not found.\n")
+        raise typer.Exit(code=1)
+
+    managers = set(source.managers)
+    if to_id is None:
+        load_after = load_live_packages
+    else:
+        target = snapshot_manager.get_summary(to_id)
+        if target is None:
+            console.print(f"[red]✗[/red] Snapshot '{to_id}' not found.\n")
+            raise typer.Exit(code=1)
+        managers.update(target.managers)
+
+        def load_after(manager_id: str):
+            return snapshot_manager.get_manager_packages(to_id, manager_id)
+
+    if requested:
+        managers = set(requested)
+
+    console.print(
+        f"\n🔎 [bold cyan]Diff {from_id} → {to_id or 'live'}[/bold cyan]\n"
+    )
+
+    styles = {
+        "added": "green",
+        "removed": "red",
+        "upgraded": "cyan",
+        "downgraded": "yellow",
+        "changed": "magenta",
+    }
+    # Linhas impressas à medida que o diff é gerado (sem montar tabela em memória).
+    for record in iter_diff(
+        sorted(managers),
+        lambda manager_id: snapshot_manager.get_manager_packages(from_id, manager_id),
+        load_after,
+    ):
+        if record["type"] == "change":
+            style = styles[record["change"]]
+            console.print(
+                f"[{style}]{record['change']:>10}[/{style}]  {record['manager']}:{record['name']}  "
+                f"{record['before'] or '-'} → {record['after'] or '-'}"
+            )
+        elif record["type"] == "summary":
+            counts = ", ".join(f"{key} {record[key]}" for key in styles)
+            console.print(f"[bold]{record['manager']}[/bold]: {counts}\n")
+        else:
+            console.print(f"[red]✗[/red] {record['manager']}: {record['error']}\n")
+
+
+analytics_app = typer.Typer(help="Query the snapshot history (requires duckdb)")
+app.add_typer(analytics_app, name="analytics")
+
+
+def _snapshot_analytics():
+    from app.analysis.snapshot_analytics import AnalyticsUnavailableError, SnapshotAnalytics
+
+    try:
+        return SnapshotAnalytics()
+    except AnalyticsUnavailableError as e:
+        console.print(f"[red]✗ Error:[/red] {e}\n")
+        raise typer.Exit(code=1)
+
+
+def _print_rows(title: str, rows, columns: List[str]) -> None:
+    if not rows:
+        console.print("[yellow]No matching snapshots found.[/yellow]\n")
+        raise typer.Exit(code=1)
+
+    table = Table(title=title, show_header=True)
+    for column in columns:
+        table.add_column(column.replace("_", " ").title())
+    for row in rows:
+        table.add_row(*(str(row[column]) for column in columns))
+    console.print(table)
+    console.print()
+
+
+@analytics_app.command("first-seen")
+def analytics_first_seen(
+    package: str = typer.Argument(..., help="Package name"),
+    manager: Optional[str] = typer.Option(None, "--manager", "-m", help="Restrict to a manager"),
+) -> None:
+    """
+    Show the first snapshot in which a package appears.
+    """
+    rows = _snapshot_analytics().first_seen(package, manager)
+    _print_rows(
+        f"{package}: first seen",
+        rows,
+        ["manager", "snapshot_id", "first_seen", "version", "last_seen", "snapshots"],
+    )
+
+
+@analytics_app.command("versions")
+def analytics_versions(
+    package: str = typer.Argument(..., help="Package name"),
+    manager: Optional[str] = typer.Option(None, "--manager", "-m", help="Restrict to a manager"),
+) -> None:
+    """
+    Show the version history of a package across snapshots.
+    """
+    rows = _snapshot_analytics().version_history(package, manager)
+    _print_rows(
+        f"{package}: version history",
+        rows,
+        ["manager", "version", "first_seen", "last_seen", "snapshots"],
+    )
+
+
+@analytics_app.command("churn")
+def analytics_churn(
+    since: Optional[datetime] = typer.Option(
+        None, "--since", help="Start of the window (defaults to the start of this month)"
+    ),
+    until: Optional[datetime] = typer.Option(None, "--until", help="End of the window (exclusive)"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Number of managers to show"),
+) -> None:
+    """
+    Rank managers by packages added, removed or changed between snapshots.
+    """
+    rows = _snapshot_analytics().churn(since, until, limit)
+    _print_rows(
+        "Manager churn",
+        rows,
+        ["manager", "snapshots", "added", "removed", "changed", "churn"],
+    )
+
+
 @app.command()
 def version() -> None:
     """
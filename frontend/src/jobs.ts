@@ -0,0 +1,31 @@
+import axios from 'axios'
+
+export type JobStatus = 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled'
+
+export interface Job<T = unknown> {
+  id: string
+  kind: string
+  manager: string
+  status: JobStatus
+  position: number | null
+  blocked_by: string | null
+  result: T | null
+  error: string | null
+  status_url: string
+}
+
+const FINAL_STATUSES: JobStatus[] = ['succeeded', 'failed', 'cancelled']
+
+/** Polls a background job until it reaches a final status. */
+export async function waitForJob<T = unknown>(job: Job, intervalMs = 1000): Promise<Job<T>> {
+  let current = job as Job<T>
+  while (!FINAL_STATUSES.includes(current.status)) {
+    await new Promise(resolve => setTimeout(resolve, intervalMs))
+    const res = await axios.get<Job<T>>(current.status_url)
+    current = res.data
+  }
+  if (current.status !== 'succeeded') {
+    throw new Error(current.error ?? `Job ${current.id} ${current.status}`)
+  }
+  return current
+}
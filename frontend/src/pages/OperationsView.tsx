@@ -2,6 +2,7 @@ import { useState } from 'react'
 import { useMutation } from '@tanstack/react-query'
 import axios from 'axios'
 import { useAppStore } from '../store/appStore'
+import { Job, waitForJob } from '../jobs'
 
 export function OperationsView() {
   const { selectedManager } = useAppStore()
@@ -9,7 +10,8 @@ export function OperationsView() {
 
   const batchUninstall = useMutation({
     mutationFn: async (pkgs: string[]) => {
-      await axios.post(`/api/advanced/${selectedManager}/batch-uninstall`, { packages: pkgs })
+      const res = await axios.post<Job>(`/api/advanced/${selectedManager}/batch-uninstall`, { packages: pkgs })
+      await waitForJob(res.data)
     },
   })
 
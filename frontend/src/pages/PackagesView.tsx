@@ -2,6 +2,7 @@ import { useState } from 'react'
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query'
 import axios from 'axios'
 import { useAppStore } from '../store/appStore'
+import { Job, waitForJob } from '../jobs'
 
 interface Package {
   name: string
@@ -25,7 +26,8 @@ export function PackagesView() {
 
   const uninstallMutation = useMutation({
     mutationFn: async (packageName: string) => {
-      await axios.delete(`/api/managers/${selectedManager}/packages/${encodeURIComponent(packageName)}`)
+      const res = await axios.delete<Job>(`/api/managers/${selectedManager}/packages/${encodeURIComponent(packageName)}`)
+      await waitForJob(res.data)
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['packages', selectedManager] })
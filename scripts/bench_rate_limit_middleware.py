@@ -0,0 +1,147 @@
+"""Microbenchmark do custo por pedido do middleware de rate limiting.
+
+Compara o matcher de rotas antigo (um regex compilado por padrão em cada
+pedido) com o atual (templates compilados uma vez num único regex), isolado e
+dentro do middleware completo.
+
+Uso (a partir da raiz do repositório):
+
+    python scripts/bench_rate_limit_middleware.py [--iterations 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import Response  # noqa: E402
+
+from app.core import rate_limiter as rate_limiter_module  # noqa: E402
+from app.core.rate_limiter import PATH_LIMITS, PathRateLimiter, RateLimiter  # noqa: E402
+
+# Padrões com wildcards usados antes dos templates de rota.
+LEGACY_PATH_LIMITS: Dict[str, Tuple[int, int]] = {
+    "/api/advanced/*/vulnerabilities": (10, 100),
+    "/api/advanced/*/dependency-tree": (10, 100),
+    "/api/advanced/*/batch-uninstall": (5, 50),
+    "/api/advanced/*/rollback/*": (5, 50),
+    "/api/streaming/*/*/uninstall": (20, 200),
+    "/api/discover": (30, 300),
+    "/api/managers": (60, 1000),
+    "/api/jobs/*": (120, 3000),
+}
+
+# Mistura de pedidos: rotas com limite próprio e rotas que caem no limite global.
+PATHS = [
+    "/api/managers",
+    "/api/managers/npm/packages",
+    "/api/jobs/4f1c2a9e0b7d4e86a1f35c2d9e8b7a60",
+    "/api/advanced/npm/vulnerabilities",
+    "/api/snapshots",
+    "/api/streaming/npm/packages/lodash/uninstall",
+]
+
+UNLIMITED = 10**9
+
+
+class LegacyPathRateLimiter:
+    """Reprodução do PathRateLimiter anterior (regex compilado por pedido)."""
+
+    def __init__(self) -> None:
+        self.path_limits = LEGACY_PATH_LIMITS
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def get_limiter_for_path(self, path: str) -> Optional[RateLimiter]:
+        for pattern, (per_min, per_hour) in self.path_limits.items():
+            if self._matches_pattern(path, pattern):
+                key = f"{per_min}_{per_hour}"
+                if key not in self._limiters:
+                    self._limiters[key] = RateLimiter(UNLIMITED, UNLIMITED)
+                return self._limiters[key]
+        return None
+
+    def _matches_pattern(self, path: str, pattern: str) -> bool:
+        regex_pattern = pattern.replace("*", "[^/]+")
+        regex_pattern = f"^{regex_pattern}$"
+        return bool(re.match(regex_pattern, path))
+
+
+def _per_call_ns(func: Callable[[], object], iterations: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def bench_matcher(iterations: int) -> List[Tuple[str, float]]:
+    legacy = LegacyPathRateLimiter()
+    current = PathRateLimiter({template: (UNLIMITED, UNLIMITED) for template in PATH_LIMITS})
+    rows = []
+    for name, limiter in (("legacy matcher", legacy), ("compiled matcher", current)):
+        def run(limiter=limiter) -> None:
+            for path in PATHS:
+                limiter.get_limiter_for_path(path)
+
+        rows.append((name, _per_call_ns(run, iterations) / len(PATHS)))
+    return rows
+
+
+async def _bench_middleware(path_limiter, iterations: int) -> float:
+    rate_limiter_module._rate_limiter = RateLimiter(UNLIMITED, UNLIMITED)
+    rate_limiter_module._path_rate_limiter = path_limiter
+
+    async def call_next(request: Request) -> Response:
+        return Response()
+
+    requests = [
+        Request(
+            {
+                "type": "http",
+                "method": "GET",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": b"",
+                "headers": [],
+                "client": ("127.0.0.1", 50000),
+                "server": ("testserver", 80),
+                "scheme": "http",
+            }
+        )
+        for path in PATHS
+    ]
+
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        for request in requests:
+            await rate_limiter_module.rate_limit_middleware(request, call_next)
+    return (time.perf_counter_ns() - start) / (iterations * len(requests))
+
+
+def bench_middleware(iterations: int) -> List[Tuple[str, float]]:
+    current = PathRateLimiter({template: (UNLIMITED, UNLIMITED) for template in PATH_LIMITS})
+    return [
+        ("middleware, legacy matcher", asyncio.run(_bench_middleware(LegacyPathRateLimiter(), iterations))),
+        ("middleware, compiled matcher", asyncio.run(_bench_middleware(current, iterations))),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    rows = bench_matcher(args.iterations) + bench_middleware(args.iterations // 4 or 1)
+    width = max(len(name) for name, _ in rows)
+    for name, ns in rows:
+        print(f"{name:<{width}}  {ns / 1000:8.2f} µs/pedido")
+
+
+if __name__ == "__main__":
+    main()